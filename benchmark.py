@@ -0,0 +1,404 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import delivery
+from medicao import ambiente, gerar_dados
+
+
+# --- Layout anterior das classes, para comparação ---
+class PratoLegado:
+    def __init__(self, nome, preco, descricao, imagem=None):
+        self.nome = nome
+        self.preco = preco
+        self.descricao = descricao
+        self.imagem = imagem
+
+class PedidoLegado:
+    def __init__(self, cliente, restaurante, pratos):
+        self.cliente = cliente
+        self.restaurante = restaurante
+        self.pratos = pratos
+        self.hora_pedido = datetime.now()
+        self.prazo_entrega = self.hora_pedido + timedelta(minutes=30)
+        self.status = 'Em preparo'
+
+
+# --- Memória ---
+def criar_catalogo(classe_prato, restaurantes=20, pratos_por_restaurante=30, clientes=1000):
+    lista_clientes = [delivery.Cliente(f'cliente{i}', '', '', '', '', '', '') for i in range(clientes)]
+    lista_restaurantes = []
+    for i in range(restaurantes):
+        restaurante = delivery.Restaurante(f'restaurante{i}', '', '', '', '', '', '')
+        restaurante.cardapio = [classe_prato(f'prato{j}', 10.0 + j, 'descrição') for j in range(pratos_por_restaurante)]
+        lista_restaurantes.append(restaurante)
+    return lista_clientes, lista_restaurantes
+
+def criar_pedidos(classe_pedido, catalogo, quantidade):
+    clientes, restaurantes = catalogo
+    pedidos = []
+    for i in range(quantidade):
+        restaurante = restaurantes[i % len(restaurantes)]
+        cardapio = restaurante.cardapio
+        pratos = [cardapio[i % len(cardapio)], cardapio[(i * 7) % len(cardapio)], cardapio[(i * 13) % len(cardapio)]]
+        pedidos.append(classe_pedido(clientes[i % len(clientes)], restaurante, pratos))
+    return pedidos
+
+def criar_armazem(catalogo, quantidade):
+    armazem = delivery.ArmazemPedidos(*catalogo)
+    for i, pedido in enumerate(criar_pedidos(delivery.Pedido, catalogo, quantidade)):
+        pedido.id = i + 1
+        armazem.adicionar(pedido)
+    return armazem
+
+def medir_memoria(fabrica, classe_prato, quantidade):
+    catalogo = criar_catalogo(classe_prato)
+    tracemalloc.start()
+    pedidos = fabrica(catalogo, quantidade)
+    usado = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del pedidos
+    return usado
+
+def benchmark_memoria(quantidades):
+    resultados = []
+    for quantidade in quantidades:
+        medidas = {
+            'legado': medir_memoria(lambda c, n: criar_pedidos(PedidoLegado, c, n), PratoLegado, quantidade),
+            'slots': medir_memoria(lambda c, n: criar_pedidos(delivery.Pedido, c, n), delivery.Prato, quantidade),
+            'colunar': medir_memoria(criar_armazem, delivery.Prato, quantidade),
+        }
+        resultado = {'pedidos': quantidade}
+        for nome, usado in medidas.items():
+            resultado[f'{nome}_bytes'] = usado
+            resultado[f'{nome}_bytes_por_pedido'] = round(usado / quantidade, 1)
+        resultado['reducao_slots'] = round(medidas['legado'] / medidas['slots'], 2)
+        resultado['reducao_colunar'] = round(medidas['legado'] / medidas['colunar'], 2)
+        resultados.append(resultado)
+    return resultados
+
+
+# --- Pedidos atrasados ---
+def benchmark_atrasos(ativos, repeticoes=20):
+    catalogo = criar_catalogo(delivery.Prato)
+    pedidos = criar_pedidos(delivery.Pedido, catalogo, ativos)
+    aleatorio = random.Random(3)
+    agora = int(time.time())
+    for i, pedido in enumerate(pedidos):
+        pedido.id = i + 1
+        pedido.hora = agora - aleatorio.randrange(3600)
+        pedido.prazo = pedido.hora + delivery.PRAZO_PADRAO
+    pedidos.sort(key=lambda p: p.hora)
+    monitor = delivery.MonitorPrazos()
+    inicio = time.perf_counter()
+    for pedido in pedidos:
+        monitor.atualizar(pedido)
+    montagem = time.perf_counter() - inicio
+    restaurante = catalogo[1][0].nome
+    resultado = {
+        'pedidos_ativos': ativos,
+        'atrasados': len(monitor.atrasados(agora)),
+        'montagem_s': round(montagem, 4),
+        'atrasados_ms': cronometrar(lambda: monitor.atrasados(agora), repeticoes) * 1e3,
+        'atrasados_restaurante_ms': cronometrar(lambda: monitor.atrasados(agora, restaurante), repeticoes) * 1e3,
+        'atrasados_por_restaurante_ms': cronometrar(lambda: monitor.atrasados_por_restaurante(agora), repeticoes) * 1e3,
+        'vencendo_10min_ms': cronometrar(lambda: monitor.vencendo(agora, 600), repeticoes) * 1e3,
+        'varredura_esta_atrasado_ms': cronometrar(lambda: [p for p in pedidos if p.esta_atrasado()], repeticoes) * 1e3,
+    }
+    # Entrega de um pedido: sai da lista ordenada.
+    amostra = aleatorio.sample(pedidos, 1000)
+    inicio = time.perf_counter()
+    for pedido in amostra:
+        pedido.status = 'Entregue'
+        monitor.atualizar(pedido)
+    resultado['remocao_us'] = (time.perf_counter() - inicio) / len(amostra) * 1e6
+    return {nome: round(valor, 3) if isinstance(valor, float) else valor for nome, valor in resultado.items()}
+
+
+# --- Busca de pratos ---
+PALAVRAS_PRATOS = (
+    'frango', 'grelhado', 'filé', 'picanha', 'feijoada', 'moqueca', 'camarão', 'salmão', 'tilápia', 'bacalhau',
+    'pão', 'queijo', 'presunto', 'calabresa', 'muçarela', 'açaí', 'coração', 'farofa', 'mandioca', 'purê',
+    'batata', 'arroz', 'feijão', 'lasanha', 'nhoque', 'espaguete', 'risoto', 'strogonoff', 'escondidinho', 'pastel',
+    'coxinha', 'empada', 'torta', 'brigadeiro', 'pudim', 'mousse', 'maracujá', 'limão', 'abacaxi', 'manga',
+    'vegano', 'vegetariano', 'integral', 'caseiro', 'picante', 'defumado', 'assado', 'frito', 'cremoso', 'crocante',
+)
+
+def criar_pratos_busca(quantidade, semente=4):
+    aleatorio = random.Random(semente)
+    restaurantes = [delivery.Restaurante(f'restaurante{i}', '', '', '', '', '', '') for i in range(max(1, quantidade // 50))]
+    pratos = []
+    for i in range(quantidade):
+        nome = ' '.join(aleatorio.sample(PALAVRAS_PRATOS, 2)) + f' {i % 997}'
+        descricao = ' com '.join(aleatorio.sample(PALAVRAS_PRATOS, 3))
+        pratos.append((restaurantes[i % len(restaurantes)], delivery.Prato(nome, round(aleatorio.uniform(5, 150), 2), descricao)))
+    return pratos
+
+def benchmark_busca(quantidade, repeticoes=20):
+    pratos = criar_pratos_busca(quantidade)
+    indice = delivery.IndiceBusca()
+    inicio = time.perf_counter()
+    for restaurante, prato in pratos:
+        indice.adicionar(restaurante, prato)
+    resultado = {'pratos': quantidade, 'montagem_s': round(time.perf_counter() - inicio, 3), 'consultas_ms': {}}
+    consultas = (
+        ('camarao', None, None),
+        ('Feijoada', None, None),
+        ('fil', None, None),
+        ('frango grelhado', None, None),
+        ('maracuja mousse', 10, 40),
+        ('pao de queijo caseiro', None, 30),
+        ('frango grelhado', 5, 5.5),
+    )
+    for consulta, minimo, maximo in consultas:
+        chave = consulta if minimo is None and maximo is None else f'{consulta} [{minimo}-{maximo}]'
+        resultado['consultas_ms'][chave] = round(cronometrar(lambda: indice.buscar(consulta, minimo, maximo), repeticoes) * 1e3, 3)
+    return resultado
+
+
+# --- Despacho de entregadores ---
+def benchmark_despacho(quantidade, entregadores, repeticoes=5, semente=5):
+    aleatorio = random.Random(semente)
+    restaurantes = [delivery.Restaurante(f'restaurante{i}', '', f'Rua R{i}, {i}', '', '', '', '') for i in range(200)]
+    clientes = [delivery.Cliente(f'cliente{i}', '', f'Rua C{i % 5000}, {i}', '', '', '', '') for i in range(quantidade)]
+    pedidos = []
+    for i, cliente in enumerate(clientes):
+        pedido = delivery.Pedido(cliente, aleatorio.choice(restaurantes), [])
+        pedido.id = i + 1
+        pedidos.append(pedido)
+
+    def montar():
+        despacho = delivery.Despacho()
+        for i in range(entregadores):
+            despacho.incluir_entregador(delivery.Entregador(f'entregador{i}', f'Base {i}'))
+        for pedido in pedidos:
+            despacho.atualizar(pedido)
+        return despacho
+
+    amostras = []
+    for _ in range(repeticoes):
+        despacho = montar()
+        inicio = time.perf_counter()
+        rotas = despacho.despachar()
+        amostras.append(time.perf_counter() - inicio)
+    atribuidos = sum(len(rota) for _, rota in rotas)
+    # Mais próximo: grade contra varredura linear dos entregadores livres.
+    despacho = montar()
+    pontos = [despacho.ponto(r.endereco) for r in restaurantes]
+    livres = list(despacho.livres.posicoes.items())
+
+    def linear(x, y):
+        return min(livres, key=lambda item: (item[1][0] - x) ** 2 + (item[1][1] - y) ** 2)
+
+    return {
+        'pedidos': quantidade,
+        'entregadores': entregadores,
+        'rotas': len(rotas),
+        'pedidos_atribuidos': atribuidos,
+        'pedidos_por_rota': round(atribuidos / len(rotas), 2) if rotas else 0,
+        'despacho_ms': round(statistics.median(amostras) * 1e3, 3),
+        'mais_proximo_grade_us': round(cronometrar(lambda: [despacho.livres.mais_proximo(x, y) for x, y in pontos], repeticoes) / len(pontos) * 1e6, 3),
+        'mais_proximo_linear_us': round(cronometrar(lambda: [linear(x, y) for x, y in pontos], repeticoes) / len(pontos) * 1e6, 3),
+    }
+
+
+# --- Vendas por período ---
+def benchmark_vendas(quantidade, repeticoes=5):
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'vendas.data')
+        gerar_dados(caminho, pedidos=quantidade)
+        sistema = delivery.Sistema(delivery.ArmazenamentoJSON(caminho, usar_diario=False))
+    armazem = delivery.ArmazemPedidos(sistema.clientes, sistema.restaurantes)
+    for pedido in sistema.pedidos:
+        armazem.adicionar(pedido)
+
+    def incremental(pedidos):
+        vendas = delivery.VendasPorPeriodo()
+        for pedido in pedidos:
+            vendas.registrar_pedido(pedido)
+        return vendas
+
+    def varredura_semana(restaurante):
+        # O que o relatório custaria sem os baldes: percorrer os pedidos.
+        return sum(sum(prato.preco for prato in p.pratos) for p in sistema.pedidos
+                   if p.hora >= inicio and (restaurante is None or p.restaurante.nome == restaurante))
+
+    vendas = incremental(sistema.pedidos)
+    reconstruidas = delivery.VendasPorPeriodo.de_armazem(armazem)
+    iguais = all(
+        {h: (b[0], round(b[1], 2)) for h, b in vendas.horas[r].items()} ==
+        {h: (b[0], round(b[1], 2)) for h, b in reconstruidas.horas[r].items()}
+        for r in vendas.horas) and vendas.horas.keys() == reconstruidas.horas.keys()
+    hoje = datetime.now().date()
+    semana = hoje - timedelta(days=6)
+    inicio = int(datetime.combine(semana, datetime.min.time()).timestamp())
+    agora = int(time.time())
+    restaurante = sistema.restaurantes[0].nome
+    resultado = {
+        'pedidos': quantidade,
+        'incremental_pedidos_s': cronometrar(lambda: incremental(sistema.pedidos), repeticoes),
+        'incremental_colunas_s': cronometrar(lambda: incremental(armazem), repeticoes),
+        'reconstrucao_colunas_s': cronometrar(lambda: delivery.VendasPorPeriodo.de_armazem(armazem), repeticoes),
+        'reconstrucao_iguais': iguais,
+        'hoje_por_hora_ms': cronometrar(lambda: vendas.por_hora(agora - agora % 86400, agora, restaurante), repeticoes) * 1e3,
+        'semana_por_dia_ms': cronometrar(lambda: vendas.por_dia(semana, hoje, restaurante), repeticoes) * 1e3,
+        'semana_todos_ms': cronometrar(lambda: vendas.por_dia(semana, hoje), repeticoes) * 1e3,
+        'semana_pratos_ms': cronometrar(lambda: vendas.pratos(semana, hoje, restaurante), repeticoes) * 1e3,
+        'semana_varredura_pedidos_ms': cronometrar(lambda: varredura_semana(restaurante), repeticoes) * 1e3,
+    }
+    return {nome: round(valor, 4) if isinstance(valor, float) else valor for nome, valor in resultado.items()}
+
+
+# --- Núcleo do sistema ---
+def cronometrar(funcao, repeticoes=1):
+    # Devolve a mediana, em segundos, de `repeticoes` execuções.
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+def respostas(*valores, padrao='0'):
+    fila = list(valores)
+    return lambda mensagem='': fila.pop(0) if fila else padrao
+
+def benchmark_nucleo(dados, formato='json', pedidos_novos=1000, consultas=200):
+    # Cada rodada trabalha em uma cópia dos dados, porque salvar e fazer
+    # pedidos alteram o arquivo e o diário.
+    with tempfile.TemporaryDirectory() as pasta:
+        if formato == 'colunar':
+            caminho = os.path.join(pasta, 'delivery.col')
+            delivery.json_para_colunar(dados, caminho)
+            abrir = lambda: delivery.Sistema(delivery.ArmazenamentoColunar(caminho))
+        else:
+            caminho = os.path.join(pasta, 'delivery.data')
+            shutil.copy(dados, caminho)
+            abrir = lambda: delivery.Sistema(delivery.ArmazenamentoJSON(caminho))
+        resultado = {'formato': formato}
+
+        inicio = time.perf_counter()
+        sistema = delivery.sistema = abrir()
+        resultado['carregar_dados_s'] = round(time.perf_counter() - inicio, 4)
+        resultado['pedidos'] = len(sistema.pedidos)
+
+        resultado['pedidos_ativos'] = len(sistema.agendador)
+        resultado['atualizar_status_primeira_s'] = round(cronometrar(delivery.atualizar_status_automaticamente), 4)
+        resultado['atualizar_status_ocioso_us'] = round(cronometrar(delivery.atualizar_status_automaticamente, 1000) * 1e6, 2)
+
+        aleatorio = random.Random(2)
+        clientes, restaurantes = sistema.clientes, sistema.restaurantes
+        novos = []
+        for _ in range(pedidos_novos):
+            restaurante = aleatorio.choice(restaurantes)
+            novos.append(delivery.Pedido(aleatorio.choice(clientes), restaurante, aleatorio.sample(restaurante.cardapio, 2)))
+        inicio = time.perf_counter()
+        for pedido in novos:
+            sistema.adicionar_pedido(pedido)
+        resultado['fazer_pedido_us'] = round((time.perf_counter() - inicio) / pedidos_novos * 1e6, 2)
+
+        # As telas de pedidos são executadas de verdade, com input e print
+        # substituídos no módulo.
+        amostra_clientes = [aleatorio.choice(clientes) for _ in range(consultas)]
+        amostra_restaurantes = [aleatorio.choice(restaurantes) for _ in range(consultas)]
+        delivery.print = lambda *args, **kwargs: None
+        try:
+            inicio = time.perf_counter()
+            for cliente in amostra_clientes:
+                delivery.input = respostas('1')
+                delivery.ver_pedidos_cliente(cliente)
+            resultado['ver_pedidos_cliente_us'] = round((time.perf_counter() - inicio) / consultas * 1e6, 2)
+            inicio = time.perf_counter()
+            for restaurante in amostra_restaurantes:
+                delivery.input = respostas('2')
+                delivery.ver_pedidos_restaurante(restaurante)
+            resultado['ver_pedidos_restaurante_ativos_us'] = round((time.perf_counter() - inicio) / consultas * 1e6, 2)
+            inicio = time.perf_counter()
+            for restaurante in amostra_restaurantes:
+                delivery.input = respostas('0')
+                delivery.fila_pedidos_restaurante(restaurante)
+            resultado['fila_pedidos_restaurante_us'] = round((time.perf_counter() - inicio) / consultas * 1e6, 2)
+        finally:
+            del delivery.print, delivery.input
+
+        resultado['pratos_mais_pedidos_us'] = round(cronometrar(lambda: sistema.agregados.mais_pedidos(5), consultas) * 1e6, 2)
+        resultado['pratos_mais_pedidos_restaurante_us'] = round(
+            cronometrar(lambda: sistema.agregados.mais_pedidos(5, restaurantes[0].nome), consultas) * 1e6, 2)
+
+        resultado['salvar_dados_s'] = round(cronometrar(sistema.salvar_dados), 4)
+        resultado['tamanho_snapshot_bytes'] = os.path.getsize(caminho)
+        delivery.sistema = None
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks do sistema de delivery')
+    subcomandos = parser.add_subparsers(dest='comando', required=True)
+    memoria = subcomandos.add_parser('memoria', help='compara a memória de Pedido com o layout anterior')
+    memoria.add_argument('--quantidades', type=int, nargs='+', default=[100_000, 1_000_000])
+    atrasos = subcomandos.add_parser('atrasos', help='mede as consultas de pedidos atrasados')
+    atrasos.add_argument('--ativos', type=int, nargs='+', default=[10_000, 100_000])
+    busca = subcomandos.add_parser('busca', help='mede a busca de pratos no índice invertido')
+    busca.add_argument('--pratos', type=int, nargs='+', default=[100_000, 1_000_000])
+    despacho = subcomandos.add_parser('despacho', help='mede a atribuição de pedidos a entregadores')
+    despacho.add_argument('--pedidos', type=int, nargs='+', default=[1_000, 5_000])
+    despacho.add_argument('--entregadores', type=int, default=2_000)
+    vendas = subcomandos.add_parser('vendas', help='mede os baldes de vendas por hora e por dia')
+    vendas.add_argument('--pedidos', type=int, nargs='+', default=[100_000])
+    gerar = subcomandos.add_parser('gerar', help='gera um arquivo de dados sintético')
+    nucleo = subcomandos.add_parser('nucleo', help='mede carregar, salvar, atualizar status, pedidos, telas e relatórios')
+    for sub in (gerar, nucleo):
+        sub.add_argument('--clientes', type=int, default=1000)
+        sub.add_argument('--restaurantes', type=int, default=50)
+        sub.add_argument('--pratos', type=int, default=30, help='pratos por restaurante')
+        sub.add_argument('--pedidos', type=int, default=100_000)
+        sub.add_argument('--ativos', type=float, default=0.05, help='fração de pedidos em andamento')
+        sub.add_argument('--semente', type=int, default=1)
+    gerar.add_argument('arquivo')
+    nucleo.add_argument('--dados', help='usa um arquivo de dados existente em vez de gerar um')
+    nucleo.add_argument('--formatos', nargs='+', choices=('json', 'colunar'), default=['json', 'colunar'])
+    nucleo.add_argument('--saida', help='grava o JSON de resultados neste arquivo')
+    args = parser.parse_args()
+
+    if args.comando == 'memoria':
+        print(json.dumps({'memoria': benchmark_memoria(args.quantidades)}, indent=4))
+    elif args.comando == 'atrasos':
+        print(json.dumps({'atrasos': [benchmark_atrasos(quantidade) for quantidade in args.ativos]}, indent=4))
+    elif args.comando == 'busca':
+        print(json.dumps({'busca': [benchmark_busca(quantidade) for quantidade in args.pratos]}, indent=4))
+    elif args.comando == 'despacho':
+        print(json.dumps({'despacho': [benchmark_despacho(quantidade, args.entregadores) for quantidade in args.pedidos]}, indent=4))
+    elif args.comando == 'vendas':
+        print(json.dumps({'vendas': [benchmark_vendas(quantidade) for quantidade in args.pedidos]}, indent=4))
+    elif args.comando == 'gerar':
+        gerar_dados(args.arquivo, args.clientes, args.restaurantes, args.pratos, args.pedidos, args.ativos, semente=args.semente)
+    elif args.comando == 'nucleo':
+        with tempfile.TemporaryDirectory() as pasta:
+            dados = args.dados
+            parametros = {'dados': dados}
+            if not dados:
+                dados = os.path.join(pasta, 'delivery.data')
+                parametros = {'clientes': args.clientes, 'restaurantes': args.restaurantes, 'pratos_por_restaurante': args.pratos,
+                              'pedidos': args.pedidos, 'fracao_ativos': args.ativos, 'semente': args.semente}
+                gerar_dados(dados, args.clientes, args.restaurantes, args.pratos, args.pedidos, args.ativos, semente=args.semente)
+            relatorio = {
+                'ambiente': ambiente(),
+                'parametros': parametros,
+                'nucleo': [benchmark_nucleo(dados, formato) for formato in args.formatos],
+            }
+        saida = json.dumps(relatorio, indent=4)
+        if args.saida:
+            with open(args.saida, 'w') as f:
+                f.write(saida + '\n')
+        print(saida)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,135 @@
 
+import argparse
+import atexit
+import cProfile
+import gzip
 import json
+import math
+import mmap
+import multiprocessing
 import os
-from datetime import datetime, timedelta
+import queue
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import unicodedata
+import zlib
+from contextlib import contextmanager
+from datetime import date, datetime
 from abc import ABC, abstractmethod
-from collections import Counter
+from collections import Counter, deque
+import heapq
+import importlib
+from array import array
+from bisect import bisect_left, insort
+from functools import wraps
+from itertools import accumulate, chain, repeat
+from operator import add, floordiv, itemgetter, mul, sub
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# --- Métricas ---
+class Histograma:
+    # Latências em baldes de potências de 2 microssegundos (1 µs a ~67 s).
+    BALDES = 27
+    __slots__ = ('baldes', 'quantidade', 'soma', 'maximo')
+
+    def __init__(self):
+        self.baldes = [0] * self.BALDES
+        self.quantidade = 0
+        self.soma = 0.0
+        self.maximo = 0.0
+
+    def registrar(self, segundos):
+        self.baldes[min(int(segundos * 1e6).bit_length(), self.BALDES - 1)] += 1
+        self.quantidade += 1
+        self.soma += segundos
+        if segundos > self.maximo:
+            self.maximo = segundos
+
+    def limite(self, balde):
+        return (1 << balde) / 1e6
+
+    def percentil(self, p):
+        # Limite superior do balde que contém o percentil.
+        alvo = self.quantidade * p / 100
+        acumulado = 0
+        for balde, quantidade in enumerate(self.baldes):
+            acumulado += quantidade
+            if quantidade and acumulado >= alvo:
+                return min(self.limite(balde), self.maximo)
+        return self.maximo
+
+class Metricas:
+    # Cronômetros e contadores dos caminhos quentes. Desativadas, cada
+    # chamada medida custa só a verificação de `ativo`.
+    def __init__(self, ativo=True):
+        self.ativo = ativo
+        self.contadores = Counter()
+        self.histogramas = {}
+
+    def medir(self, nome):
+        def decorador(funcao):
+            @wraps(funcao)
+            def medida(*args, **kwargs):
+                if not self.ativo:
+                    return funcao(*args, **kwargs)
+                inicio = time.perf_counter()
+                try:
+                    return funcao(*args, **kwargs)
+                finally:
+                    self.registrar(nome, time.perf_counter() - inicio)
+            return medida
+        return decorador
+
+    def registrar(self, nome, segundos):
+        histograma = self.histogramas.get(nome)
+        if histograma is None:
+            histograma = self.histogramas[nome] = Histograma()
+        histograma.registrar(segundos)
+
+    def contar(self, nome, quantidade=1):
+        if self.ativo:
+            self.contadores[nome] += quantidade
+
+    def zerar(self):
+        self.contadores.clear()
+        self.histogramas.clear()
+
+    def resumo(self):
+        linhas = [f"{'operação':<28}{'chamadas':>10}{'média ms':>11}{'p50 ms':>10}{'p99 ms':>10}{'máx ms':>10}"]
+        for nome, h in sorted(self.histogramas.items()):
+            linhas.append(f"{nome:<28}{h.quantidade:>10}{h.soma / h.quantidade * 1e3:>11.3f}"
+                          f"{h.percentil(50) * 1e3:>10.3f}{h.percentil(99) * 1e3:>10.3f}{h.maximo * 1e3:>10.3f}")
+        for nome, valor in sorted(self.contadores.items()):
+            linhas.append(f"{nome:<28}{valor:>10}")
+        return '\n'.join(linhas)
+
+    def texto(self):
+        # Formato de exposição de texto do Prometheus.
+        linhas = []
+        for nome, h in sorted(self.histogramas.items()):
+            metrica = f'delivery_{nome}_segundos'
+            linhas.append(f'# TYPE {metrica} histogram')
+            acumulado = 0
+            for balde, quantidade in enumerate(h.baldes[:-1]):
+                acumulado += quantidade
+                linhas.append(f'{metrica}_bucket{{le="{h.limite(balde):g}"}} {acumulado}')
+            linhas.append(f'{metrica}_bucket{{le="+Inf"}} {h.quantidade}')
+            linhas.append(f'{metrica}_sum {h.soma:.6f}')
+            linhas.append(f'{metrica}_count {h.quantidade}')
+        for nome, valor in sorted(self.contadores.items()):
+            linhas.append(f'# TYPE delivery_{nome}_total counter')
+            linhas.append(f'delivery_{nome}_total {valor}')
+        return '\n'.join(linhas) + '\n'
+
+metricas = Metricas()
 
 # --- Classes de Negócio ---
 class Usuario(ABC):
@@ -27,12 +153,15 @@ class Cliente(Usuario):
     def exibir_menu(self):
         print(f"\nBem-vindo, {self.nome}!")
         while True:
-            print("\n1 - Fazer Pedido\n2 - Ver Pedidos\n0 - Sair")
+            mostrar_avisos('cliente', self.nome)
+            print("\n1 - Fazer Pedido\n2 - Ver Pedidos\n3 - Histórico Arquivado\n0 - Sair")
             escolha = input("Escolha uma opção: ")
             if escolha == "1":
                 fazer_pedido(self)
             elif escolha == "2":
                 ver_pedidos_cliente(self)
+            elif escolha == "3":
+                ver_historico_arquivado(cliente=self.nome)
             elif escolha == "0":
                 break
 
@@ -46,33 +175,71 @@ class Restaurante(Usuario):
     def exibir_menu(self):
         print(f"\nRestaurante: {self.nome}")
         while True:
-            print("\n1 - Cadastrar Prato\n2 - Ver Pedidos\n0 - Sair")
+            mostrar_avisos('restaurante', self.nome)
+            print("\n1 - Cadastrar Prato\n2 - Ver Pedidos\n3 - Relatório de Vendas\n4 - Histórico Arquivado\n5 - Fila de Pedidos\n0 - Sair")
             escolha = input("Escolha uma opção: ")
             if escolha == "1":
                 cadastrar_prato(self)
             elif escolha == "2":
                 ver_pedidos_restaurante(self)
+            elif escolha == "3":
+                relatorio_vendas(self.nome)
+            elif escolha == "4":
+                ver_historico_arquivado(restaurante=self.nome)
+            elif escolha == "5":
+                fila_pedidos_restaurante(self)
             elif escolha == "0":
                 break
 
 class Prato:
+    __slots__ = ('nome', 'preco', 'descricao', 'imagem')
+
     def __init__(self, nome, preco, descricao, imagem=None):
         self.nome = nome
         self.preco = preco
         self.descricao = descricao
         self.imagem = imagem
 
-class Pedido:
-    def __init__(self, cliente, restaurante, pratos):
-        self.cliente = cliente
-        self.restaurante = restaurante
-        self.pratos = pratos
-        self.hora_pedido = datetime.now()
-        self.prazo_entrega = self.hora_pedido + timedelta(minutes=30)
-        self.status = 'Em preparo'
+    def to_dict(self):
+        return {'nome': self.nome, 'preco': self.preco, 'descricao': self.descricao, 'imagem': self.imagem}
+
+STATUS = ('Em preparo', 'A caminho', 'Entregue')
+CODIGOS_STATUS = {status: codigo for codigo, status in enumerate(STATUS)}
+PRAZO_PADRAO = 30 * 60
+
+class PedidoBase:
+    # Interface comum dos pedidos: horários guardados como segundos desde a
+    # época (`hora`, `prazo`) e status como índice em STATUS (`codigo_status`),
+    # expostos como datetime e texto para o restante do sistema.
+    __slots__ = ()
+
+    @property
+    def hora_pedido(self):
+        return datetime.fromtimestamp(self.hora)
+
+    @hora_pedido.setter
+    def hora_pedido(self, valor):
+        self.hora = int(valor.timestamp())
+
+    @property
+    def prazo_entrega(self):
+        return datetime.fromtimestamp(self.prazo)
+
+    @prazo_entrega.setter
+    def prazo_entrega(self, valor):
+        self.prazo = int(valor.timestamp())
+
+    @property
+    def status(self):
+        return STATUS[self.codigo_status]
+
+    @status.setter
+    def status(self, valor):
+        self.codigo_status = CODIGOS_STATUS[valor]
 
     def to_dict(self):
         return {
+            'id': self.id,
             'cliente': self.cliente.nome,
             'restaurante': self.restaurante.nome,
             'pratos': [prato.nome for prato in self.pratos],
@@ -82,61 +249,2913 @@ class Pedido:
         }
 
     def esta_atrasado(self):
-        return self.status in ['Em preparo', 'A caminho'] and datetime.now() > self.prazo_entrega
+        return self.status in STATUS_ATIVOS and time.time() > self.prazo
 
-class Sistema:
+class Pedido(PedidoBase):
+    # `_hora` e `_prazo` podem guardar o texto lido do arquivo; a conversão
+    # para segundos só acontece quando o horário é consultado.
+    __slots__ = ('id', 'cliente', 'restaurante', 'pratos', '_hora', '_prazo', 'codigo_status')
+
+    def __init__(self, cliente, restaurante, pratos):
+        self.id = None
+        self.cliente = cliente
+        self.restaurante = restaurante
+        self.pratos = tuple(pratos)
+        self._hora = int(time.time())
+        self._prazo = self._hora + PRAZO_PADRAO
+        self.codigo_status = 0
+
+    @property
+    def hora(self):
+        valor = self._hora
+        if valor.__class__ is str:
+            valor = self._hora = epoca(valor)
+        return valor
+
+    @hora.setter
+    def hora(self, valor):
+        self._hora = valor
+
+    @property
+    def prazo(self):
+        valor = self._prazo
+        if valor.__class__ is str:
+            valor = self._prazo = epoca(valor)
+        return valor
+
+    @prazo.setter
+    def prazo(self, valor):
+        self._prazo = valor
+
+def epoca(texto):
+    # Equivalente a datetime.strptime(texto, '%Y-%m-%d %H:%M:%S').timestamp(),
+    # sem o custo do strptime.
+    return int(time.mktime((int(texto[0:4]), int(texto[5:7]), int(texto[8:10]),
+                            int(texto[11:13]), int(texto[14:16]), int(texto[17:19]), 0, 0, -1)))
+
+class ArmazemPedidos:
+    # Armazenamento colunar de pedidos: cada campo fica em um array de
+    # inteiros. Cliente e restaurante são posições nas listas recebidas e
+    # cada prato é a posição no cardápio do restaurante; os pratos de todos
+    # os pedidos ficam em um único array, delimitado por `inicio_pratos`.
+    def __init__(self, clientes, restaurantes):
+        self.clientes = clientes
+        self.restaurantes = restaurantes
+        self.posicao_cliente = {id(c): i for i, c in enumerate(clientes)}
+        self.posicao_restaurante = {id(r): i for i, r in enumerate(restaurantes)}
+        self.posicoes_prato = {}
+        self.ids = array('q')
+        self.cliente = array('i')
+        self.restaurante = array('i')
+        self.hora = array('q')
+        self.prazo = array('q')
+        self.status = array('b')
+        self.inicio_pratos = array('q', [0])
+        self.pratos = array('i')
+
+    def adicionar(self, pedido):
+        restaurante = pedido.restaurante
+        posicoes = self.posicoes_prato.get(id(restaurante))
+        if posicoes is None or len(posicoes) != len(restaurante.cardapio):
+            posicoes = self.posicoes_prato[id(restaurante)] = {id(p): i for i, p in enumerate(restaurante.cardapio)}
+        self.ids.append(pedido.id)
+        self.cliente.append(self.posicao_cliente[id(pedido.cliente)])
+        self.restaurante.append(self.posicao_restaurante[id(restaurante)])
+        self.hora.append(pedido.hora)
+        self.prazo.append(pedido.prazo)
+        self.status.append(pedido.codigo_status)
+        self.pratos.extend(posicoes[id(prato)] for prato in pedido.pratos)
+        self.inicio_pratos.append(len(self.pratos))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, indice):
+        if not 0 <= indice < len(self.ids):
+            raise IndexError(indice)
+        return PedidoCompacto(self, indice)
+
+    def __iter__(self):
+        for indice in range(len(self.ids)):
+            yield PedidoCompacto(self, indice)
+
+class PedidoCompacto(PedidoBase):
+    # Visão de uma linha do ArmazemPedidos com a mesma interface de Pedido.
+    __slots__ = ('armazem', 'indice')
+
+    def __init__(self, armazem, indice):
+        self.armazem = armazem
+        self.indice = indice
+
+    @property
+    def id(self):
+        return self.armazem.ids[self.indice]
+
+    @property
+    def cliente(self):
+        return self.armazem.clientes[self.armazem.cliente[self.indice]]
+
+    @property
+    def restaurante(self):
+        return self.armazem.restaurantes[self.armazem.restaurante[self.indice]]
+
+    @property
+    def pratos(self):
+        armazem = self.armazem
+        cardapio = self.restaurante.cardapio
+        inicio, fim = armazem.inicio_pratos[self.indice], armazem.inicio_pratos[self.indice + 1]
+        return tuple(cardapio[i] for i in armazem.pratos[inicio:fim])
+
+    @property
+    def hora(self):
+        return self.armazem.hora[self.indice]
+
+    @hora.setter
+    def hora(self, valor):
+        self.armazem.hora[self.indice] = valor
+
+    @property
+    def prazo(self):
+        return self.armazem.prazo[self.indice]
+
+    @prazo.setter
+    def prazo(self, valor):
+        self.armazem.prazo[self.indice] = valor
+
+    @property
+    def codigo_status(self):
+        return self.armazem.status[self.indice]
+
+    @codigo_status.setter
+    def codigo_status(self, valor):
+        self.armazem.status[self.indice] = valor
+
+STATUS_ATIVOS = ('Em preparo', 'A caminho')
+PROXIMO_STATUS = {'Em preparo': 'A caminho', 'A caminho': 'Entregue'}
+
+# Transições automáticas: status atual -> (próximo status, segundos desde a hora do pedido)
+TRANSICOES_AUTOMATICAS = {
+    'Em preparo': ('A caminho', 10),
+    'A caminho': ('Entregue', 20),
+}
+
+class AgendadorStatus:
+    # Mantém apenas os pedidos ativos em um heap ordenado pelo horário da
+    # próxima transição. Entradas cujo pedido mudou de status por outro
+    # caminho são descartadas ao sair do heap.
+    def __init__(self):
+        self.heap = []
+
+    def agendar(self, pedido):
+        transicao = TRANSICOES_AUTOMATICAS.get(pedido.status)
+        if transicao:
+            espera = transicao[1]
+            heapq.heappush(self.heap, (pedido.hora + espera, pedido.id, pedido, pedido.status))
+
+    def vencidos(self, agora):
+        mudancas = []
+        while self.heap and self.heap[0][0] <= agora:
+            vencimento, _, pedido, status = heapq.heappop(self.heap)
+            if pedido.status == status:
+                mudancas.append((pedido, TRANSICOES_AUTOMATICAS[status][0], vencimento))
+        return mudancas
+
+    def __len__(self):
+        return len(self.heap)
+
+class MonitorPrazos:
+    # Prazos dos pedidos ativos em uma lista ordenada de (prazo, id,
+    # restaurante). Os atrasados são um prefixo da lista e os que vencem em
+    # uma janela, uma fatia; as duas pontas saem de buscas binárias. Cada
+    # restaurante tem também a sua lista de (prazo, id), da qual a fila de
+    # pedidos lê uma página por vez.
+    def __init__(self):
+        self.prazos = []
+        self.pedidos = {}
+        self.por_restaurante = {}
+
+    def atualizar(self, pedido):
+        ativo = pedido.status in STATUS_ATIVOS
+        if pedido.id in self.pedidos:
+            if not ativo:
+                del self.pedidos[pedido.id]
+                del self.prazos[bisect_left(self.prazos, (pedido.prazo, pedido.id))]
+                fila = self.por_restaurante[pedido.restaurante.nome]
+                del fila[bisect_left(fila, (pedido.prazo, pedido.id))]
+        elif ativo:
+            self.pedidos[pedido.id] = pedido
+            insort(self.prazos, (pedido.prazo, pedido.id, pedido.restaurante.nome))
+            insort(self.por_restaurante.setdefault(pedido.restaurante.nome, []), (pedido.prazo, pedido.id))
+
+    def fila(self, restaurante, inicio=0, quantidade=None):
+        # Pedidos ativos do restaurante, do prazo mais próximo ao mais distante.
+        prazos = self.por_restaurante.get(restaurante, [])
+        fim = len(prazos) if quantidade is None else inicio + quantidade
+        pedidos = self.pedidos
+        return [pedidos[i] for _, i in prazos[inicio:fim]]
+
+    def ativos(self, restaurante):
+        return len(self.por_restaurante.get(restaurante, ()))
+
+    def fim_atrasados(self, agora):
+        return bisect_left(self.prazos, (agora,))
+
+    def atrasados(self, agora, restaurante=None):
+        pedidos = self.pedidos
+        fatia = self.prazos[:self.fim_atrasados(agora)]
+        return [pedidos[i] for _, i, nome in fatia if restaurante is None or nome == restaurante]
+
+    def atrasados_por_restaurante(self, agora):
+        return Counter(map(itemgetter(2), self.prazos[:self.fim_atrasados(agora)]))
+
+    def vencendo(self, agora, segundos):
+        pedidos = self.pedidos
+        inicio = self.fim_atrasados(agora)
+        fim = bisect_left(self.prazos, (agora + segundos,), inicio)
+        return [pedidos[i] for _, i, _ in self.prazos[inicio:fim]]
+
+    def __len__(self):
+        return len(self.prazos)
+
+class EstimadorEntrega:
+    # Aprende, por restaurante, quanto duram o preparo e o transporte a
+    # partir das mudanças de status, com médias móveis exponenciais (e o
+    # desvio absoluto médio de cada uma) atualizadas em O(1) por evento. O
+    # preparo é medido por posição na fila: um pedido que entrou com q
+    # pedidos já em preparo conta (q + 1) unidades. Restaurantes com poucas
+    # amostras usam a estimativa geral.
+    ALFA = 0.2
+    AMOSTRAS_MINIMAS = 5
+    MARGEM_DESVIOS = 2
+
+    def __init__(self):
+        # [unidade de preparo, desvio, transporte, desvio, amostras de
+        #  preparo, amostras de transporte], em segundos.
+        self.geral = self.novas_medias()
+        self.restaurantes = {}
+        self.filas = {}
+        self.em_transporte = {}
+
+    def novas_medias(self):
+        return [PRAZO_PADRAO * 2 / 3, 0.0, PRAZO_PADRAO / 3, 0.0, 0, 0]
+
+    def atualizar_media(self, medias, indice, valor):
+        if medias[4 + indice // 2] == 0:
+            medias[indice] = valor
+            return
+        erro = valor - medias[indice]
+        medias[indice] += self.ALFA * erro
+        medias[indice + 1] += self.ALFA * (abs(erro) - medias[indice + 1])
+
+    def registrar_fila(self, pedido, fila):
+        self.filas[pedido.id] = fila
+
+    def observar(self, pedido, anterior, status, quando):
+        if anterior == status:
+            return
+        if status == 'A caminho':
+            fila = self.filas.pop(pedido.id, 0)
+            unidade = max(0, quando - pedido.hora) / (fila + 1)
+            for medias in (self.geral, self.restaurantes.setdefault(pedido.restaurante.nome, self.novas_medias())):
+                self.atualizar_media(medias, 0, unidade)
+                medias[4] += 1
+            self.em_transporte[pedido.id] = quando
+        elif status == 'Entregue':
+            self.filas.pop(pedido.id, None)
+            inicio = self.em_transporte.pop(pedido.id, None)
+            if inicio is None:
+                return
+            for medias in (self.geral, self.restaurantes.setdefault(pedido.restaurante.nome, self.novas_medias())):
+                self.atualizar_media(medias, 2, max(0, quando - inicio))
+                medias[5] += 1
+
+    def estimar(self, restaurante, fila):
+        # Segundos até a entrega de um pedido que entra agora atrás de `fila`
+        # pedidos em preparo, com uma margem proporcional aos desvios.
+        medias = self.restaurantes.get(restaurante, self.geral)
+        if medias[4] < self.AMOSTRAS_MINIMAS and self.geral[4] < self.AMOSTRAS_MINIMAS:
+            return PRAZO_PADRAO
+        preparo = medias if medias[4] >= self.AMOSTRAS_MINIMAS else self.geral
+        transporte = medias if medias[5] >= self.AMOSTRAS_MINIMAS else self.geral
+        estimativa = (fila + 1) * preparo[0] + transporte[2]
+        margem = self.MARGEM_DESVIOS * ((fila + 1) * preparo[1] + transporte[3])
+        return int(estimativa + margem)
+
+    def estado(self):
+        arredondar = lambda medias: [round(v, 2) for v in medias]
+        return {
+            'geral': arredondar(self.geral),
+            'restaurantes': {nome: arredondar(medias) for nome, medias in self.restaurantes.items()},
+            'em_transporte': {str(i): quando for i, quando in self.em_transporte.items()},
+        }
+
+    def restaurar(self, estado):
+        self.geral = estado.get('geral', self.geral)
+        self.restaurantes.update(estado.get('restaurantes', {}))
+        self.em_transporte.update((int(i), quando) for i, quando in estado.get('em_transporte', {}).items())
+
+class IndicePedidos:
+    # Índice secundário de pedidos por dono (nome do cliente ou restaurante):
+    # a lista completa em ordem de chegada e, separadamente, os pedidos de
+    # cada status indexados por id.
+    def __init__(self):
+        self.todos = {}
+        self.por_status = {}
+
+    def adicionar(self, chave, pedido):
+        self.todos.setdefault(chave, []).append(pedido)
+        self.por_status.setdefault(chave, {}).setdefault(pedido.status, {})[pedido.id] = pedido
+
+    def mover(self, chave, pedido, anterior):
+        grupos = self.por_status[chave]
+        grupos[anterior].pop(pedido.id, None)
+        grupos.setdefault(pedido.status, {})[pedido.id] = pedido
+
+    def remover(self, chave, pedidos):
+        ids = {pedido.id for pedido in pedidos}
+        self.todos[chave] = [p for p in self.todos[chave] if p.id not in ids]
+        grupos = self.por_status[chave]
+        for pedido in pedidos:
+            grupos.get(pedido.status, {}).pop(pedido.id, None)
+
+    def consultar(self, chave, status=None, limite=None):
+        if status is None:
+            pedidos = self.todos.get(chave, [])
+        else:
+            grupos = self.por_status.get(chave, {})
+            pedidos = sorted((p for s in status for p in grupos.get(s, {}).values()), key=lambda p: p.id)
+        if limite is not None:
+            pedidos = pedidos[-limite:] if limite > 0 else []
+        return pedidos
+
+    def contar(self, chave, status):
+        return len(self.por_status.get(chave, {}).get(status, {}))
+
+class ContagemOrdenada:
+    # Contagens agrupadas por valor, com os valores distintos em ordem
+    # crescente: o top-k percorre só os maiores grupos, sem ordenar os itens.
+    # Os grupos só são montados na primeira consulta, para que a carga do
+    # histórico pague apenas o custo de um dicionário de contagens.
+    def __init__(self):
+        self.contagem = {}
+        self.grupos = {}
+        self.valores = None
+
+    def organizar(self):
+        if self.valores is None:
+            self.valores = []
+            for item, valor in sorted(self.contagem.items(), key=lambda par: par[1]):
+                self.colocar_no_grupo(item, valor)
+
+    def incrementar(self, item, quantidade=1):
+        atual = self.contagem.get(item, 0)
+        self.contagem[item] = atual + quantidade
+        if self.valores is not None:
+            if atual:
+                self.retirar_do_grupo(item, atual)
+            self.colocar_no_grupo(item, atual + quantidade)
+
+    def remover(self, item):
+        self.organizar()
+        self.retirar_do_grupo(item, self.contagem.pop(item))
+
+    def decrementar(self, item, quantidade=1):
+        atual = self.contagem.get(item)
+        if atual is None:
+            return
+        if atual <= quantidade:
+            self.remover(item)
+        else:
+            self.incrementar(item, -quantidade)
+
+    def colocar_no_grupo(self, item, valor):
+        grupo = self.grupos.get(valor)
+        if grupo is None:
+            grupo = self.grupos[valor] = {}
+            insort(self.valores, valor)
+        grupo[item] = None
+
+    def retirar_do_grupo(self, item, valor):
+        grupo = self.grupos[valor]
+        del grupo[item]
+        if not grupo:
+            del self.grupos[valor]
+            del self.valores[bisect_left(self.valores, valor)]
+
+    def minimo(self):
+        self.organizar()
+        valor = self.valores[0]
+        return next(iter(self.grupos[valor])), valor
+
+    def mais_comuns(self, n):
+        self.organizar()
+        resultado = []
+        for valor in reversed(self.valores):
+            for item in self.grupos[valor]:
+                if len(resultado) == n:
+                    return resultado
+                resultado.append((item, valor))
+        return resultado
+
+    def __len__(self):
+        return len(self.contagem)
+
+class SpaceSaving(ContagemOrdenada):
+    # Variante de memória limitada (algoritmo Space-Saving): guarda no máximo
+    # `capacidade` itens; um item novo substitui o de menor contagem e herda
+    # essa contagem, que fica registrada como erro máximo da estimativa.
+    def __init__(self, capacidade):
+        super().__init__()
+        self.organizar()
+        self.capacidade = capacidade
+        self.erro = {}
+
+    def incrementar(self, item, quantidade=1):
+        if item not in self.contagem and len(self.contagem) >= self.capacidade:
+            removido, minimo = self.minimo()
+            self.remover(removido)
+            self.erro.pop(removido, None)
+            self.erro[item] = minimo
+            super().incrementar(item, minimo + quantidade)
+        else:
+            super().incrementar(item, quantidade)
+
+class Agregados:
+    # Estatísticas do painel do administrador, atualizadas a cada pedido
+    # incluído. Com `capacidade`, os rankings de pratos usam Space-Saving.
+    def __init__(self, capacidade=None):
+        self.capacidade = capacidade
+        self.pratos = self.nova_contagem()
+        self.pratos_por_restaurante = {}
+        self.pedidos_por_restaurante = Counter()
+        self.receita_por_restaurante = Counter()
+        self.total_pedidos = 0
+
+    def nova_contagem(self):
+        return SpaceSaving(self.capacidade) if self.capacidade else ContagemOrdenada()
+
+    def registrar_pedido(self, pedido):
+        restaurante = pedido.restaurante.nome
+        pratos_restaurante = self.pratos_por_restaurante.get(restaurante)
+        if pratos_restaurante is None:
+            pratos_restaurante = self.pratos_por_restaurante[restaurante] = self.nova_contagem()
+        for prato in pedido.pratos:
+            self.pratos.incrementar(prato.nome)
+            pratos_restaurante.incrementar(prato.nome)
+            self.receita_por_restaurante[restaurante] += prato.preco
+        self.pedidos_por_restaurante[restaurante] += 1
+        self.total_pedidos += 1
+
+    def descontar_pedido(self, pedido):
+        restaurante = pedido.restaurante.nome
+        pratos_restaurante = self.pratos_por_restaurante.get(restaurante)
+        for prato in pedido.pratos:
+            self.pratos.decrementar(prato.nome)
+            if pratos_restaurante is not None:
+                pratos_restaurante.decrementar(prato.nome)
+            self.receita_por_restaurante[restaurante] -= prato.preco
+        self.pedidos_por_restaurante[restaurante] -= 1
+        self.total_pedidos -= 1
+
+    def registrar_resumo(self, restaurante, resumo):
+        # Totais de pedidos que já estão no arquivo (ver ArquivoPedidos).
+        pratos_restaurante = self.pratos_por_restaurante.get(restaurante)
+        if pratos_restaurante is None:
+            pratos_restaurante = self.pratos_por_restaurante[restaurante] = self.nova_contagem()
+        for prato, (quantidade, _) in resumo['pratos'].items():
+            self.pratos.incrementar(prato, quantidade)
+            pratos_restaurante.incrementar(prato, quantidade)
+        self.receita_por_restaurante[restaurante] += resumo['receita']
+        self.pedidos_por_restaurante[restaurante] += resumo['pedidos']
+        self.total_pedidos += resumo['pedidos']
+
+    def mais_pedidos(self, n, restaurante=None):
+        if restaurante is None:
+            return self.pratos.mais_comuns(n)
+        contagem = self.pratos_por_restaurante.get(restaurante)
+        return contagem.mais_comuns(n) if contagem else []
+
+class VendasPorPeriodo:
+    # Vendas materializadas por restaurante em baldes de uma hora e de um dia
+    # (data local). Cada balde guarda [pedidos, receita]; os diários guardam
+    # também, por prato, [quantidade, receita]. Consultas de intervalo somam
+    # só os baldes do intervalo, sem percorrer os pedidos.
+    def __init__(self):
+        self.horas = {}
+        self.dias = {}
+        self.dia_da_hora = {}
+
+    def dia(self, hora):
+        dia = self.dia_da_hora.get(hora)
+        if dia is None:
+            dia = self.dia_da_hora[hora] = datetime.fromtimestamp(hora * 3600).toordinal()
+        return dia
+
+    def balde_dia(self, restaurante, dia):
+        dias = self.dias.get(restaurante)
+        if dias is None:
+            dias = self.dias[restaurante] = {}
+        balde = dias.get(dia)
+        if balde is None:
+            balde = dias[dia] = [0, 0.0, {}]
+        return balde
+
+    def baldes(self, restaurante, hora):
+        horas = self.horas.get(restaurante)
+        if horas is None:
+            horas = self.horas[restaurante] = {}
+        balde_hora = horas.get(hora)
+        if balde_hora is None:
+            balde_hora = horas[hora] = [0, 0.0]
+        return balde_hora, self.balde_dia(restaurante, self.dia(hora))
+
+    def registrar_resumo(self, restaurante, dia, resumo):
+        # Totais de um dia já arquivado; desses pedidos não há baldes por hora.
+        balde = self.balde_dia(restaurante, dia)
+        balde[0] += resumo['pedidos']
+        balde[1] += resumo['receita']
+        for nome, (quantidade, receita) in resumo['pratos'].items():
+            contagem = balde[2].get(nome)
+            if contagem is None:
+                contagem = balde[2][nome] = [0, 0.0]
+            contagem[0] += quantidade
+            contagem[1] += receita
+
+    def registrar_pedido(self, pedido, sinal=1):
+        # `sinal` -1 desconta um pedido já registrado.
+        balde_hora, balde_dia = self.baldes(pedido.restaurante.nome, pedido.hora // 3600)
+        por_prato = balde_dia[2]
+        receita = 0.0
+        for prato in pedido.pratos:
+            receita += prato.preco
+            contagem = por_prato.get(prato.nome)
+            if contagem is None:
+                contagem = por_prato[prato.nome] = [0, 0.0]
+            contagem[0] += sinal
+            contagem[1] += sinal * prato.preco
+        balde_hora[0] += sinal
+        balde_hora[1] += sinal * receita
+        balde_dia[0] += sinal
+        balde_dia[1] += sinal * receita
+
+    @classmethod
+    def de_armazem(cls, armazem):
+        # Reconstrói os baldes a partir das colunas de um ArmazemPedidos numa
+        # passada, com map/zip/accumulate sobre as colunas em vez de um laço
+        # por pedido. Cada item vira um índice global de prato (deslocamento
+        # do restaurante + posição no cardápio). Os pedidos são ordenados pela
+        # chave (restaurante, hora) combinada num inteiro, e a receita de cada
+        # balde é a diferença das somas acumuladas nas fronteiras. As vendas
+        # por prato e dia saem de um Counter sobre (dia, prato). Só há laços
+        # Python sobre baldes distintos.
+        vendas = cls()
+        restaurantes = armazem.restaurantes
+        horas = list(map(floordiv, armazem.hora, repeat(3600)))
+        for hora in set(horas):
+            vendas.dia(hora)
+        dias = list(map(vendas.dia_da_hora.__getitem__, horas))
+        inicios = armazem.inicio_pratos
+        quantidades = list(map(sub, inicios[1:], inicios[:-1]))
+        deslocamentos = list(accumulate((len(r.cardapio) for r in restaurantes), initial=0))
+        pratos = [(r, prato) for r in restaurantes for prato in r.cardapio]
+        precos = [prato.preco for _, prato in pratos]
+        globais = list(map(add, map(deslocamentos.__getitem__,
+                                    chain.from_iterable(map(repeat, armazem.restaurante, quantidades))),
+                           armazem.pratos))
+        por_item = list(accumulate(map(precos.__getitem__, globais), initial=0.0))
+        receitas = list(map(sub, map(por_item.__getitem__, inicios[1:]), map(por_item.__getitem__, inicios[:-1])))
+
+        chaves = list(map(add, map(mul, armazem.restaurante, repeat(1 << 32)), horas))
+        ordem = sorted(range(len(chaves)), key=chaves.__getitem__)
+        acumulado = list(accumulate(map(receitas.__getitem__, ordem), initial=0.0))
+        contagem = Counter(chaves)
+        fim = 0
+        for chave in sorted(contagem):
+            n = contagem[chave]
+            inicio, fim = fim, fim + n
+            restaurante, hora = divmod(chave, 1 << 32)
+            balde_hora, balde_dia = vendas.baldes(restaurantes[restaurante].nome, hora)
+            receita = acumulado[fim] - acumulado[inicio]
+            balde_hora[0] += n
+            balde_hora[1] += receita
+            balde_dia[0] += n
+            balde_dia[1] += receita
+
+        total_pratos = len(pratos) or 1
+        itens = Counter(map(add, map(mul, chain.from_iterable(map(repeat, dias, quantidades)), repeat(total_pratos)), globais))
+        for chave, n in itens.items():
+            dia, indice = divmod(chave, total_pratos)
+            restaurante, prato = pratos[indice]
+            por_prato = vendas.dias[restaurante.nome][dia][2]
+            contagem = por_prato.get(prato.nome)
+            if contagem is None:
+                contagem = por_prato[prato.nome] = [0, 0.0]
+            contagem[0] += n
+            contagem[1] += n * prato.preco
+        return vendas
+
+    # --- Consultas ---
+    # `restaurante` None soma todos os restaurantes.
+    def selecionar(self, baldes, restaurante):
+        if restaurante is None:
+            return list(baldes.values())
+        return [baldes[restaurante]] if restaurante in baldes else []
+
+    def por_hora(self, inicio, fim, restaurante=None):
+        # [(hora, pedidos, receita)] de cada hora em [inicio, fim), em segundos.
+        selecionados = self.selecionar(self.horas, restaurante)
+        resultado = []
+        for hora in range(inicio // 3600, -(-fim // 3600)):
+            pedidos, receita = 0, 0.0
+            for horas in selecionados:
+                balde = horas.get(hora)
+                if balde:
+                    pedidos += balde[0]
+                    receita += balde[1]
+            resultado.append((hora * 3600, pedidos, receita))
+        return resultado
+
+    def por_dia(self, primeiro, ultimo, restaurante=None):
+        # [(data, pedidos, receita)] de cada dia entre as datas, inclusive.
+        selecionados = self.selecionar(self.dias, restaurante)
+        resultado = []
+        for dia in range(primeiro.toordinal(), ultimo.toordinal() + 1):
+            pedidos, receita = 0, 0.0
+            for dias in selecionados:
+                balde = dias.get(dia)
+                if balde:
+                    pedidos += balde[0]
+                    receita += balde[1]
+            resultado.append((date.fromordinal(dia), pedidos, receita))
+        return resultado
+
+    def pratos(self, primeiro, ultimo, restaurante=None, n=5):
+        # [(prato, quantidade, receita)] dos n pratos de maior receita no período.
+        quantidade, receita = Counter(), Counter()
+        for dias in self.selecionar(self.dias, restaurante):
+            for dia in range(primeiro.toordinal(), ultimo.toordinal() + 1):
+                balde = dias.get(dia)
+                if balde:
+                    for nome, (q, r) in balde[2].items():
+                        quantidade[nome] += q
+                        receita[nome] += r
+        return [(nome, quantidade[nome], total) for nome, total in receita.most_common(n)]
+
+    def restaurantes(self, primeiro, ultimo):
+        # [(restaurante, pedidos, receita)] no período, por receita.
+        resultado = []
+        for restaurante in self.dias:
+            totais = self.por_dia(primeiro, ultimo, restaurante)
+            resultado.append((restaurante, sum(t[1] for t in totais), sum(t[2] for t in totais)))
+        resultado.sort(key=itemgetter(2), reverse=True)
+        return resultado
+
+PALAVRAS_VAZIAS = frozenset(('a', 'o', 'e', 'as', 'os', 'de', 'da', 'do', 'das', 'dos', 'com', 'sem', 'em',
+                             'na', 'no', 'nas', 'nos', 'ao', 'aos', 'para', 'por', 'um', 'uma'))
+
+def termos_busca(texto):
+    # Minúsculas, sem acentos (ç vira c) e sem palavras vazias.
+    texto = texto.lower()
+    if not texto.isascii():
+        texto = unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode()
+    return [termo for termo in re.findall(r'[a-z0-9]+', texto) if termo not in PALAVRAS_VAZIAS]
+
+class IndiceBusca:
+    # Índice invertido dos pratos de todos os cardápios: cada termo do nome
+    # e da descrição aponta para as posições dos pratos em `pratos`. Os
+    # termos distintos ficam também em uma lista ordenada, onde os que
+    # começam com um prefixo formam uma faixa contínua. Cada termo tem ainda
+    # as posições separadas por faixa de preço (em escala logarítmica, cerca
+    # de 13% de largura), usadas quando o filtro de preço cobre poucas faixas.
+    FAIXAS_POR_UNIDADE_LOG = 8
+    MAXIMO_FAIXAS = 6
+
+    def __init__(self):
+        self.pratos = []
+        self.precos = array('d')
+        self.postagens = {}
+        self.postagens_preco = {}
+        self.faixas = set()
+        self.termos = []
+
+    def faixa(self, preco):
+        return int(math.log1p(max(preco, 0)) * self.FAIXAS_POR_UNIDADE_LOG)
+
+    def adicionar(self, restaurante, prato):
+        posicao = len(self.pratos)
+        self.pratos.append((restaurante, prato))
+        self.precos.append(prato.preco)
+        faixa = self.faixa(prato.preco)
+        self.faixas.add(faixa)
+        for termo in set(termos_busca(f'{prato.nome} {prato.descricao or ""}')):
+            postagem = self.postagens.get(termo)
+            if postagem is None:
+                postagem = self.postagens[termo] = array('i')
+                insort(self.termos, termo)
+            postagem.append(posicao)
+            postagem = self.postagens_preco.get((termo, faixa))
+            if postagem is None:
+                postagem = self.postagens_preco[(termo, faixa)] = array('i')
+            postagem.append(posicao)
+
+    def faixas_do_filtro(self, minimo, maximo):
+        # Faixas de preço que cobrem [minimo, maximo], ou None quando são
+        # tantas que percorrer as postagens inteiras sai mais barato.
+        if not self.faixas:
+            return None
+        primeira = max(self.faixa(minimo), min(self.faixas)) if minimo is not None else min(self.faixas)
+        ultima = min(self.faixa(maximo), max(self.faixas)) if maximo is not None else max(self.faixas)
+        if ultima - primeira + 1 > self.MAXIMO_FAIXAS:
+            return None
+        return range(primeira, ultima + 1)
+
+    def com_prefixo(self, prefixo, faixas=None):
+        termos = self.termos
+        inicio = i = bisect_left(termos, prefixo)
+        while i < len(termos) and termos[i].startswith(prefixo):
+            i += 1
+        if faixas is None:
+            return [self.postagens[termo] for termo in termos[inicio:i]]
+        return [self.postagens_preco[(termo, faixa)] for termo in termos[inicio:i] for faixa in faixas
+                if (termo, faixa) in self.postagens_preco]
+
+    def proximo(self, postagens, posicao):
+        # Menor posição >= `posicao` em alguma das postagens (já ordenadas).
+        menor = None
+        for postagem in postagens:
+            i = bisect_left(postagem, posicao)
+            if i < len(postagem) and (menor is None or postagem[i] < menor):
+                menor = postagem[i]
+        return menor
+
+    def buscar(self, consulta, preco_minimo=None, preco_maximo=None, limite=20):
+        # Todos os termos da consulta precisam aparecer no prato, cada um
+        # como prefixo de alguma palavra. As postagens são percorridas juntas
+        # saltando por busca binária até a próxima posição comum, e a busca
+        # para ao juntar `limite` pratos, em ordem de cadastro. Com filtro de
+        # preço estreito, só as postagens das faixas de preço dele entram.
+        termos = termos_busca(consulta)
+        if not termos:
+            return []
+        faixas_preco = None
+        if preco_minimo is not None or preco_maximo is not None:
+            faixas_preco = self.faixas_do_filtro(preco_minimo, preco_maximo)
+        faixas = sorted((self.com_prefixo(termo, faixas_preco) for termo in set(termos)), key=lambda p: sum(map(len, p)))
+        minimo = float('-inf') if preco_minimo is None else preco_minimo
+        maximo = float('inf') if preco_maximo is None else preco_maximo
+        resultado = []
+        candidato = 0
+        while len(resultado) < limite:
+            comum = True
+            for postagens in faixas:
+                proximo = self.proximo(postagens, candidato)
+                if proximo is None:
+                    return resultado
+                if proximo != candidato:
+                    candidato = proximo
+                    comum = False
+            if comum:
+                if minimo <= self.precos[candidato] <= maximo:
+                    resultado.append(self.pratos[candidato])
+                candidato += 1
+        return resultado
+
+    def __len__(self):
+        return len(self.pratos)
+
+class LeitorSnapshot:
+    # Leitura incremental do snapshot JSON em blocos de tamanho fixo. `chaves`
+    # devolve cada chave do objeto principal; quem chama consome o valor com
+    # `valor()` ou, para listas grandes, item a item com `itens()`.
+    ESPACOS = re.compile(r'[ \t\r\n]*')
+
+    def __init__(self, arquivo, tamanho_bloco=1 << 16):
+        self.arquivo = arquivo
+        self.tamanho_bloco = tamanho_bloco
+        self.decodificador = json.JSONDecoder()
+        self.buffer = ''
+        self.posicao = 0
+        self.fim = False
+
+    def ler_bloco(self):
+        self.buffer = self.buffer[self.posicao:]
+        self.posicao = 0
+        bloco = self.arquivo.read(max(self.tamanho_bloco, len(self.buffer)))
+        if not bloco:
+            self.fim = True
+        self.buffer += bloco
+
+    def proximo_caractere(self):
+        while True:
+            self.posicao = self.ESPACOS.match(self.buffer, self.posicao).end()
+            if self.posicao < len(self.buffer):
+                return self.buffer[self.posicao]
+            if self.fim:
+                raise ValueError(f'Fim inesperado de {self.arquivo.name}')
+            self.ler_bloco()
+
+    def consumir(self, esperado):
+        encontrado = self.proximo_caractere()
+        if encontrado != esperado:
+            raise ValueError(f'Esperado {esperado!r} em {self.arquivo.name}, encontrado {encontrado!r}')
+        self.posicao += 1
+
+    def valor(self):
+        self.proximo_caractere()
+        while True:
+            try:
+                valor, fim = self.decodificador.raw_decode(self.buffer, self.posicao)
+                # Um número no fim do buffer pode estar cortado ao meio.
+                if fim < len(self.buffer) or self.fim:
+                    self.posicao = fim
+                    return valor
+            except json.JSONDecodeError:
+                if self.fim:
+                    raise
+            self.ler_bloco()
+
+    def itens(self):
+        self.consumir('[')
+        if self.proximo_caractere() == ']':
+            self.posicao += 1
+            return
+        while True:
+            yield self.valor()
+            if self.proximo_caractere() != ',':
+                break
+            self.posicao += 1
+        self.consumir(']')
+
+    def chaves(self):
+        self.consumir('{')
+        if self.proximo_caractere() == '}':
+            self.posicao += 1
+            return
+        while True:
+            chave = self.valor()
+            self.consumir(':')
+            yield chave
+            if self.proximo_caractere() != ',':
+                break
+            self.posicao += 1
+        self.consumir('}')
+
+class CopiaSnapshot:
+    # O que a compactação grava, copiado com `sistema.trava` para que a
+    # gravação possa seguir sem ela. Basta copiar as listas: cardápios só
+    # crescem (guarda-se o tamanho) e o status é o único campo de um pedido
+    # que muda depois da inclusão. Uma troca de senha feita depois da cópia
+    # pode entrar no snapshot, mas o diário a reaplica com o mesmo valor.
+    def __init__(self, sistema, sequencia):
+        self.sequencia = sequencia
+        self.clientes = list(sistema.clientes)
+        self.restaurantes = list(sistema.restaurantes)
+        self.tamanhos_cardapio = [len(restaurante.cardapio) for restaurante in self.restaurantes]
+        self.pedidos = list(sistema.pedidos)
+        self.codigos_status = array('b', [pedido.codigo_status for pedido in self.pedidos])
+        self.extras = sistema.extras()
+
+    def restaurantes_dict(self):
+        return [restaurante_para_dict(restaurante, tamanho)
+                for restaurante, tamanho in zip(self.restaurantes, self.tamanhos_cardapio)]
+
+    def pedidos_dict(self):
+        for pedido, codigo in zip(self.pedidos, self.codigos_status):
+            dados = pedido.to_dict()
+            dados['status'] = STATUS[codigo]
+            yield dados
+
+class ArmazenamentoJSON:
+    # Snapshot JSON (`arquivo`) mais um diário de mutações (`arquivo.log`),
+    # uma linha por evento. `salvar` é a compactação: grava o snapshot de forma
+    # atômica e descarta o diário. A sequência gravada no snapshot permite
+    # ignorar entradas já incorporadas caso o processo caia entre os dois
+    # passos.
+    def __init__(self, arquivo='delivery.data', usar_diario=True, limite_diario=500):
+        self.arquivo = arquivo
+        self.arquivo_diario = arquivo + '.log'
+        self.usar_diario = usar_diario
+        self.limite_diario = limite_diario
+        self.sequencia = 0
+        self.entradas_diario = 0
+
+    def registrar(self, sistema, tipo, dados):
+        self.registrar_lote(sistema, [(tipo, dados)])
+
+    def registrar_lote(self, sistema, eventos):
+        self.preparar_lote(sistema, eventos)()
+
+    def preparar_lote(self, sistema, eventos):
+        # Parte feita com `sistema.trava`: numera os eventos e, se a
+        # compactação venceu, copia o estado. A função devolvida faz a
+        # gravação e pode rodar sem a trava (ver ArmazenamentoDiferido).
+        if not self.usar_diario:
+            copia = CopiaSnapshot(sistema, self.sequencia)
+            return lambda: self.salvar_copia(copia)
+        linhas = []
+        for tipo, dados in eventos:
+            self.sequencia += 1
+            linhas.append(json.dumps({'seq': self.sequencia, 'tipo': tipo, 'dados': dados}) + '\n')
+        self.entradas_diario += len(linhas)
+        # O limite cresce com o histórico para que o custo da compactação,
+        # proporcional ao total de dados, fique amortizado por mutação.
+        copia = None
+        if sistema.carregado.is_set() and self.entradas_diario >= max(self.limite_diario, len(sistema.pedidos)):
+            copia = CopiaSnapshot(sistema, self.sequencia)
+
+        def gravar():
+            texto = ''.join(linhas)
+            with open(self.arquivo_diario, 'a') as f:
+                f.write(texto)
+            if metricas.ativo:
+                metricas.contar('bytes_gravados_diario', len(texto.encode()))
+                metricas.contar('eventos_gravados', len(linhas))
+            if copia is not None:
+                self.salvar_copia(copia)
+
+        return gravar
+
+    # Um único processo por arquivo e gravação imediata: não há o que
+    # sincronizar, reservar, descarregar nem fechar.
+    def sincronizar(self, sistema):
+        pass
+
+    def reservar_ids(self, sistema, quantidade):
+        return sistema.proximo_id
+
+    def flush(self):
+        pass
+
+    def lider(self):
+        return True
+
+    def fechar(self):
+        pass
+
+    def salvar(self, sistema):
+        self.salvar_copia(CopiaSnapshot(sistema, self.sequencia))
+
+    @metricas.medir('compactacao')
+    def salvar_copia(self, copia):
+        temporario = self.arquivo + '.tmp'
+        self.gravar_snapshot(copia, temporario)
+        metricas.contar('bytes_gravados_snapshot', os.path.getsize(temporario))
+        os.replace(temporario, self.arquivo)
+        if os.path.exists(self.arquivo_diario):
+            os.remove(self.arquivo_diario)
+        self.entradas_diario = 0
+
+    def gravar_snapshot(self, copia, caminho):
+        # Os pedidos vão por último para que o LeitorSnapshot possa adiar a
+        # leitura deles.
+        dados = {
+            'sequencia': copia.sequencia,
+            'clientes': [cliente.__dict__ for cliente in copia.clientes],
+            'restaurantes': copia.restaurantes_dict(),
+            'extras': copia.extras,
+            'pedidos': list(copia.pedidos_dict())
+        }
+        with open(caminho, 'w') as f:
+            json.dump(dados, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def carregar(self, sistema):
+        # Clientes, restaurantes e as entradas do diário que não envolvem
+        # pedidos são aplicados já; o histórico de pedidos é lido em fluxo
+        # pela função devolvida, e só então o restante do diário é reaplicado.
+        pedidos = self.ler_snapshot(sistema) if os.path.exists(self.arquivo) else ()
+        adiadas = []
+        for tipo, dados in self.ler_diario():
+            if tipo in ('pedido', 'status', 'arquivados'):
+                adiadas.append((tipo, dados))
+            else:
+                sistema.aplicar(tipo, dados)
+
+        def carregar_pedidos():
+            for pedido in pedidos:
+                sistema.incluir_pedido(pedido)
+            for tipo, dados in adiadas:
+                sistema.aplicar(tipo, dados)
+
+        return carregar_pedidos
+
+    def ler_snapshot(self, sistema):
+        # Inclui clientes e restaurantes e devolve um gerador dos pedidos.
+        arquivo = open(self.arquivo, 'r')
+        leitor = LeitorSnapshot(arquivo)
+        for chave in leitor.chaves():
+            if chave == 'pedidos':
+                return self.ler_pedidos(sistema, arquivo, leitor.itens())
+            valor = leitor.valor()
+            if chave == 'sequencia':
+                self.sequencia = valor
+            elif chave == 'clientes':
+                for c in valor:
+                    sistema.incluir_cliente(cliente_de_dict(c))
+            elif chave == 'restaurantes':
+                for r in valor:
+                    sistema.incluir_restaurante(restaurante_de_dict(r))
+            elif chave == 'extras':
+                sistema.restaurar_extras(valor)
+        arquivo.close()
+        return ()
+
+    def ler_pedidos(self, sistema, arquivo, itens):
+        try:
+            for p in itens:
+                yield sistema.pedido_de_dict(p)
+        finally:
+            arquivo.close()
+
+    def ler_diario(self):
+        entradas = []
+        if not os.path.exists(self.arquivo_diario):
+            return entradas
+        valido = 0
+        with open(self.arquivo_diario, 'rb') as f:
+            for linha in f:
+                try:
+                    entrada = json.loads(linha)
+                except ValueError:
+                    # Linha truncada por uma queda durante a escrita.
+                    break
+                valido += len(linha)
+                self.entradas_diario += 1
+                if entrada['seq'] <= self.sequencia:
+                    continue
+                self.sequencia = entrada['seq']
+                entradas.append((entrada['tipo'], entrada['dados']))
+        if valido < os.path.getsize(self.arquivo_diario):
+            with open(self.arquivo_diario, 'r+b') as f:
+                f.truncate(valido)
+        return entradas
+
+class ArmazenamentoColunar(ArmazenamentoJSON):
+    # Mesmo diário do ArmazenamentoJSON, mas o snapshot é binário: um
+    # cabeçalho JSON com clientes e restaurantes seguido das colunas de um
+    # ArmazemPedidos, na ordem de COLUNAS_SNAPSHOT. Na abertura o arquivo é
+    # mapeado em memória e os pedidos viram visões (PedidoCompacto) sobre as
+    # colunas, sem copiar nem converter datas. O mapeamento é privado, então
+    # mudanças de status ficam só na memória até a próxima compactação.
+    MAGICO = b'DLVCOL01'
+    COLUNAS_SNAPSHOT = (
+        ('ids', 'q'), ('hora', 'q'), ('prazo', 'q'), ('inicio_pratos', 'q'),
+        ('cliente', 'i'), ('restaurante', 'i'), ('pratos', 'i'), ('status', 'b'),
+    )
+
+    def __init__(self, arquivo='delivery.col', usar_diario=True, limite_diario=500):
+        super().__init__(arquivo, usar_diario, limite_diario)
+
+    def gravar_snapshot(self, copia, caminho):
+        armazem = ArmazemPedidos(copia.clientes, copia.restaurantes)
+        for pedido in copia.pedidos:
+            armazem.adicionar(pedido)
+        armazem.status = copia.codigos_status
+        cabecalho = json.dumps({
+            'sequencia': copia.sequencia,
+            'ordem_bytes': sys.byteorder,
+            'pedidos': len(armazem),
+            'itens': len(armazem.pratos),
+            'clientes': [cliente.__dict__ for cliente in copia.clientes],
+            'restaurantes': copia.restaurantes_dict(),
+            'extras': copia.extras,
+        }).encode()
+        # As colunas começam alinhadas em 8 bytes e vão das mais largas para
+        # as mais estreitas, então continuam alinhadas umas após as outras.
+        with open(caminho, 'wb') as f:
+            f.write(self.MAGICO)
+            f.write(len(cabecalho).to_bytes(8, 'little'))
+            f.write(cabecalho)
+            f.write(bytes(-f.tell() % 8))
+            for nome, _ in self.COLUNAS_SNAPSHOT:
+                getattr(armazem, nome).tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def ler_snapshot(self, sistema):
+        with open(self.arquivo, 'rb') as f:
+            mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        if mapa[:8] != self.MAGICO:
+            raise ValueError(f"{self.arquivo} não é um snapshot colunar")
+        tamanho = int.from_bytes(mapa[8:16], 'little')
+        cabecalho = json.loads(mapa[16:16 + tamanho])
+        if cabecalho['ordem_bytes'] != sys.byteorder:
+            raise ValueError(f"{self.arquivo} foi gravado com ordem de bytes {cabecalho['ordem_bytes']}")
+        self.sequencia = cabecalho['sequencia']
+        clientes = [cliente_de_dict(c) for c in cabecalho['clientes']]
+        restaurantes = [restaurante_de_dict(r) for r in cabecalho['restaurantes']]
+        for cliente in clientes:
+            sistema.incluir_cliente(cliente)
+        for restaurante in restaurantes:
+            sistema.incluir_restaurante(restaurante)
+        sistema.restaurar_extras(cabecalho.get('extras', {}))
+
+        armazem = ArmazemPedidos(clientes, restaurantes)
+        quantidades = {'inicio_pratos': cabecalho['pedidos'] + 1, 'pratos': cabecalho['itens']}
+        memoria = memoryview(mapa)
+        posicao = 16 + tamanho + (-(16 + tamanho) % 8)
+        for nome, tipo in self.COLUNAS_SNAPSHOT:
+            fim = posicao + quantidades.get(nome, cabecalho['pedidos']) * array(tipo).itemsize
+            if fim > len(mapa):
+                raise ValueError(f"{self.arquivo} está truncado")
+            setattr(armazem, nome, memoria[posicao:fim].cast(tipo))
+            posicao = fim
+        return armazem
+
+ESQUEMA_SQLITE = """
+CREATE TABLE IF NOT EXISTS clientes (
+    id INTEGER PRIMARY KEY,
+    nome TEXT NOT NULL,
+    telefone TEXT, endereco TEXT, email TEXT, cpf TEXT, senha TEXT, resposta_secreta TEXT
+);
+CREATE TABLE IF NOT EXISTS restaurantes (
+    id INTEGER PRIMARY KEY,
+    nome TEXT NOT NULL,
+    telefone TEXT, endereco TEXT, email TEXT, cpf TEXT, senha TEXT, resposta_secreta TEXT
+);
+CREATE TABLE IF NOT EXISTS pratos (
+    restaurante_id INTEGER NOT NULL REFERENCES restaurantes(id),
+    posicao INTEGER NOT NULL,
+    nome TEXT NOT NULL,
+    preco REAL NOT NULL,
+    descricao TEXT,
+    imagem TEXT,
+    PRIMARY KEY (restaurante_id, posicao)
+);
+CREATE TABLE IF NOT EXISTS pedidos (
+    id INTEGER PRIMARY KEY,
+    cliente_id INTEGER NOT NULL REFERENCES clientes(id),
+    restaurante_id INTEGER NOT NULL REFERENCES restaurantes(id),
+    hora INTEGER NOT NULL,
+    prazo INTEGER NOT NULL,
+    status INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS itens_pedido (
+    pedido_id INTEGER NOT NULL REFERENCES pedidos(id),
+    posicao INTEGER NOT NULL,
+    prato INTEGER NOT NULL,
+    PRIMARY KEY (pedido_id, posicao)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS extras (
+    chave TEXT PRIMARY KEY,
+    valor TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS clientes_nome ON clientes(nome);
+CREATE INDEX IF NOT EXISTS restaurantes_nome ON restaurantes(nome);
+CREATE INDEX IF NOT EXISTS pedidos_cliente ON pedidos(cliente_id, status);
+CREATE INDEX IF NOT EXISTS pedidos_restaurante ON pedidos(restaurante_id, status);
+"""
+
+CAMPOS_USUARIO = ('nome', 'telefone', 'endereco', 'email', 'cpf', 'senha', 'resposta_secreta')
+
+class ArmazenamentoSQLite:
+    # Banco SQLite em modo WAL. Cada mutação vira um upsert de linhas em uma
+    # transação própria; clientes e restaurantes são identificados pela
+    # posição de cadastro (a partir de 1) e cada prato pela posição no
+    # cardápio do restaurante, como no ArmazemPedidos.
+    def __init__(self, caminho='delivery.db'):
+        self.caminho = caminho
+        self.trava = threading.Lock()
+        self.conexao = self.conectar()
+        with self.conexao:
+            self.conexao.executescript(ESQUEMA_SQLITE)
+        self.id_cliente = {}
+        self.id_restaurante = {}
+        self.posicao_prato = {}
+        self.tamanho_cardapio = {}
+
+    def conectar(self):
+        conexao = sqlite3.connect(self.caminho, check_same_thread=False)
+        conexao.execute('PRAGMA journal_mode=WAL')
+        conexao.execute('PRAGMA synchronous=NORMAL')
+        return conexao
+
+    # --- Mapeamento de nomes para ids (primeira ocorrência, como nos índices do Sistema) ---
+    def mapear_cliente(self, identificador, nome):
+        self.id_cliente.setdefault(nome, identificador)
+
+    def mapear_restaurante(self, identificador, nome):
+        self.id_restaurante.setdefault(nome, identificador)
+        self.tamanho_cardapio.setdefault(identificador, 0)
+
+    def mapear_prato(self, restaurante_id, nome):
+        posicao = self.tamanho_cardapio[restaurante_id]
+        self.tamanho_cardapio[restaurante_id] = posicao + 1
+        self.posicao_prato.setdefault((restaurante_id, nome), posicao)
+        return posicao
+
+    # --- Escrita ---
+    def registrar(self, sistema, tipo, dados):
+        self.registrar_lote(sistema, [(tipo, dados)])
+
+    def registrar_lote(self, sistema, eventos):
+        self.preparar_lote(sistema, eventos)()
+
+    def preparar_lote(self, sistema, eventos):
+        # Na carga os status vêm prontos das linhas, sem reaplicar as
+        # mudanças, então o estado do estimador vai junto com elas. Ele é
+        # copiado aqui, com a trava do Sistema; a gravação não lê o Sistema
+        # e pode rodar fora dela.
+        extras = {}
+        if any(tipo == 'status' for tipo, _ in eventos):
+            extras['estimativas'] = sistema.estimador.estado()
+
+        def gravar():
+            with self.trava, self.conexao:
+                for tipo, dados in eventos:
+                    self.gravar_evento(self.conexao, tipo, dados)
+                self.conexao.executemany('INSERT OR REPLACE INTO extras VALUES (?, ?)',
+                                         [(chave, json.dumps(valor)) for chave, valor in extras.items()])
+            metricas.contar('eventos_gravados', len(eventos))
+
+        return gravar
+
+    def gravar_evento(self, conexao, tipo, dados):
+        if tipo in ('cliente', 'restaurante'):
+            tabela = 'clientes' if tipo == 'cliente' else 'restaurantes'
+            identificador = conexao.execute(
+                f'INSERT INTO {tabela} ({", ".join(CAMPOS_USUARIO)}) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [dados.get(campo, '') for campo in CAMPOS_USUARIO]).lastrowid
+            if tipo == 'cliente':
+                self.mapear_cliente(identificador, dados['nome'])
+            else:
+                self.mapear_restaurante(identificador, dados['nome'])
+                for prato in dados.get('cardapio', []):
+                    self.gravar_evento(conexao, 'prato', {'restaurante': dados['nome'], **prato})
+        elif tipo == 'prato':
+            restaurante_id = self.id_restaurante[dados['restaurante']]
+            posicao = self.mapear_prato(restaurante_id, dados['nome'])
+            conexao.execute('INSERT INTO pratos VALUES (?, ?, ?, ?, ?, ?)',
+                            (restaurante_id, posicao, dados['nome'], dados['preco'], dados['descricao'], dados.get('imagem')))
+        elif tipo == 'pedido':
+            self.gravar_pedido(conexao, dados['id'], dados['cliente'], dados['restaurante'], dados['pratos'],
+                               epoca(dados['hora_pedido']), epoca(dados['prazo_entrega']), CODIGOS_STATUS[dados['status']])
+        elif tipo == 'status':
+            conexao.execute('UPDATE pedidos SET status = ? WHERE id = ?', (CODIGOS_STATUS[dados['status']], dados['id']))
+        elif tipo == 'arquivados':
+            ids = [(identificador,) for identificador in dados['ids']]
+            conexao.executemany('DELETE FROM itens_pedido WHERE pedido_id = ?', ids)
+            conexao.executemany('DELETE FROM pedidos WHERE id = ?', ids)
+        elif tipo == 'entregador':
+            linha = conexao.execute("SELECT valor FROM extras WHERE chave = 'entregadores'").fetchone()
+            entregadores = json.loads(linha[0]) if linha else []
+            conexao.execute('INSERT OR REPLACE INTO extras VALUES (?, ?)', ('entregadores', json.dumps(entregadores + [dados])))
+        elif tipo == 'senha':
+            tabela, ids = ('clientes', self.id_cliente) if dados['tipo'] == 'cliente' else ('restaurantes', self.id_restaurante)
+            conexao.execute(f'UPDATE {tabela} SET senha = ? WHERE id = ?', (dados['senha'], ids[dados['nome']]))
+
+    def gravar_pedido(self, conexao, identificador, cliente, restaurante, pratos, hora, prazo, status):
+        restaurante_id = self.id_restaurante[restaurante]
+        conexao.execute('INSERT OR REPLACE INTO pedidos VALUES (?, ?, ?, ?, ?, ?)',
+                        (identificador, self.id_cliente[cliente], restaurante_id, hora, prazo, status))
+        conexao.executemany('INSERT OR REPLACE INTO itens_pedido VALUES (?, ?, ?)',
+                            [(identificador, i, self.posicao_prato[(restaurante_id, nome)]) for i, nome in enumerate(pratos)])
+
+    def salvar(self, sistema):
+        # Upsert de todas as linhas em uma única transação.
+        campos = ', '.join(CAMPOS_USUARIO)
+        atualizacao = ', '.join(f'{campo} = excluded.{campo}' for campo in CAMPOS_USUARIO)
+        with self.trava, self.conexao as conexao:
+            for tabela, usuarios in (('clientes', sistema.clientes), ('restaurantes', sistema.restaurantes)):
+                conexao.executemany(
+                    f'INSERT INTO {tabela} (id, {campos}) VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(id) DO UPDATE SET {atualizacao}',
+                    [(i + 1, *(getattr(u, campo, '') for campo in CAMPOS_USUARIO)) for i, u in enumerate(usuarios)])
+            for i, cliente in enumerate(sistema.clientes):
+                self.mapear_cliente(i + 1, cliente.nome)
+            for i, restaurante in enumerate(sistema.restaurantes):
+                self.mapear_restaurante(i + 1, restaurante.nome)
+                self.tamanho_cardapio[i + 1] = 0
+                conexao.executemany(
+                    'INSERT INTO pratos VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(restaurante_id, posicao) DO UPDATE SET '
+                    'nome = excluded.nome, preco = excluded.preco, descricao = excluded.descricao, imagem = excluded.imagem',
+                    [(i + 1, self.mapear_prato(i + 1, p.nome), p.nome, p.preco, p.descricao, p.imagem) for p in restaurante.cardapio])
+            for pedido in sistema.pedidos:
+                self.gravar_pedido(conexao, pedido.id, pedido.cliente.nome, pedido.restaurante.nome,
+                                   [prato.nome for prato in pedido.pratos], pedido.hora, pedido.prazo, pedido.codigo_status)
+            conexao.executemany('INSERT OR REPLACE INTO extras VALUES (?, ?)',
+                                [(chave, json.dumps(valor)) for chave, valor in sistema.extras().items()])
+
+    # --- Leitura ---
+    def carregar(self, sistema):
+        clientes = {}
+        restaurantes = {}
+        with self.trava:
+            for linha in self.conexao.execute(f'SELECT id, {", ".join(CAMPOS_USUARIO)} FROM clientes ORDER BY id'):
+                self.mapear_cliente(linha[0], linha[1])
+                clientes[linha[0]] = Cliente(*linha[1:])
+                sistema.incluir_cliente(clientes[linha[0]])
+            for linha in self.conexao.execute(f'SELECT id, {", ".join(CAMPOS_USUARIO)} FROM restaurantes ORDER BY id'):
+                self.mapear_restaurante(linha[0], linha[1])
+                restaurantes[linha[0]] = Restaurante(*linha[1:])
+            for restaurante_id, nome, preco, descricao, imagem in self.conexao.execute(
+                    'SELECT restaurante_id, nome, preco, descricao, imagem FROM pratos ORDER BY restaurante_id, posicao'):
+                self.mapear_prato(restaurante_id, nome)
+                restaurantes[restaurante_id].cardapio.append(Prato(nome, preco, descricao, imagem))
+            for restaurante in restaurantes.values():
+                sistema.incluir_restaurante(restaurante)
+            sistema.restaurar_extras({chave: json.loads(valor) for chave, valor in self.conexao.execute('SELECT chave, valor FROM extras')})
+
+        def carregar_pedidos():
+            # Conexão própria: em WAL a leitura não bloqueia as escritas da
+            # thread do console.
+            conexao = self.conectar()
+            try:
+                itens = conexao.execute('SELECT pedido_id, prato FROM itens_pedido ORDER BY pedido_id, posicao')
+                item = next(itens, None)
+                for identificador, cliente_id, restaurante_id, hora, prazo, status in conexao.execute(
+                        'SELECT id, cliente_id, restaurante_id, hora, prazo, status FROM pedidos ORDER BY id'):
+                    restaurante = restaurantes[restaurante_id]
+                    pratos = []
+                    while item is not None and item[0] <= identificador:
+                        if item[0] == identificador:
+                            pratos.append(restaurante.cardapio[item[1]])
+                        item = next(itens, None)
+                    pedido = Pedido(clientes[cliente_id], restaurante, pratos)
+                    pedido.id = identificador
+                    pedido.hora = hora
+                    pedido.prazo = prazo
+                    pedido.codigo_status = status
+                    sistema.incluir_pedido(pedido)
+            finally:
+                conexao.close()
+
+        return carregar_pedidos
+
+    def sincronizar(self, sistema):
+        pass
+
+    def reservar_ids(self, sistema, quantidade):
+        return sistema.proximo_id
+
+    def flush(self):
+        pass
+
+    def lider(self):
+        return True
+
+    # --- Consultas indexadas ---
+    def pedidos_restaurante(self, nome, status=None, limite=None):
+        consulta = 'SELECT id FROM pedidos WHERE restaurante_id = ?'
+        parametros = [self.id_restaurante.get(nome)]
+        if status is not None:
+            consulta += f' AND status IN ({", ".join("?" * len(status))})'
+            parametros += [CODIGOS_STATUS[s] for s in status]
+        consulta += ' ORDER BY id DESC'
+        if limite is not None:
+            consulta += ' LIMIT ?'
+            parametros.append(max(limite, 0))
+        with self.trava:
+            return [linha[0] for linha in self.conexao.execute(consulta, parametros)][::-1]
+
+    def mais_pedidos(self, n, restaurante=None):
+        consulta = ('SELECT pratos.nome, COUNT(*) AS quantidade FROM itens_pedido '
+                    'JOIN pedidos ON pedidos.id = itens_pedido.pedido_id '
+                    'JOIN pratos ON pratos.restaurante_id = pedidos.restaurante_id AND pratos.posicao = itens_pedido.prato')
+        parametros = []
+        if restaurante is not None:
+            consulta += ' WHERE pedidos.restaurante_id = ?'
+            parametros.append(self.id_restaurante.get(restaurante))
+        consulta += ' GROUP BY pratos.nome ORDER BY quantidade DESC LIMIT ?'
+        parametros.append(n)
+        with self.trava:
+            return self.conexao.execute(consulta, parametros).fetchall()
+
+    def fechar(self):
+        # Incorpora o WAL ao banco antes de fechar. Pode ser chamado mais de
+        # uma vez (main e atexit da gravação adiada).
+        with self.trava:
+            if self.conexao is None:
+                return
+            self.conexao.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            self.conexao.close()
+            self.conexao = None
+
+class ParticaoArquivo:
+    # Snapshot (`base.json`) e diário (`base.log`) de uma partição. As duas
+    # travas — fcntl entre processos e uma RLock entre threads — ficam em
+    # `base.lock`, que nunca é substituído. O diário começa com uma linha de
+    # cabeçalho com a geração do snapshot a que pertence; a compactação grava
+    # o snapshot da geração seguinte e troca o diário por um vazio, e quem
+    # ainda lê o antigo termina de lê-lo pelo descritor aberto.
+    def __init__(self, base, nome=None):
+        self.nome = nome
+        self.snapshot = base + '.json'
+        self.diario = base + '.log'
+        self.trava_arquivo = open(base + '.lock', 'a+')
+        self.trava_thread = threading.RLock()
+        self.carregada = False
+        self.defasada = False
+        self.geracao = 0
+        self.leitura = None
+        self.visto = None
+        self.entradas = 0
+
+    @contextmanager
+    def travada(self, exclusiva=False):
+        with self.trava_thread:
+            fcntl.flock(self.trava_arquivo, fcntl.LOCK_EX if exclusiva else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(self.trava_arquivo, fcntl.LOCK_UN)
+
+    def estado_diario(self):
+        try:
+            estado = os.stat(self.diario)
+        except FileNotFoundError:
+            return None
+        return estado.st_ino, estado.st_size
+
+    def ler_snapshot(self):
+        if not os.path.exists(self.snapshot):
+            return {}
+        with open(self.snapshot, 'r') as f:
+            return json.load(f)
+
+    def ler_novas(self):
+        # Entradas acrescentadas desde a última leitura, seguindo a troca do
+        # diário feita por uma compactação. Se houve mais de uma compactação
+        # desde então, parte das entradas só existe no snapshot: a leitura
+        # para logo após o cabeçalho do diário novo e marca `defasada`. Deve
+        # ser chamada com a trava.
+        entradas = []
+        esperada = self.geracao
+        while True:
+            if self.leitura is None:
+                if not os.path.exists(self.diario):
+                    break
+                self.leitura = open(self.diario, 'rb')
+            while True:
+                inicio = self.leitura.tell()
+                linha = self.leitura.readline()
+                if not linha.endswith(b'\n'):
+                    # Fim do arquivo ou resto de uma escrita interrompida, que
+                    # o próximo escritor termina com uma quebra de linha.
+                    self.leitura.seek(inicio)
+                    break
+                try:
+                    entrada = json.loads(linha)
+                except ValueError:
+                    continue
+                if 'geracao' not in entrada:
+                    entradas.append(entrada)
+                    continue
+                self.geracao = entrada['geracao']
+                if self.geracao > esperada:
+                    self.defasada = True
+                    break
+            if self.defasada or (os.path.exists(self.diario) and
+                                 os.stat(self.diario).st_ino == os.fstat(self.leitura.fileno()).st_ino):
+                break
+            self.leitura.close()
+            self.leitura = None
+            esperada = self.geracao + 1
+        self.entradas += len(entradas)
+        self.visto = self.estado_diario()
+        return entradas
+
+    def acrescentar(self, linhas):
+        # Deve ser chamada com a trava exclusiva.
+        with open(self.diario, 'ab') as f:
+            if f.tell() == 0:
+                f.write(json.dumps({'geracao': self.geracao}).encode() + b'\n')
+            else:
+                with open(self.diario, 'rb') as leitura:
+                    leitura.seek(-1, os.SEEK_END)
+                    if leitura.read(1) != b'\n':
+                        f.write(b'\n')
+            f.write(''.join(linhas).encode())
+
+    def recuperar(self):
+        # Conclui ou descarta uma compactação interrompida. Com a trava
+        # exclusiva.
+        novo = self.diario + '.novo'
+        if not os.path.exists(novo):
+            return
+        with open(novo, 'rb') as f:
+            geracao = json.loads(f.readline())['geracao']
+        if geracao == self.ler_snapshot().get('geracao', 0):
+            os.replace(novo, self.diario)
+        else:
+            os.remove(novo)
+
+    def compactar(self, dados):
+        # Grava `dados` como snapshot da próxima geração e inicia um diário
+        # vazio. Com a trava exclusiva e depois de aplicar `ler_novas()`.
+        geracao = self.geracao + 1
+        novo = self.diario + '.novo'
+        with open(novo, 'wb') as f:
+            f.write(json.dumps({'geracao': geracao}).encode() + b'\n')
+            f.flush()
+            os.fsync(f.fileno())
+        temporario = self.snapshot + '.tmp'
+        with open(temporario, 'w') as f:
+            json.dump({'geracao': geracao, **dados}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        metricas.contar('bytes_gravados_snapshot', os.path.getsize(temporario))
+        os.replace(temporario, self.snapshot)
+        os.replace(novo, self.diario)
+        if self.leitura is not None:
+            self.leitura.close()
+            self.leitura = None
+        self.geracao = geracao
+        self.ler_novas()
+        self.entradas = 0
+
+class ArmazenamentoParticionado:
+    # Vários processos sobre os mesmos dados. Clientes, restaurantes e
+    # cardápios ficam na partição `catalogo`; os pedidos de cada restaurante
+    # (e as mudanças de status deles) em `restaurantes/<nome>`. Cada escrita
+    # trava só a sua partição, acrescenta ao diário e já lê o que os outros
+    # processos gravaram nela; as demais partições são lidas em
+    # `sincronizar`. Os ids de pedido vêm de um contador compartilhado em
+    # `proximo_id`.
+    #
+    # A trava do catálogo pode ser pedida com a de um restaurante já obtida,
+    # nunca o contrário.
+    def __init__(self, pasta='delivery.d', limite_diario=500):
+        if fcntl is None:
+            raise RuntimeError('o armazenamento particionado exige fcntl (Linux, macOS)')
+        self.pasta = pasta
+        self.limite_diario = limite_diario
+        os.makedirs(os.path.join(pasta, 'restaurantes'), exist_ok=True)
+        self.origem = f'{os.getpid()}-{os.urandom(4).hex()}'
+        self.catalogo = ParticaoArquivo(os.path.join(pasta, 'catalogo'))
+        self.particoes = {}
+        self.contador = os.path.join(pasta, 'proximo_id')
+        self.arquivo_lider = None
+
+    def particao(self, restaurante):
+        particao = self.particoes.get(restaurante)
+        if particao is None:
+            nome = re.sub(r'[^0-9A-Za-z]+', '_', restaurante)[:40]
+            base = os.path.join(self.pasta, 'restaurantes', f'{nome}-{zlib.crc32(restaurante.encode()):08x}')
+            particao = self.particoes[restaurante] = ParticaoArquivo(base, restaurante)
+        return particao
+
+    def particao_do_evento(self, sistema, tipo, dados):
+        if tipo in ('pedido', 'arquivados'):
+            return self.particao(dados['restaurante'])
+        if tipo == 'status':
+            return self.particao(sistema.pedidos_por_id[dados['id']].restaurante.nome)
+        return self.catalogo
+
+    # --- Escrita ---
+    def registrar(self, sistema, tipo, dados):
+        self.registrar_lote(sistema, [(tipo, dados)])
+
+    def registrar_lote(self, sistema, eventos):
+        grupos = {}
+        for tipo, dados in eventos:
+            particao = self.particao_do_evento(sistema, tipo, dados)
+            grupos.setdefault(particao, []).append(json.dumps({'origem': self.origem, 'tipo': tipo, 'dados': dados}) + '\n')
+        for particao, linhas in grupos.items():
+            with particao.travada(exclusiva=True):
+                self.atualizar(sistema, particao)
+                particao.acrescentar(linhas)
+                self.aplicar_entradas(sistema, particao.ler_novas())
+            metricas.contar('eventos_gravados', len(linhas))
+            if sistema.carregado.is_set() and particao.entradas >= self.limite_compactacao(sistema, particao):
+                self.compactar(sistema, particao)
+
+    def preparar_lote(self, sistema, eventos):
+        # Gravar também aplica o que outros processos acrescentaram, o que
+        # muda o Sistema: é feito já, com a trava.
+        self.registrar_lote(sistema, eventos)
+        return lambda: None
+
+    def limite_compactacao(self, sistema, particao):
+        if particao is self.catalogo:
+            return max(self.limite_diario, len(sistema.clientes) + len(sistema.restaurantes))
+        return max(self.limite_diario, len(sistema.pedidos_restaurante.todos.get(particao.nome, ())))
+
+    def reservar_ids(self, sistema, quantidade):
+        with open(self.contador, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                inicio = max(int(f.read() or 1), sistema.proximo_id)
+                f.seek(0)
+                f.truncate()
+                f.write(str(inicio + quantidade))
+                f.flush()
+                os.fsync(f.fileno())
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return inicio
+
+    def flush(self):
+        pass
+
+    def lider(self):
+        # Só um processo por pasta faz as transições automáticas, o despacho
+        # e o arquivamento do relógio: o que segura a trava de `lider`. Os
+        # outros tentam de novo a cada passo e assumem quando ele sai.
+        if self.arquivo_lider is None:
+            arquivo = open(os.path.join(self.pasta, 'lider'), 'a')
+            try:
+                fcntl.flock(arquivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                arquivo.close()
+                return False
+            self.arquivo_lider = arquivo
+        return True
+
+    def fechar(self):
+        if self.arquivo_lider is not None:
+            self.arquivo_lider.close()
+            self.arquivo_lider = None
+
+    # --- Compactação ---
+    def salvar(self, sistema):
+        self.compactar(sistema, self.catalogo)
+        for restaurante in list(sistema.restaurantes_por_nome):
+            self.compactar(sistema, self.particao(restaurante))
+
+    def compactar(self, sistema, particao):
+        # Aplica o que os outros processos gravaram antes de reescrever a
+        # partição a partir da memória, para não descartar nada deles.
+        with particao.travada(exclusiva=True):
+            self.atualizar(sistema, particao)
+            if particao is self.catalogo:
+                dados = {
+                    'clientes': [cliente.__dict__ for cliente in sistema.clientes],
+                    'restaurantes': [restaurante_para_dict(restaurante) for restaurante in sistema.restaurantes],
+                    'extras': sistema.extras(),
+                }
+            else:
+                dados = {'pedidos': [pedido.to_dict() for pedido in sistema.pedidos_restaurante.todos.get(particao.nome, ())]}
+            particao.compactar(dados)
+
+    # --- Leitura ---
+    def atualizar(self, sistema, particao):
+        # Traz a partição para a memória: na primeira vez o snapshot e o
+        # diário inteiro, depois só as entradas novas. Com a trava da
+        # partição; a primeira vez exige a exclusiva.
+        if particao is not self.catalogo:
+            self.sincronizar_catalogo(sistema)
+        if not particao.carregada:
+            particao.recuperar()
+            dados = particao.ler_snapshot()
+            particao.geracao = dados.get('geracao', 0)
+            for c in dados.get('clientes', []):
+                sistema.incluir_cliente(cliente_de_dict(c))
+            for r in dados.get('restaurantes', []):
+                sistema.incluir_restaurante(restaurante_de_dict(r))
+            sistema.restaurar_extras(dados.get('extras', {}))
+            for p in dados.get('pedidos', []):
+                sistema.incluir_pedido(sistema.pedido_de_dict(p))
+            particao.carregada = True
+        self.aplicar_entradas(sistema, particao.ler_novas())
+        while particao.defasada:
+            particao.defasada = False
+            self.mesclar_snapshot(sistema, particao.ler_snapshot())
+            self.aplicar_entradas(sistema, particao.ler_novas())
+
+    def mesclar_snapshot(self, sistema, dados):
+        # Usado quando entradas do diário foram compactadas antes de serem
+        # lidas: inclui o que falta e acerta o que mudou, identificando
+        # usuários e pratos pelo nome e pedidos pelo id.
+        for c in dados.get('clientes', []):
+            cliente = sistema.clientes_por_nome.get(c['nome'])
+            if cliente is None:
+                sistema.incluir_cliente(cliente_de_dict(c))
+            else:
+                cliente.senha = c.get('senha', '')
+        for r in dados.get('restaurantes', []):
+            restaurante = sistema.restaurantes_por_nome.get(r['nome'])
+            if restaurante is None:
+                sistema.incluir_restaurante(restaurante_de_dict(r))
+                continue
+            restaurante.senha = r.get('senha', '')
+            for p in r.get('cardapio', []):
+                if (restaurante.nome, p['nome']) not in sistema.pratos_por_chave:
+                    sistema.incluir_prato(restaurante, Prato(**p))
+        for p in dados.get('pedidos', []):
+            pedido = sistema.pedidos_por_id.get(p['id'])
+            if pedido is None:
+                sistema.incluir_pedido(sistema.pedido_de_dict(p))
+            elif pedido.status != p['status']:
+                sistema.definir_status(pedido, p['status'])
+
+    def aplicar_entradas(self, sistema, entradas):
+        # As próprias entradas já estão na memória. Um status só é aplicado
+        # se for o próximo do pedido: quando dois processos fazem a mesma
+        # mudança, a segunda no diário é descartada (aqui e em quem reler o
+        # diário), e um pedido nunca volta para um status anterior.
+        for entrada in entradas:
+            if entrada['origem'] == self.origem:
+                continue
+            tipo, dados = entrada['tipo'], entrada['dados']
+            if tipo == 'status':
+                pedido = sistema.pedidos_por_id.get(dados['id'])
+                if pedido is None or PROXIMO_STATUS.get(pedido.status) != dados['status']:
+                    continue
+            sistema.aplicar(tipo, dados)
+
+    def sincronizar_particao(self, sistema, particao):
+        if not particao.carregada:
+            with particao.travada(exclusiva=True):
+                self.atualizar(sistema, particao)
+        elif particao.estado_diario() != particao.visto:
+            with particao.travada():
+                self.atualizar(sistema, particao)
+
+    def sincronizar_catalogo(self, sistema):
+        self.sincronizar_particao(sistema, self.catalogo)
+
+    def sincronizar(self, sistema):
+        self.sincronizar_catalogo(sistema)
+        for restaurante in list(sistema.restaurantes_por_nome):
+            self.sincronizar_particao(sistema, self.particao(restaurante))
+
+    def carregar(self, sistema):
+        self.sincronizar_catalogo(sistema)
+        return lambda: self.sincronizar(sistema)
+
+class ArmazenamentoDiferido:
+    # Gravação adiada (write-behind) sobre outro armazenamento. As mutações
+    # só entram numa fila em memória; uma thread grava a fila de uma vez
+    # (um único lote) a cada `intervalo` segundos ou assim que ela junta
+    # `lote` eventos. Só a retirada da fila e o `preparar_lote` do
+    # armazenamento (que copia o que uma compactação vai gravar) são feitos
+    # com `sistema.trava`; a escrita em disco roda fora dela, em ordem,
+    # protegida por `escrita`. Assim o snapshot de uma compactação nunca
+    # inclui uma mutação cujo evento ainda está na fila. Eventos ainda não
+    # gravados se perdem numa queda; quem precisa de durabilidade chama
+    # `flush()`.
+    def __init__(self, interno, intervalo=0.5, lote=200):
+        self.interno = interno
+        self.intervalo = intervalo
+        self.lote = lote
+        self.pendentes = []
+        self.condicao = threading.Condition()
+        self.escrita = threading.RLock()
+        self.sistema = None
+        self.thread = None
+        self.parar = False
+
+    def carregar(self, sistema):
+        self.sistema = sistema
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.executar, daemon=True)
+            self.thread.start()
+            atexit.register(self.fechar)
+        return self.interno.carregar(sistema)
+
+    def registrar(self, sistema, tipo, dados):
+        self.registrar_lote(sistema, [(tipo, dados)])
+
+    def registrar_lote(self, sistema, eventos):
+        with self.condicao:
+            self.pendentes.extend(eventos)
+            if len(self.pendentes) >= self.lote:
+                self.condicao.notify()
+        metricas.contar('eventos_adiados', len(eventos))
+
+    def executar(self):
+        while True:
+            with self.condicao:
+                if not self.pendentes and not self.parar:
+                    self.condicao.wait()
+                if self.parar:
+                    return
+                # Espera o intervalo para juntar mais eventos, a não ser que
+                # o lote já esteja cheio.
+                if len(self.pendentes) < self.lote:
+                    self.condicao.wait_for(lambda: self.parar or len(self.pendentes) >= self.lote, self.intervalo)
+            self.flush()
+
+    @metricas.medir('gravacao_adiada')
+    def flush(self):
+        # Grava tudo o que está na fila e só retorna depois da gravação.
+        # `escrita` é obtida dentro de `sistema.trava`, como em `salvar`, mas
+        # só é solta depois de gravar, já sem a trava do sistema.
+        with self.sistema.trava:
+            self.escrita.acquire()
+            with self.condicao:
+                eventos, self.pendentes = self.pendentes, []
+            try:
+                gravar = self.interno.preparar_lote(self.sistema, eventos) if eventos else None
+            except BaseException:
+                self.escrita.release()
+                raise
+        try:
+            if gravar is not None:
+                gravar()
+                metricas.contar('gravacoes_em_grupo')
+        finally:
+            self.escrita.release()
+
+    def fechar(self):
+        with self.condicao:
+            self.parar = True
+            self.condicao.notify()
+        if self.sistema is not None:
+            self.flush()
+        self.interno.fechar()
+
+    def salvar(self, sistema):
+        self.flush()
+        self.interno.salvar(sistema)
+
+    def sincronizar(self, sistema):
+        self.interno.sincronizar(sistema)
+
+    def lider(self):
+        return self.interno.lider()
+
+    def reservar_ids(self, sistema, quantidade):
+        return self.interno.reservar_ids(sistema, quantidade)
+
+# --- Arquivo de pedidos entregues ---
+class ArquivoPedidos:
+    # Camada fria: pedidos entregues há mais de `dias` saem da memória para
+    # arquivos JSON-lines comprimidos com gzip, um por dia (`AAAA-MM-DD.jsonl.gz`).
+    # Cada gravação acrescenta um membro gzip ao arquivo do dia. O
+    # `manifesto.json` guarda, por dia, o tamanho válido do arquivo e um
+    # resumo por restaurante (pedidos, receita e pratos), usado para as
+    # estatísticas sem reabrir os arquivos. Os pedidos de um dia só são lidos
+    # quando consultados.
+    def __init__(self, pasta='delivery.arquivo', dias=30):
+        self.pasta = pasta
+        self.idade = dias * 86400
+        self.arquivo_manifesto = os.path.join(pasta, 'manifesto.json')
+        os.makedirs(pasta, exist_ok=True)
+        self.manifesto = {'dias': {}}
+        if os.path.exists(self.arquivo_manifesto):
+            with open(self.arquivo_manifesto, 'r') as f:
+                self.manifesto = json.load(f)
+
+    def caminho(self, dia):
+        return os.path.join(self.pasta, f'{dia}.jsonl.gz')
+
+    def gravar(self, pedidos):
+        # Acrescenta os pedidos aos arquivos dos seus dias e só então grava o
+        # manifesto. Um membro gravado depois do último manifesto (queda no
+        # meio) é descartado, e pedidos que já estão no arquivo do dia não
+        # são repetidos. Os ids do lote ficam em `pendentes` no manifesto
+        # até o próximo, para Sistema.concluir_arquivamento.
+        por_dia = {}
+        for pedido in pedidos:
+            por_dia.setdefault(pedido.hora_pedido.date().isoformat(), []).append(pedido)
+        dias = self.manifesto['dias']
+        for dia, lista in sorted(por_dia.items()):
+            caminho = self.caminho(dia)
+            entrada = dias.get(dia)
+            if entrada is None:
+                entrada = {'pedidos': 0, 'tamanho': 0, 'restaurantes': {}}
+            if os.path.exists(caminho) and os.path.getsize(caminho) > entrada['tamanho']:
+                with open(caminho, 'r+b') as f:
+                    f.truncate(entrada['tamanho'])
+            if entrada['pedidos']:
+                existentes = {p['id'] for p in self.pedidos(dia)}
+                lista = [p for p in lista if p.id not in existentes]
+            if not lista:
+                continue
+            linhas = []
+            for pedido in lista:
+                dados = pedido.to_dict()
+                dados['valor'] = sum(prato.preco for prato in pedido.pratos)
+                linhas.append(json.dumps(dados) + '\n')
+                resumo = entrada['restaurantes'].setdefault(dados['restaurante'], {'pedidos': 0, 'receita': 0.0, 'pratos': {}})
+                resumo['pedidos'] += 1
+                resumo['receita'] += dados['valor']
+                for prato in pedido.pratos:
+                    contagem = resumo['pratos'].setdefault(prato.nome, [0, 0.0])
+                    contagem[0] += 1
+                    contagem[1] += prato.preco
+            with open(caminho, 'ab') as f:
+                f.write(gzip.compress(''.join(linhas).encode()))
+            entrada['pedidos'] += len(lista)
+            entrada['tamanho'] = os.path.getsize(caminho)
+            dias[dia] = entrada
+        self.manifesto['pendentes'] = [pedido.id for pedido in pedidos]
+        temporario = self.arquivo_manifesto + '.tmp'
+        with open(temporario, 'w') as f:
+            json.dump(self.manifesto, f)
+        os.replace(temporario, self.arquivo_manifesto)
+
+    # --- Consultas ---
+    def dias(self):
+        # Dias arquivados, do mais recente para o mais antigo.
+        return sorted(self.manifesto['dias'], reverse=True)
+
+    def pedidos(self, dia, cliente=None, restaurante=None):
+        # Pedidos (dicionários) de um dia, lidos do arquivo só agora.
+        entrada = self.manifesto['dias'].get(dia)
+        if entrada is None:
+            return
+        with open(self.caminho(dia), 'rb') as f:
+            dados = f.read(entrada['tamanho'])
+        for linha in gzip.decompress(dados).decode().splitlines():
+            pedido = json.loads(linha)
+            if (cliente is None or pedido['cliente'] == cliente) and (restaurante is None or pedido['restaurante'] == restaurante):
+                yield pedido
+
+    def historico(self, cliente=None, restaurante=None):
+        # (dia, pedidos) do mais recente para o mais antigo, um dia por vez.
+        # Com restaurante, o manifesto já descarta os dias sem pedidos dele.
+        for dia in self.dias():
+            if restaurante is not None and restaurante not in self.manifesto['dias'][dia]['restaurantes']:
+                continue
+            pedidos = list(self.pedidos(dia, cliente, restaurante))
+            if pedidos:
+                yield dia, pedidos
+
+# --- Despacho de entregadores ---
+class GeocodificadorLocal:
+    # Resolve endereços sem serviço externo: cada endereço normalizado vira
+    # um ponto fixo, derivado do seu hash, dentro da área atendida. Qualquer
+    # objeto com `coordenadas(endereco) -> (lat, lon)` pode substituí-lo.
+    def __init__(self, sul=-23.75, norte=-23.45, oeste=-46.80, leste=-46.40):
+        self.sul, self.norte, self.oeste, self.leste = sul, norte, oeste, leste
+
+    def coordenadas(self, endereco):
+        codigo = zlib.crc32(' '.join(termos_busca(endereco or '')).encode())
+        lat = self.sul + (codigo & 0xFFFF) / 0xFFFF * (self.norte - self.sul)
+        lon = self.oeste + (codigo >> 16) / 0xFFFF * (self.leste - self.oeste)
+        return lat, lon
+
+def carregar_geocodificador(especificacao):
+    # "modulo:Classe" -> Classe(), para trocar o GeocodificadorLocal pela
+    # linha de comando.
+    modulo, _, nome = especificacao.partition(':')
+    if not nome:
+        raise ValueError(f'geocodificador inválido: {especificacao} (use modulo:Classe)')
+    return getattr(importlib.import_module(modulo), nome)()
+
+def projetar(lat, lon):
+    # Coordenadas planas em km, suficientes na escala de uma cidade.
+    return lon * 111.32 * math.cos(math.radians(lat)), lat * 110.57
+
+class GradeEspacial:
+    # Itens em células quadradas de `tamanho` km. A busca do mais próximo
+    # percorre anéis de células a partir do ponto e para quando o anel
+    # seguinte já não pode ter nada mais perto.
+    def __init__(self, tamanho=1.0):
+        self.tamanho = tamanho
+        self.celulas = {}
+        self.posicoes = {}
+        self.alcance = 0
+
+    def celula(self, x, y):
+        return int(x // self.tamanho), int(y // self.tamanho)
+
+    def inserir(self, item, x, y):
+        celula = self.celula(x, y)
+        self.celulas.setdefault(celula, set()).add(item)
+        self.posicoes[item] = (x, y, celula)
+        if not self.alcance:
+            self.origem = celula
+        self.alcance = max(self.alcance, abs(celula[0] - self.origem[0]) + abs(celula[1] - self.origem[1]) + 1)
+
+    def remover(self, item):
+        _, _, celula = self.posicoes.pop(item)
+        itens = self.celulas[celula]
+        itens.discard(item)
+        if not itens:
+            del self.celulas[celula]
+
+    def mais_proximo(self, x, y, raio=None):
+        if not self.posicoes:
+            return None
+        ci, cj = self.celula(x, y)
+        limite = self.alcance + abs(ci - self.origem[0]) + abs(cj - self.origem[1])
+        if raio is not None:
+            limite = min(limite, int(raio // self.tamanho) + 1)
+        melhor, distancia_melhor = None, math.inf
+        for anel in range(limite + 1):
+            if (2 * anel + 1) ** 2 > len(self.posicoes):
+                # Grade esparsa: varrer os itens custa menos que visitar
+                # mais anéis de células vazias.
+                for item, (ix, iy, _) in self.posicoes.items():
+                    distancia = math.hypot(ix - x, iy - y)
+                    if distancia < distancia_melhor:
+                        melhor, distancia_melhor = item, distancia
+                break
+            for i in range(ci - anel, ci + anel + 1):
+                passo = 1 if abs(i - ci) == anel else 2 * anel or 1
+                for j in range(cj - anel, cj + anel + 1, passo):
+                    for item in self.celulas.get((i, j), ()):
+                        ix, iy, _ = self.posicoes[item]
+                        distancia = math.hypot(ix - x, iy - y)
+                        if distancia < distancia_melhor:
+                            melhor, distancia_melhor = item, distancia
+            if distancia_melhor <= anel * self.tamanho:
+                break
+        if raio is not None and distancia_melhor > raio:
+            return None
+        return melhor
+
+    def __len__(self):
+        return len(self.posicoes)
+
+class Entregador:
+    __slots__ = ('nome', 'endereco', 'x', 'y', 'rota')
+
+    def __init__(self, nome, endereco):
+        self.nome = nome
+        self.endereco = endereco
+        self.x = self.y = 0.0
+        self.rota = []
+
+    def to_dict(self):
+        return {'nome': self.nome, 'endereco': self.endereco}
+
+class Despacho:
+    # Atribui pedidos ativos a entregadores livres em lotes, a cada passo do
+    # agendador. Os pendentes de um restaurante formam rotas de até
+    # `capacidade` pedidos, encadeando o destino mais próximo do anterior
+    # (até `raio_rota` km), e cada rota vai para o entregador livre mais
+    # próximo do restaurante. O entregador volta a ficar livre, no último
+    # destino, quando todos os pedidos da rota são entregues.
+    def __init__(self, geocodificador=None, capacidade=3, raio_rota=3.0):
+        self.geocodificador = geocodificador or GeocodificadorLocal()
+        self.capacidade = capacidade
+        self.raio_rota = raio_rota
+        self.pontos = {}
+        self.entregadores = {}
+        self.livres = GradeEspacial()
+        self.pendentes = {}
+        self.atribuicoes = {}
+
+    def ponto(self, endereco):
+        ponto = self.pontos.get(endereco)
+        if ponto is None:
+            ponto = self.pontos[endereco] = projetar(*self.geocodificador.coordenadas(endereco))
+        return ponto
+
+    def incluir_entregador(self, entregador):
+        if entregador.nome in self.entregadores:
+            return
+        self.entregadores[entregador.nome] = entregador
+        entregador.x, entregador.y = self.ponto(entregador.endereco)
+        self.livres.inserir(entregador, entregador.x, entregador.y)
+
+    def atualizar(self, pedido):
+        # Chamado quando um pedido entra no sistema ou muda de status.
+        if pedido.status in STATUS_ATIVOS:
+            if pedido.id not in self.atribuicoes:
+                self.pendentes[pedido.id] = pedido
+            return
+        self.pendentes.pop(pedido.id, None)
+        entregador = self.atribuicoes.pop(pedido.id, None)
+        if entregador is not None and all(p.status not in STATUS_ATIVOS for p in entregador.rota):
+            entregador.x, entregador.y = self.ponto(entregador.rota[-1].cliente.endereco)
+            entregador.rota = []
+            self.livres.inserir(entregador, entregador.x, entregador.y)
+
+    def despachar(self):
+        # Devolve as rotas atribuídas neste passo: [(entregador, [pedidos])].
+        if not self.pendentes or not self.livres:
+            return []
+        grupos = {}
+        for pedido in self.pendentes.values():
+            grupos.setdefault(pedido.restaurante, []).append(pedido)
+        rotas = []
+        # Restaurantes com o pedido mais antigo primeiro.
+        for restaurante, pedidos in sorted(grupos.items(), key=lambda grupo: grupo[1][0].id):
+            origem = self.ponto(restaurante.endereco)
+            destinos = GradeEspacial()
+            for pedido in pedidos:
+                destinos.inserir(pedido, *self.ponto(pedido.cliente.endereco))
+            for pedido in pedidos:
+                if pedido not in destinos.posicoes:
+                    continue
+                entregador = self.livres.mais_proximo(*origem)
+                if entregador is None:
+                    return rotas
+                rota = [pedido]
+                x, y, _ = destinos.posicoes[pedido]
+                destinos.remover(pedido)
+                while len(rota) < self.capacidade:
+                    proximo = destinos.mais_proximo(x, y, self.raio_rota)
+                    if proximo is None:
+                        break
+                    rota.append(proximo)
+                    x, y, _ = destinos.posicoes[proximo]
+                    destinos.remover(proximo)
+                self.atribuir(entregador, rota)
+                rotas.append((entregador, rota))
+        return rotas
+
+    def atribuir(self, entregador, rota):
+        self.livres.remover(entregador)
+        entregador.rota = rota
+        for pedido in rota:
+            del self.pendentes[pedido.id]
+            self.atribuicoes[pedido.id] = entregador
+
+    def entregador_do_pedido(self, pedido):
+        return self.atribuicoes.get(pedido.id)
+
+# --- Eventos ---
+class Evento:
+    # `reproduzido` marca os eventos gerados ao carregar o snapshot e o
+    # diário, e não por uma mutação nova.
+    __slots__ = ('reproduzido',)
+
+class PedidoCriado(Evento):
+    __slots__ = ('pedido',)
+
+    def __init__(self, pedido, reproduzido=False):
+        self.pedido = pedido
+        self.reproduzido = reproduzido
+
+class StatusAlterado(Evento):
+    __slots__ = ('pedido', 'anterior', 'status', 'quando')
+
+    def __init__(self, pedido, anterior, status, quando=None, reproduzido=False):
+        self.pedido = pedido
+        self.anterior = anterior
+        self.status = status
+        self.quando = quando
+        self.reproduzido = reproduzido
+
+class PratoCadastrado(Evento):
+    __slots__ = ('restaurante', 'prato')
+
+    def __init__(self, restaurante, prato, reproduzido=False):
+        self.restaurante = restaurante
+        self.prato = prato
+        self.reproduzido = reproduzido
+
+class FilaAssinante:
+    # Entrega assíncrona para um assinante: uma fila limitada e uma thread,
+    # criada no primeiro evento. Com a fila cheia, quem publica espera o
+    # assinante abrir espaço (contrapressão).
+    def __init__(self, funcao, tamanho, reproduzidos=True):
+        self.funcao = funcao
+        self.fila = queue.Queue(tamanho)
+        self.reproduzidos = reproduzidos
+        self.thread = None
+
+    def entregar(self, evento):
+        if evento.reproduzido and not self.reproduzidos:
+            return
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.executar, name=f'assinante-{self.funcao.__name__}', daemon=True)
+            self.thread.start()
+        try:
+            self.fila.put_nowait(evento)
+        except queue.Full:
+            metricas.contar('eventos_em_espera')
+            inicio = time.perf_counter()
+            self.fila.put(evento)
+            if metricas.ativo:
+                metricas.registrar('espera_assinante', time.perf_counter() - inicio)
+
+    def executar(self):
+        while True:
+            evento = self.fila.get()
+            try:
+                self.funcao(evento)
+            except Exception:
+                metricas.contar('eventos_com_erro')
+            finally:
+                self.fila.task_done()
+
+class BarramentoEventos:
+    # Eventos tipados para assinantes por tipo. Os assinantes comuns rodam na
+    # thread de quem publica, na ordem em que assinaram, e servem ao que
+    # precisa estar em dia quando a mutação retorna. Os assinados com `fila`
+    # recebem por uma FilaAssinante; como a publicação acontece com
+    # `sistema.trava` tomada, eles não devem mexer no Sistema.
     def __init__(self):
+        self.assinantes = {}
+        self.filas = []
+
+    def assinar(self, tipo, funcao, fila=None, reproduzidos=True):
+        if fila is not None:
+            entrega = FilaAssinante(funcao, fila, reproduzidos)
+            self.filas.append(entrega)
+            funcao = entrega.entregar
+        self.assinantes.setdefault(tipo, []).append(funcao)
+
+    def publicar(self, evento):
+        for funcao in self.assinantes.get(type(evento), ()):
+            funcao(evento)
+
+    def aguardar(self):
+        # Espera as filas dos assinantes esvaziarem.
+        for entrega in self.filas:
+            entrega.fila.join()
+
+class Notificacoes:
+    # Avisos para clientes (mudanças de status dos seus pedidos) e
+    # restaurantes (pedidos novos), alimentados pelo barramento numa fila
+    # própria. Cada menu mostra e esvazia os seus a cada volta; ficam só os
+    # `limite` mais recentes de cada usuário.
+    def __init__(self, limite=20):
+        self.limite = limite
+        self.avisos = {}
+        self.trava = threading.Lock()
+
+    def assinar(self, barramento, fila=1000):
+        barramento.assinar(StatusAlterado, self.status_alterado, fila, reproduzidos=False)
+        barramento.assinar(PedidoCriado, self.pedido_criado, fila, reproduzidos=False)
+
+    def avisar(self, tipo, nome, aviso):
+        with self.trava:
+            avisos = self.avisos.get((tipo, nome))
+            if avisos is None:
+                avisos = self.avisos[(tipo, nome)] = deque(maxlen=self.limite)
+            avisos.append(aviso)
+
+    def status_alterado(self, evento):
+        pedido = evento.pedido
+        self.avisar('cliente', pedido.cliente.nome, f"Pedido {pedido.id} de {pedido.restaurante.nome}: {evento.status}")
+
+    def pedido_criado(self, evento):
+        pedido = evento.pedido
+        pratos = ', '.join(prato.nome for prato in pedido.pratos)
+        self.avisar('restaurante', pedido.restaurante.nome, f"Novo pedido {pedido.id} de {pedido.cliente.nome}: {pratos}")
+
+    def retirar(self, tipo, nome):
+        with self.trava:
+            return list(self.avisos.pop((tipo, nome), ()))
+
+def exclusivo(metodo):
+    # Mutações do Sistema passam uma de cada vez por `self.trava`, que a
+    # gravação adiada também segura enquanto grava ou compacta.
+    @wraps(metodo)
+    def envolvido(self, *args, **kwargs):
+        with self.trava:
+            return metodo(self, *args, **kwargs)
+    return envolvido
+
+class Sistema:
+    def __init__(self, armazenamento='delivery.data', capacidade_ranking=None, em_segundo_plano=False, arquivo=None,
+                 barramento=None, geocodificador=None):
+        if isinstance(armazenamento, str):
+            armazenamento = ArmazenamentoJSON(armazenamento)
+        self.armazenamento = armazenamento
         self.clientes = []
         self.restaurantes = []
         self.pedidos = []
-        self.carregar_dados()
+        self.clientes_por_nome = {}
+        self.restaurantes_por_nome = {}
+        self.pratos_por_chave = {}
+        self.pedidos_por_id = {}
+        self.pedidos_cliente = IndicePedidos()
+        self.pedidos_restaurante = IndicePedidos()
+        self.agregados = Agregados(capacidade_ranking)
+        self.baldes_vendas = None
+        self.agendador = AgendadorStatus()
+        self.monitor_prazos = MonitorPrazos()
+        self.busca = IndiceBusca()
+        self.estimador = EstimadorEntrega()
+        self.despacho = Despacho(geocodificador)
+        self.arquivo = arquivo
+        self.proximo_arquivamento = 0
+        self.proximo_id = 1
+        self.carregado = threading.Event()
+        self.trava = threading.RLock()
+        # Com um `barramento` de fora, os assinantes recebem também os eventos
+        # reproduzidos na carga do snapshot e do diário.
+        self.barramento = barramento or BarramentoEventos()
+        self.notificacoes = Notificacoes()
+        self.assinar_eventos()
+        if arquivo is not None:
+            self.incluir_resumos_arquivados()
+        self.carregar_dados(em_segundo_plano)
 
-    def salvar_dados(self):
-        dados = {
-            'clientes': [cliente.__dict__ for cliente in self.clientes],
-            'restaurantes': [{**restaurante.__dict__, 'cardapio': [prato.__dict__ for prato in restaurante.cardapio]} for restaurante in self.restaurantes],
-            'pedidos': [pedido.to_dict() for pedido in self.pedidos]
+    # --- Mutações (registradas no diário) ---
+    @exclusivo
+    def adicionar_cliente(self, cliente):
+        self.incluir_cliente(cliente)
+        self.registrar('cliente', cliente.__dict__)
+
+    @exclusivo
+    def adicionar_restaurante(self, restaurante):
+        self.incluir_restaurante(restaurante)
+        self.registrar('restaurante', restaurante_para_dict(restaurante))
+
+    @exclusivo
+    def adicionar_prato(self, restaurante, prato):
+        self.incluir_prato(restaurante, prato)
+        self.registrar('prato', {'restaurante': restaurante.nome, **prato.to_dict()})
+
+    def estimar_prazo(self, pedido):
+        fila = self.pedidos_restaurante.contar(pedido.restaurante.nome, 'Em preparo')
+        pedido.prazo = pedido.hora + self.estimador.estimar(pedido.restaurante.nome, fila)
+
+    @metricas.medir('adicionar_pedido')
+    @exclusivo
+    def adicionar_pedido(self, pedido):
+        self.aguardar_carregamento()
+        self.reservar_ids([pedido])
+        self.estimar_prazo(pedido)
+        self.incluir_pedido(pedido)
+        self.registrar('pedido', pedido.to_dict())
+
+    @metricas.medir('adicionar_pedidos')
+    @exclusivo
+    def adicionar_pedidos(self, pedidos):
+        # Inclui vários pedidos com uma única gravação no armazenamento.
+        # Pedidos sem prazo (None) recebem o do estimador, como em
+        # adicionar_pedido, cada um atrás dos anteriores do lote.
+        self.aguardar_carregamento()
+        self.reservar_ids(pedidos)
+        for pedido in pedidos:
+            if pedido.prazo is None:
+                self.estimar_prazo(pedido)
+            self.incluir_pedido(pedido)
+        self.armazenamento.registrar_lote(self, [('pedido', pedido.to_dict()) for pedido in pedidos])
+
+    @metricas.medir('alterar_status')
+    @exclusivo
+    def alterar_status(self, pedido, status):
+        self.aguardar_carregamento()
+        quando = int(time.time())
+        self.definir_status(pedido, status, quando)
+        self.registrar('status', {'id': pedido.id, 'status': status, 'hora': quando})
+
+    @metricas.medir('alterar_status_lote')
+    @exclusivo
+    def alterar_status_lote(self, pedidos, status, horarios=None):
+        # Mesma transição para vários pedidos, com uma única gravação no
+        # armazenamento. Pedidos para os quais `status` não é o próximo passo
+        # ficam como estão; devolve os que mudaram. `horarios` (id -> hora)
+        # carimba cada mudança com outro instante que não agora: as transições
+        # automáticas usam o vencimento agendado, para que um atraso (o
+        # sistema parado) não entre no estimador como tempo de entrega.
+        self.aguardar_carregamento()
+        agora = int(time.time())
+        horarios = horarios or {}
+        alterados = [pedido for pedido in pedidos if PROXIMO_STATUS.get(pedido.status) == status]
+        registros = []
+        for pedido in alterados:
+            quando = int(horarios.get(pedido.id, agora))
+            self.definir_status(pedido, status, quando)
+            registros.append(('status', {'id': pedido.id, 'status': status, 'hora': quando}))
+        if alterados:
+            self.armazenamento.registrar_lote(self, registros)
+        return alterados
+
+    @exclusivo
+    def adicionar_entregador(self, entregador):
+        self.despacho.incluir_entregador(entregador)
+        self.registrar('entregador', entregador.to_dict())
+
+    @exclusivo
+    def alterar_senha(self, usuario, senha):
+        usuario.senha = senha
+        tipo = 'cliente' if isinstance(usuario, Cliente) else 'restaurante'
+        self.registrar('senha', {'tipo': tipo, 'nome': usuario.nome, 'senha': senha})
+
+    # --- Eventos ---
+    def assinar_eventos(self):
+        # Estruturas derivadas que acompanham os eventos do próprio Sistema.
+        # Os índices de pedidos, o agendador e o monitor de prazos continuam
+        # atualizados direto em incluir_pedido/definir_status, antes da
+        # publicação, para que os assinantes já os vejam em dia.
+        assinar = self.barramento.assinar
+        assinar(PedidoCriado, lambda evento: self.agregados.registrar_pedido(evento.pedido))
+        assinar(PedidoCriado, self.registrar_venda)
+        assinar(PedidoCriado, lambda evento: self.despacho.atualizar(evento.pedido))
+        assinar(StatusAlterado, self.status_alterado)
+        assinar(PratoCadastrado, lambda evento: self.busca.adicionar(evento.restaurante, evento.prato))
+        self.notificacoes.assinar(self.barramento)
+
+    def registrar_venda(self, evento):
+        if self.baldes_vendas is not None:
+            self.baldes_vendas.registrar_pedido(evento.pedido)
+
+    def status_alterado(self, evento):
+        # Sem `quando` (diários antigos) o estimador não aprende com a mudança.
+        if evento.quando is not None:
+            self.estimador.observar(evento.pedido, evento.anterior, evento.status, evento.quando)
+        self.despacho.atualizar(evento.pedido)
+
+    # --- Índices ---
+    # Os índices mantêm a primeira ocorrência de cada nome, como faziam as
+    # buscas lineares com next(...).
+    def incluir_cliente(self, cliente):
+        self.clientes.append(cliente)
+        self.clientes_por_nome.setdefault(cliente.nome, cliente)
+
+    def incluir_restaurante(self, restaurante):
+        self.restaurantes.append(restaurante)
+        self.restaurantes_por_nome.setdefault(restaurante.nome, restaurante)
+        reproduzido = not self.carregado.is_set()
+        for prato in restaurante.cardapio:
+            self.pratos_por_chave.setdefault((restaurante.nome, prato.nome), prato)
+            self.barramento.publicar(PratoCadastrado(restaurante, prato, reproduzido))
+
+    def incluir_prato(self, restaurante, prato):
+        restaurante.cardapio.append(prato)
+        self.pratos_por_chave.setdefault((restaurante.nome, prato.nome), prato)
+        self.barramento.publicar(PratoCadastrado(restaurante, prato, not self.carregado.is_set()))
+
+    @metricas.medir('login')
+    def login(self, tipo, nome, senha):
+        self.sincronizar()
+        # Sem senha não há login: buscar_* com senha None não confere nada.
+        buscar = self.buscar_cliente if tipo == 'cliente' else self.buscar_restaurante
+        usuario = buscar(nome, senha) if senha is not None else None
+        metricas.contar('logins' if usuario else 'logins_recusados')
+        return usuario
+
+    def buscar_cliente(self, nome, senha=None):
+        cliente = self.clientes_por_nome.get(nome)
+        if cliente and (senha is None or cliente.senha == senha):
+            return cliente
+        return None
+
+    def buscar_restaurante(self, nome, senha=None):
+        restaurante = self.restaurantes_por_nome.get(nome)
+        if restaurante and (senha is None or restaurante.senha == senha):
+            return restaurante
+        return None
+
+    def incluir_pedido(self, pedido):
+        if pedido.id is None:
+            pedido.id = self.proximo_id
+        self.proximo_id = max(self.proximo_id, pedido.id + 1)
+        if pedido.status == 'Em preparo':
+            self.estimador.registrar_fila(pedido, self.pedidos_restaurante.contar(pedido.restaurante.nome, 'Em preparo'))
+        self.pedidos.append(pedido)
+        self.pedidos_por_id[pedido.id] = pedido
+        self.pedidos_cliente.adicionar(pedido.cliente.nome, pedido)
+        self.pedidos_restaurante.adicionar(pedido.restaurante.nome, pedido)
+        self.agendador.agendar(pedido)
+        self.monitor_prazos.atualizar(pedido)
+        self.barramento.publicar(PedidoCriado(pedido, not self.carregado.is_set()))
+
+    def definir_status(self, pedido, status, quando=None):
+        # `quando` é o instante da mudança.
+        anterior = pedido.status
+        pedido.status = status
+        self.pedidos_cliente.mover(pedido.cliente.nome, pedido, anterior)
+        self.pedidos_restaurante.mover(pedido.restaurante.nome, pedido, anterior)
+        self.agendador.agendar(pedido)
+        self.monitor_prazos.atualizar(pedido)
+        self.barramento.publicar(StatusAlterado(pedido, anterior, status, quando, not self.carregado.is_set()))
+
+    # --- Persistência ---
+    def registrar(self, tipo, dados):
+        self.armazenamento.registrar(self, tipo, dados)
+
+    def extras(self):
+        # Estado auxiliar gravado junto com o snapshot.
+        return {
+            'estimativas': self.estimador.estado(),
+            'entregadores': [entregador.to_dict() for entregador in self.despacho.entregadores.values()],
         }
-        with open('delivery.data', 'w') as f:
-            json.dump(dados, f, indent=4)
 
-    def carregar_dados(self):
-        if os.path.exists('delivery.data'):
-            with open('delivery.data', 'r') as f:
-                dados = json.load(f)
-                for c in dados['clientes']:
-                    self.clientes.append(Cliente(c['nome'], c['telefone'], c['endereco'], c['email'], c['cpf'], c.get('senha', ''), c.get('resposta_secreta', '')))
-                for r in dados['restaurantes']:
-                    restaurante = Restaurante(r['nome'], r['telefone'], r['endereco'], r['email'], r['cpf'], r.get('senha', ''), r.get('resposta_secreta', ''))
-                    restaurante.cardapio = [Prato(**p) for p in r['cardapio']]
-                    self.restaurantes.append(restaurante)
-                for p in dados['pedidos']:
-                    cliente = next(c for c in self.clientes if c.nome == p['cliente'])
-                    restaurante = next(r for r in self.restaurantes if r.nome == p['restaurante'])
-                    pratos = [next(pr for pr in restaurante.cardapio if pr.nome == nome) for nome in p['pratos']]
-                    pedido = Pedido(cliente, restaurante, pratos)
-                    pedido.hora_pedido = datetime.strptime(p['hora_pedido'], '%Y-%m-%d %H:%M:%S')
-                    pedido.prazo_entrega = datetime.strptime(p['prazo_entrega'], '%Y-%m-%d %H:%M:%S')
-                    pedido.status = p['status']
-                    self.pedidos.append(pedido)
+    def restaurar_extras(self, extras):
+        self.estimador.restaurar(extras.get('estimativas', {}))
+        for e in extras.get('entregadores', []):
+            self.despacho.incluir_entregador(Entregador(e['nome'], e['endereco']))
+
+    # --- Arquivo ---
+    @metricas.medir('arquivar')
+    @exclusivo
+    def arquivar(self, agora=None, forcar=False):
+        # Move para o arquivo os pedidos entregues há mais de `arquivo.dias`.
+        # Roda no máximo uma vez por hora, a partir do agendador.
+        agora = time.time() if agora is None else agora
+        if self.arquivo is None or not self.carregado.is_set() or (agora < self.proximo_arquivamento and not forcar):
+            return 0
+        self.proximo_arquivamento = agora + 3600
+        corte = agora - self.arquivo.idade
+        entregue = CODIGOS_STATUS['Entregue']
+        antigos = [p for p in self.pedidos if p.codigo_status == entregue and p.hora < corte]
+        if not antigos:
+            return 0
+        self.arquivo.gravar(antigos)
+        por_restaurante = {}
+        for pedido in antigos:
+            por_restaurante.setdefault(pedido.restaurante.nome, []).append(pedido.id)
+        self.remover_pedidos([pedido.id for pedido in antigos])
+        self.armazenamento.registrar_lote(self, [('arquivados', {'restaurante': restaurante, 'ids': ids})
+                                                 for restaurante, ids in por_restaurante.items()])
+        metricas.contar('pedidos_arquivados', len(antigos))
+        return len(antigos)
+
+    def remover_pedidos(self, ids, descontar=False):
+        # Tira pedidos da memória. Estatísticas e vendas continuam contando
+        # com eles (depois de recarregar, pelos resumos do arquivo), a não ser
+        # com `descontar`.
+        removidos = [self.pedidos_por_id.pop(i) for i in ids if i in self.pedidos_por_id]
+        if not removidos:
+            return
+        if descontar:
+            for pedido in removidos:
+                self.agregados.descontar_pedido(pedido)
+                if self.baldes_vendas is not None:
+                    self.baldes_vendas.registrar_pedido(pedido, -1)
+        identidades = {id(pedido) for pedido in removidos}
+        self.pedidos[:] = [p for p in self.pedidos if id(p) not in identidades]
+        por_cliente, por_restaurante = {}, {}
+        for pedido in removidos:
+            por_cliente.setdefault(pedido.cliente.nome, []).append(pedido)
+            por_restaurante.setdefault(pedido.restaurante.nome, []).append(pedido)
+        for nome, pedidos in por_cliente.items():
+            self.pedidos_cliente.remover(nome, pedidos)
+        for nome, pedidos in por_restaurante.items():
+            self.pedidos_restaurante.remover(nome, pedidos)
+
+    def concluir_arquivamento(self):
+        # Uma queda entre gravar o arquivo e registrar 'arquivados' deixa os
+        # pedidos do último lote no arquivo e ainda na memória, contados duas
+        # vezes. Na carga, eles saem como se o evento tivesse sido reaplicado
+        # e o evento é registrado agora.
+        restantes = {}
+        for identificador in self.arquivo.manifesto.get('pendentes', ()):
+            pedido = self.pedidos_por_id.get(identificador)
+            if pedido is not None:
+                restantes.setdefault(pedido.restaurante.nome, []).append(identificador)
+        if not restantes:
+            return
+        eventos = [('arquivados', {'restaurante': restaurante, 'ids': ids}) for restaurante, ids in restantes.items()]
+        for tipo, dados in eventos:
+            self.aplicar(tipo, dados)
+        self.armazenamento.registrar_lote(self, eventos)
+
+    def incluir_resumos_arquivados(self):
+        for dia, entrada in self.arquivo.manifesto['dias'].items():
+            for restaurante, resumo in entrada['restaurantes'].items():
+                self.agregados.registrar_resumo(restaurante, resumo)
+
+    @property
+    def vendas(self):
+        # Os baldes de vendas só são montados na primeira consulta, depois da
+        # carga e numa passada pelas colunas; a carga do histórico não paga
+        # por eles. Daí em diante acompanham cada pedido incluído.
+        if self.baldes_vendas is None:
+            self.aguardar_carregamento()
+            self.reconstruir_vendas()
+        return self.baldes_vendas
+
+    @metricas.medir('reconstruir_vendas')
+    @exclusivo
+    def reconstruir_vendas(self):
+        # Refaz os baldes de vendas a partir de todo o histórico de pedidos
+        # (opção 13 do painel do administrador).
+        armazem = ArmazemPedidos(self.clientes, self.restaurantes)
+        for pedido in self.pedidos:
+            armazem.adicionar(pedido)
+        vendas = VendasPorPeriodo.de_armazem(armazem)
+        if self.arquivo is not None:
+            for dia, entrada in self.arquivo.manifesto['dias'].items():
+                for restaurante, resumo in entrada['restaurantes'].items():
+                    vendas.registrar_resumo(restaurante, date.fromisoformat(dia).toordinal(), resumo)
+        self.baldes_vendas = vendas
+
+    def reservar_ids(self, pedidos):
+        # Com outros processos gravando, os ids vêm do armazenamento.
+        quantidade = sum(1 for pedido in pedidos if pedido.id is None)
+        if quantidade:
+            self.proximo_id = self.armazenamento.reservar_ids(self, quantidade)
+
+    @exclusivo
+    def sincronizar(self):
+        # Aplica o que outros processos gravaram desde a última chamada.
+        if self.carregado.is_set():
+            self.armazenamento.sincronizar(self)
+
+    def flush(self):
+        # Garante que as mutações já feitas estão gravadas (gravação adiada).
+        self.armazenamento.flush()
+
+    def fechar(self):
+        # Fim do processo: grava o que estiver pendente e fecha o armazenamento.
+        self.armazenamento.fechar()
+
+    def banco(self):
+        # O ArmazenamentoSQLite por trás do Sistema (direto ou sob a gravação
+        # adiada, com a fila já gravada), para consultas que o banco responde
+        # pelos seus índices; None com outros armazenamentos.
+        armazenamento = self.armazenamento
+        if isinstance(armazenamento, ArmazenamentoDiferido):
+            armazenamento = armazenamento.interno
+        if not isinstance(armazenamento, ArmazenamentoSQLite):
+            return None
+        self.armazenamento.flush()
+        return armazenamento
+
+    @metricas.medir('salvar_dados')
+    @exclusivo
+    def salvar_dados(self):
+        self.aguardar_carregamento()
+        self.armazenamento.salvar(self)
+
+    @metricas.medir('carregar_dados')
+    def carregar_dados(self, em_segundo_plano=False):
+        # O armazenamento carrega clientes e restaurantes imediatamente e
+        # devolve uma função que carrega o histórico de pedidos, executada
+        # depois, opcionalmente em uma thread.
+        carregar_pedidos = metricas.medir('carregar_pedidos')(self.armazenamento.carregar(self))
+
+        def concluir():
+            try:
+                carregar_pedidos()
+                if self.arquivo is not None:
+                    self.concluir_arquivamento()
+            finally:
+                self.carregado.set()
+
+        if em_segundo_plano:
+            threading.Thread(target=concluir, daemon=True).start()
+        else:
+            concluir()
+
+    def aguardar_carregamento(self):
+        if not self.carregado.is_set():
+            print("Carregando histórico de pedidos...")
+            self.carregado.wait()
+
+    def aplicar(self, tipo, dados):
+        if tipo == 'cliente':
+            self.incluir_cliente(cliente_de_dict(dados))
+        elif tipo == 'restaurante':
+            self.incluir_restaurante(restaurante_de_dict(dados))
+        elif tipo == 'prato':
+            restaurante = self.restaurantes_por_nome[dados['restaurante']]
+            self.incluir_prato(restaurante, Prato(dados['nome'], dados['preco'], dados['descricao'], dados.get('imagem')))
+        elif tipo == 'pedido':
+            self.incluir_pedido(self.pedido_de_dict(dados))
+        elif tipo == 'status':
+            self.definir_status(self.pedidos_por_id[dados['id']], dados['status'], dados.get('hora'))
+        elif tipo == 'entregador':
+            self.despacho.incluir_entregador(Entregador(dados['nome'], dados['endereco']))
+        elif tipo == 'arquivados':
+            # Na carga, os resumos do manifesto já contam estes pedidos, que
+            # também foram contados ao serem incluídos.
+            self.remover_pedidos(dados['ids'], descontar=not self.carregado.is_set())
+        elif tipo == 'senha':
+            indice = self.clientes_por_nome if dados['tipo'] == 'cliente' else self.restaurantes_por_nome
+            indice[dados['nome']].senha = dados['senha']
+
+    def pedido_de_dict(self, p):
+        cliente = self.clientes_por_nome[p['cliente']]
+        restaurante = self.restaurantes_por_nome[p['restaurante']]
+        pratos = [self.pratos_por_chave[(restaurante.nome, nome)] for nome in p['pratos']]
+        pedido = Pedido(cliente, restaurante, pratos)
+        pedido.id = p.get('id')
+        pedido.hora = p['hora_pedido']
+        if 'prazo_entrega' in p:
+            pedido.prazo = p['prazo_entrega']
+        else:
+            pedido.prazo = pedido.hora + PRAZO_PADRAO
+        pedido.status = p['status']
+        return pedido
+
+def cliente_de_dict(c):
+    return Cliente(c['nome'], c['telefone'], c['endereco'], c['email'], c['cpf'], c.get('senha', ''), c.get('resposta_secreta', ''))
+
+def restaurante_de_dict(r):
+    restaurante = Restaurante(r['nome'], r['telefone'], r['endereco'], r['email'], r['cpf'], r.get('senha', ''), r.get('resposta_secreta', ''))
+    restaurante.cardapio = [Prato(**p) for p in r.get('cardapio', [])]
+    return restaurante
+
+def restaurante_para_dict(restaurante, tamanho_cardapio=None):
+    return {**restaurante.__dict__, 'cardapio': [prato.to_dict() for prato in restaurante.cardapio[:tamanho_cardapio]]}
+
+def migrar_para_sqlite(origem='delivery.data', destino='delivery.db'):
+    sistema = Sistema(ArmazenamentoJSON(origem))
+    armazenamento = ArmazenamentoSQLite(destino)
+    armazenamento.salvar(sistema)
+    armazenamento.fechar()
+    return sistema
+
+def converter_snapshot(origem, destino):
+    sistema = Sistema(origem)
+    destino.salvar(sistema)
+    return sistema
+
+def json_para_colunar(origem='delivery.data', destino='delivery.col'):
+    return converter_snapshot(ArmazenamentoJSON(origem), ArmazenamentoColunar(destino))
+
+def colunar_para_json(origem='delivery.col', destino='delivery.data'):
+    return converter_snapshot(ArmazenamentoColunar(origem), ArmazenamentoJSON(destino))
+
+def retrato(sistema):
+    return (
+        [cliente.__dict__ for cliente in sistema.clientes],
+        [restaurante_para_dict(restaurante) for restaurante in sistema.restaurantes],
+        [pedido.to_dict() for pedido in sistema.pedidos],
+        sistema.proximo_id,
+    )
+
+def verificar_ida_e_volta(origem='delivery.data'):
+    # Converte JSON -> colunar -> JSON em um diretório temporário e devolve
+    # as diferenças encontradas em cada etapa (lista vazia se nenhuma).
+    original = retrato(Sistema(ArmazenamentoJSON(origem)))
+    diferencas = []
+    with tempfile.TemporaryDirectory() as pasta:
+        colunar = os.path.join(pasta, 'delivery.col')
+        volta = os.path.join(pasta, 'delivery.data')
+        json_para_colunar(origem, colunar)
+        etapas = (
+            ('colunar', retrato(Sistema(ArmazenamentoColunar(colunar)))),
+            ('json', retrato(colunar_para_json(colunar, volta))),
+            ('json relido', retrato(Sistema(ArmazenamentoJSON(volta)))),
+        )
+        for etapa, convertido in etapas:
+            for nome, esperado, obtido in zip(('clientes', 'restaurantes', 'pedidos', 'proximo_id'), original, convertido):
+                if esperado != obtido:
+                    diferencas.append(f"{etapa}: {nome} diferentes")
+    return diferencas
+
+# --- Importação em lote ---
+# Cada linha do arquivo é um objeto JSON com "cliente", "restaurante" e
+# "pratos" (nomes) e, opcionalmente, "hora_pedido", "prazo_entrega" e
+# "status". A validação usa apenas nomes, para poder rodar em outros
+# processos a partir de um catálogo simples.
+catalogo_validacao = None
+
+def montar_catalogo(sistema):
+    clientes = set(sistema.clientes_por_nome)
+    cardapios = {nome: {prato.nome for prato in r.cardapio} for nome, r in sistema.restaurantes_por_nome.items()}
+    return clientes, cardapios
+
+def iniciar_validacao(catalogo):
+    global catalogo_validacao
+    catalogo_validacao = catalogo
+
+def validar_registro(linha, catalogo):
+    clientes, cardapios = catalogo
+    try:
+        registro = json.loads(linha)
+    except ValueError:
+        return None, 'JSON inválido'
+    if not isinstance(registro, dict):
+        return None, 'registro não é um objeto'
+    for campo in ('cliente', 'restaurante', 'status', 'hora_pedido', 'prazo_entrega'):
+        if campo in registro and not isinstance(registro[campo], str):
+            return None, f"{campo} deve ser texto: {registro[campo]!r}"
+    if registro.get('cliente') not in clientes:
+        return None, f"cliente desconhecido: {registro.get('cliente')!r}"
+    cardapio = cardapios.get(registro.get('restaurante'))
+    if cardapio is None:
+        return None, f"restaurante desconhecido: {registro.get('restaurante')!r}"
+    pratos = registro.get('pratos')
+    if not pratos or not isinstance(pratos, list):
+        return None, 'pedido sem pratos'
+    for prato in pratos:
+        if not isinstance(prato, str):
+            return None, f"prato deve ser texto: {prato!r}"
+        if prato not in cardapio:
+            return None, f"prato fora do cardápio: {prato!r}"
+    status = registro.get('status', 'Em preparo')
+    if status not in CODIGOS_STATUS:
+        return None, f"status inválido: {status!r}"
+    try:
+        # O strptime confere os intervalos (mês 13, hora 99...) que o
+        # mktime de `epoca` normalizaria sem avisar.
+        hora = prazo = None
+        if 'hora_pedido' in registro:
+            hora = int(datetime.strptime(registro['hora_pedido'], '%Y-%m-%d %H:%M:%S').timestamp())
+        if 'prazo_entrega' in registro:
+            prazo = int(datetime.strptime(registro['prazo_entrega'], '%Y-%m-%d %H:%M:%S').timestamp())
+    except (ValueError, OverflowError):
+        return None, 'horário inválido'
+    return (registro['cliente'], registro['restaurante'], pratos, hora, prazo, CODIGOS_STATUS[status]), None
+
+def validar_bloco(bloco):
+    return [(numero,) + validar_registro(linha, catalogo_validacao) for numero, linha in bloco]
+
+def ler_blocos(caminho, tamanho_lote):
+    bloco = []
+    with open(caminho, 'r') as f:
+        for numero, linha in enumerate(f, 1):
+            if linha.strip():
+                bloco.append((numero, linha))
+            if len(bloco) == tamanho_lote:
+                yield bloco
+                bloco = []
+    if bloco:
+        yield bloco
+
+def importar_pedidos(sistema, caminho, tamanho_lote=1000, processos=0):
+    sistema.aguardar_carregamento()
+    inicio = time.perf_counter()
+    catalogo = montar_catalogo(sistema)
+    blocos = ler_blocos(caminho, tamanho_lote)
+    if processos:
+        pool = multiprocessing.Pool(processos, initializer=iniciar_validacao, initargs=(catalogo,))
+        validados = pool.imap(validar_bloco, blocos)
+    else:
+        pool = None
+        iniciar_validacao(catalogo)
+        validados = map(validar_bloco, blocos)
+
+    lidos = importados = 0
+    rejeitados = []
+    try:
+        for bloco in validados:
+            lote = []
+            for numero, registro, erro in bloco:
+                lidos += 1
+                if erro:
+                    rejeitados.append((numero, erro))
+                    continue
+                cliente, restaurante, pratos, hora, prazo, status = registro
+                restaurante = sistema.restaurantes_por_nome[restaurante]
+                pedido = Pedido(sistema.clientes_por_nome[cliente], restaurante,
+                                [sistema.pratos_por_chave[(restaurante.nome, nome)] for nome in pratos])
+                if hora is not None:
+                    pedido.hora = hora
+                # Sem prazo no arquivo, o Sistema usa o estimador.
+                pedido.prazo = prazo
+                pedido.codigo_status = status
+                lote.append(pedido)
+            if lote:
+                sistema.adicionar_pedidos(lote)
+                importados += len(lote)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    segundos = time.perf_counter() - inicio
+    return {
+        'lidos': lidos,
+        'importados': importados,
+        'rejeitados': len(rejeitados),
+        'segundos': round(segundos, 3),
+        'pedidos_por_segundo': round(importados / segundos, 1) if segundos else None,
+        'erros': rejeitados,
+    }
 
 # --- Funções Auxiliares ---
+@metricas.medir('atualizar_status')
 def atualizar_status_automaticamente():
-    agora = datetime.now()
-    for pedido in sistema.pedidos:
-        if pedido.status == 'Em preparo' and agora - pedido.hora_pedido >= timedelta(seconds=10):
-            pedido.status = 'A caminho'
-        elif pedido.status == 'A caminho' and agora - pedido.hora_pedido >= timedelta(seconds=20):
-            pedido.status = 'Entregue'
-    sistema.salvar_dados()
+    if not sistema.carregado.is_set() or not sistema.armazenamento.lider():
+        return
+    sistema.sincronizar()
+    mudancas = sistema.agendador.vencidos(time.time())
+    for status in ('A caminho', 'Entregue'):
+        pedidos = [pedido for pedido, proximo, _ in mudancas if proximo == status]
+        if pedidos:
+            horarios = {pedido.id: vencimento for pedido, proximo, vencimento in mudancas if proximo == status}
+            sistema.alterar_status_lote(pedidos, status, horarios)
+    sistema.despacho.despachar()
+    sistema.arquivar()
+
+class Relogio:
+    # Roda o passo acima numa thread, a cada `intervalo` segundos, para que as
+    # transições não dependam de alguém estar navegando no menu.
+    def __init__(self, intervalo=1.0):
+        self.intervalo = intervalo
+        self.parar = threading.Event()
+        self.thread = None
+
+    def iniciar(self):
+        self.thread = threading.Thread(target=self.executar, name='relogio', daemon=True)
+        self.thread.start()
+
+    def executar(self):
+        while not self.parar.wait(self.intervalo):
+            # Um passo com erro (disco cheio, banco travado) não pode parar as
+            # transições de vez: registra e tenta de novo no próximo.
+            try:
+                with sistema.trava:
+                    atualizar_status_automaticamente()
+            except Exception:
+                metricas.contar('erros_relogio')
+                traceback.print_exc()
+
+    def encerrar(self):
+        self.parar.set()
+        if self.thread is not None:
+            self.thread.join()
+
+def mostrar_avisos(tipo, nome):
+    for aviso in sistema.notificacoes.retirar(tipo, nome):
+        print(f"🔔 {aviso}")
+
+def mais_pedidos(n, restaurante=None):
+    # Com SQLite o ranking sai do banco. Com arquivo, o banco não tem mais os
+    # pedidos arquivados, que os agregados em memória continuam contando.
+    banco = sistema.banco() if sistema.arquivo is None else None
+    if banco is not None:
+        return banco.mais_pedidos(n, restaurante)
+    return sistema.agregados.mais_pedidos(n, restaurante)
 
 def interface_admin():
+    sistema.aguardar_carregamento()
     while True:
         print("\n🔧 Painel do Administrador")
         print("1 - Ver todos os clientes")
         print("2 - Ver todos os restaurantes")
         print("3 - Ver total de pedidos")
         print("4 - Ver pratos mais pedidos")
+        print("5 - Ver faturamento por restaurante")
+        print("6 - Ver pratos mais pedidos de um restaurante")
+        print("7 - Ver métricas de desempenho")
+        print("8 - Ver pedidos atrasados")
+        print("9 - Ver estimativas de entrega")
+        print("10 - Entregadores")
+        print("11 - Relatório de vendas")
+        print("12 - Pedidos arquivados")
+        print("13 - Reconstruir relatórios de vendas")
         print("0 - Sair")
         op = input("Escolha uma opção: ")
 
@@ -147,81 +3166,195 @@ def interface_admin():
             for r in sistema.restaurantes:
                 print(f"- {r.nome} | {r.email}")
         elif op == "3":
-            print(f"Total de pedidos: {len(sistema.pedidos)}")
+            print(f"Total de pedidos: {sistema.agregados.total_pedidos}")
         elif op == "4":
-            todos_pratos = [p.nome for pedido in sistema.pedidos for p in pedido.pratos]
-            mais_comuns = Counter(todos_pratos).most_common(5)
-            for nome, qtd in mais_comuns:
+            for nome, qtd in mais_pedidos(5):
                 print(f"{nome} - {qtd} pedidos")
+        elif op == "5":
+            agregados = sistema.agregados
+            for nome, receita in agregados.receita_por_restaurante.most_common():
+                print(f"{nome} - {agregados.pedidos_por_restaurante[nome]} pedidos | R$ {receita:.2f}")
+        elif op == "6":
+            nome = input("Nome do Restaurante: ")
+            for prato, qtd in mais_pedidos(5, nome):
+                print(f"{prato} - {qtd} pedidos")
+        elif op == "7":
+            if not metricas.ativo:
+                print("Métricas desativadas (--sem-metricas).")
+                continue
+            print(metricas.resumo())
+            arquivo = input("Exportar para arquivo (Enter para pular): ").strip()
+            if arquivo:
+                with open(arquivo, 'w') as f:
+                    f.write(metricas.texto())
+                print(f"Métricas exportadas para {arquivo}.")
+        elif op == "8":
+            relatorio_atrasados()
+        elif op == "9":
+            relatorio_estimativas()
+        elif op == "10":
+            gerenciar_entregadores()
+        elif op == "11":
+            relatorio_vendas()
+        elif op == "12":
+            relatorio_arquivo()
+        elif op == "13":
+            inicio = time.perf_counter()
+            sistema.reconstruir_vendas()
+            print(f"Relatórios de vendas refeitos a partir de {len(sistema.pedidos)} pedidos em {time.perf_counter() - inicio:.2f}s.")
         elif op == "0":
             break
         else:
             print("Opção inválida.")
 
+def relatorio_atrasados():
+    sistema.sincronizar()
+    try:
+        minutos = int(input("Janela de vencimento em minutos (padrão 10): ") or 10)
+    except ValueError:
+        minutos = 10
+    agora = time.time()
+    monitor = sistema.monitor_prazos
+    atrasados = monitor.atrasados(agora)
+    print(f"\n{len(atrasados)} de {len(monitor)} pedidos ativos atrasados.")
+    for nome, quantidade in monitor.atrasados_por_restaurante(agora).most_common():
+        print(f"- {nome}: {quantidade} atrasados")
+    if atrasados:
+        print("\nMais atrasados:")
+        for p in atrasados[:10]:
+            minutos_atraso = int((agora - p.prazo) // 60)
+            print(f"Pedido {p.id} | {p.restaurante.nome} | Cliente: {p.cliente.nome} | {p.status} | {minutos_atraso} min de atraso")
+    vencendo = monitor.vencendo(agora, minutos * 60)
+    print(f"\n{len(vencendo)} pedidos vencem nos próximos {minutos} minutos.")
+    for p in vencendo[:10]:
+        print(f"Pedido {p.id} | {p.restaurante.nome} | {p.status} | prazo {p.prazo_entrega.strftime('%H:%M')}")
+
+def relatorio_estimativas():
+    estimador = sistema.estimador
+    print(f"{'restaurante':<24}{'preparo/pedido':>16}{'transporte':>12}{'em preparo':>12}{'prazo agora':>13}")
+    for r in sistema.restaurantes:
+        medias = estimador.restaurantes.get(r.nome)
+        if medias is None:
+            continue
+        fila = sistema.pedidos_restaurante.contar(r.nome, 'Em preparo')
+        print(f"{r.nome:<24}{medias[0] / 60:>12.1f} min{medias[2] / 60:>8.1f} min{fila:>12}"
+              f"{estimador.estimar(r.nome, fila) / 60:>9.1f} min")
+    geral = estimador.geral
+    print(f"{'(geral)':<24}{geral[0] / 60:>12.1f} min{geral[2] / 60:>8.1f} min")
+
+def relatorio_vendas(restaurante=None):
+    # Hoje por hora e últimos 7 dias por dia, dos baldes de VendasPorPeriodo.
+    sistema.aguardar_carregamento()
+    vendas = sistema.vendas
+    agora = datetime.now()
+    hoje = agora.date()
+    semana = date.fromordinal(hoje.toordinal() - 6)
+    meia_noite = int(agora.replace(hour=0, minute=0, second=0, microsecond=0).timestamp())
+    print("\nHoje, por hora:")
+    for hora, pedidos, receita in vendas.por_hora(meia_noite, int(agora.timestamp()) + 1, restaurante):
+        if pedidos:
+            print(f"{datetime.fromtimestamp(hora).strftime('%H:00')}  {pedidos:>6} pedidos | R$ {receita:>10.2f}")
+    print("\nÚltimos 7 dias:")
+    total_pedidos, total_receita = 0, 0.0
+    for dia, pedidos, receita in vendas.por_dia(semana, hoje, restaurante):
+        total_pedidos += pedidos
+        total_receita += receita
+        print(f"{dia.strftime('%d/%m')}  {pedidos:>6} pedidos | R$ {receita:>10.2f}")
+    print(f"Total  {total_pedidos:>6} pedidos | R$ {total_receita:>10.2f}")
+    print("\nPratos de maior receita (7 dias):")
+    for nome, quantidade, receita in vendas.pratos(semana, hoje, restaurante):
+        print(f"{nome} - {quantidade} vendidos | R$ {receita:.2f}")
+    if restaurante is None:
+        print("\nRestaurantes (7 dias):")
+        for nome, pedidos, receita in vendas.restaurantes(semana, hoje)[:10]:
+            print(f"{nome} - {pedidos} pedidos | R$ {receita:.2f}")
+
+def relatorio_arquivo():
+    arquivo = sistema.arquivo
+    if arquivo is None:
+        print("Não há arquivo de pedidos (--arquivo).")
+        return
+    print(f"Pedidos entregues há mais de {arquivo.idade // 86400} dias ficam em {arquivo.pasta}.")
+    dias = arquivo.dias()
+    for dia in dias[:14]:
+        entrada = arquivo.manifesto['dias'][dia]
+        receita = sum(r['receita'] for r in entrada['restaurantes'].values())
+        print(f"{dia}  {entrada['pedidos']:>6} pedidos | R$ {receita:>10.2f} | {entrada['tamanho'] / 1024:.0f} KB")
+    if len(dias) > 14:
+        print(f"... e mais {len(dias) - 14} dias")
+    dia = input("Ver os pedidos de um dia (AAAA-MM-DD, Enter para voltar): ").strip()
+    if dia:
+        restaurante = input("Restaurante (Enter para todos): ").strip() or None
+        for p in arquivo.pedidos(dia, restaurante=restaurante):
+            print(f"#{p['id']} {p['hora_pedido'][11:16]} | {p['restaurante']} | {p['cliente']} | R$ {p['valor']:.2f}")
+
+def gerenciar_entregadores():
+    despacho = sistema.despacho
+    for e in despacho.entregadores.values():
+        situacao = f"{len(e.rota)} pedido(s) em rota" if e.rota else "livre"
+        print(f"- {e.nome} | {e.endereco} | {situacao}")
+    print(f"Aguardando entregador: {len(despacho.pendentes)} pedido(s)")
+    nome = input("Cadastrar entregador (Enter para voltar): ").strip()
+    if not nome:
+        return
+    if nome in despacho.entregadores:
+        print("Entregador já cadastrado.")
+        return
+    sistema.adicionar_entregador(Entregador(nome, input("Endereço de partida: ")))
+    print("Entregador cadastrado com sucesso.")
+
+def descrever_entregador(pedido):
+    entregador = sistema.despacho.entregador_do_pedido(pedido)
+    return f" | Entregador: {entregador.nome}" if entregador else ""
+
 def recuperar_senha(tipo):
     nome = input("Nome: ")
-    lista = sistema.clientes if tipo == 'cliente' else sistema.restaurantes
-    usuario = next((u for u in lista if u.nome == nome), None)
+    usuario = sistema.buscar_cliente(nome) if tipo == 'cliente' else sistema.buscar_restaurante(nome)
     if usuario:
         resposta = input("Qual o nome do seu primeiro pet? ")
         if hasattr(usuario, 'resposta_secreta') and usuario.resposta_secreta.lower() == resposta.lower():
             nova_senha = input("Nova senha: ")
-            usuario.senha = nova_senha
-            sistema.salvar_dados()
+            sistema.alterar_senha(usuario, nova_senha)
             print("Senha atualizada com sucesso.")
         else:
             print("Resposta incorreta.")
     else:
         print("Usuário não encontrado.")
 
-class Sistema:
-    def __init__(self):
-        self.clientes = []
-        self.restaurantes = []
-        self.pedidos = []
-        self.carregar_dados()
-
-    def salvar_dados(self):
-        dados = {
-            'clientes': [cliente.__dict__ for cliente in self.clientes],
-            'restaurantes': [{**restaurante.__dict__, 'cardapio': [prato.__dict__ for prato in restaurante.cardapio]} for restaurante in self.restaurantes],
-            'pedidos': [pedido.to_dict() for pedido in self.pedidos]
-        }
-        with open('delivery.data', 'w') as f:
-            json.dump(dados, f, indent=4)
-
-    def carregar_dados(self):
-        if os.path.exists('delivery.data'):
-            with open('delivery.data', 'r') as f:
-                dados = json.load(f)
-                for c in dados['clientes']:
-                    cliente = Cliente(c['nome'], c['telefone'], c['endereco'], c['email'], c['cpf'], c.get('senha', ''), c.get('resposta_secreta', ''))
-                for r in dados['restaurantes']:
-                    restaurante = Restaurante(r['nome'], r['telefone'], r['endereco'], r['email'], r['cpf'], r.get('senha', ''), r.get('resposta_secreta', ''))
-                    restaurante.cardapio = [Prato(**p) for p in r['cardapio']]
-                    self.restaurantes.append(restaurante)
-                for p in dados['pedidos']:
-                    cliente = next(c for c in self.clientes if c.nome == p['cliente'])
-                    restaurante = next(r for r in self.restaurantes if r.nome == p['restaurante'])
-                    pratos = [next(pr for pr in restaurante.cardapio if pr.nome == nome) for nome in p['pratos']]
-                    pedido = Pedido(cliente, restaurante, pratos)
-                    pedido.hora_pedido = datetime.strptime(p['hora_pedido'], '%Y-%m-%d %H:%M:%S')
-                    if 'prazo_entrega' in p:
-                        pedido.prazo_entrega = datetime.strptime(p['prazo_entrega'], '%Y-%m-%d %H:%M:%S')
-                    else:
-                        pedido.prazo_entrega = pedido.hora_pedido + timedelta(minutes=30)
-                    pedido.status = p['status']
-                    self.pedidos.append(pedido)
-
 def cadastrar_prato(restaurante):
     nome = input("Nome do prato: ")
     preco = float(input("Preço: R$ "))
     descricao = input("Descrição: ")
     prato = Prato(nome, preco, descricao)
-    restaurante.cardapio.append(prato)
-    sistema.salvar_dados()
+    sistema.adicionar_prato(restaurante, prato)
     print("Prato cadastrado com sucesso!")
 
+def ler_preco(mensagem):
+    try:
+        return float(input(mensagem).replace(',', '.'))
+    except ValueError:
+        return None
+
+def buscar_prato():
+    # Devolve (restaurante, prato) escolhido na busca, ou None.
+    consulta = input("Buscar prato: ")
+    minimo = ler_preco("Preço mínimo (Enter para qualquer): R$ ")
+    maximo = ler_preco("Preço máximo (Enter para qualquer): R$ ")
+    resultados = sistema.busca.buscar(consulta, minimo, maximo)
+    if not resultados:
+        print("Nenhum prato encontrado.")
+        return None
+    for i, (restaurante, prato) in enumerate(resultados):
+        print(f"{i + 1} - {prato.nome} (R$ {prato.preco:.2f}) - {restaurante.nome} - {prato.descricao}")
+    try:
+        escolha = int(input("Escolha um prato pelo número: ")) - 1
+    except ValueError:
+        escolha = -1
+    if not 0 <= escolha < len(resultados):
+        print("Escolha inválida.")
+        return None
+    return resultados[escolha]
+
 def fazer_pedido(cliente):
     if not sistema.restaurantes:
         print("Nenhum restaurante disponível.")
@@ -230,14 +3363,21 @@ def fazer_pedido(cliente):
     print("\nRestaurantes disponíveis:")
     for i, r in enumerate(sistema.restaurantes):
         print(f"{i + 1} - {r.nome}")
-    escolha = int(input("Escolha um restaurante pelo número: ")) - 1
-
-    if escolha < 0 or escolha >= len(sistema.restaurantes):
-        print("Escolha inválida.")
-        return
-
-    restaurante = sistema.restaurantes[escolha]
+    op = input("Escolha um restaurante pelo número (ou 'b' para buscar um prato): ")
     pratos = []
+    if op.lower() == 'b':
+        encontrado = buscar_prato()
+        if encontrado is None:
+            return
+        restaurante, prato = encontrado
+        pratos.append(prato)
+        print(f"{prato.nome} adicionado ao pedido.")
+    else:
+        if not op.isdigit() or not 1 <= int(op) <= len(sistema.restaurantes):
+            print("Escolha inválida.")
+            return
+        restaurante = sistema.restaurantes[int(op) - 1]
+
     while True:
         print("\nCardápio:")
         for i, prato in enumerate(restaurante.cardapio):
@@ -259,15 +3399,37 @@ def fazer_pedido(cliente):
 
     if pratos:
         pedido = Pedido(cliente, restaurante, pratos)
-        sistema.pedidos.append(pedido)
-        sistema.salvar_dados()
+        sistema.adicionar_pedido(pedido)
         print("Pedido realizado com sucesso!")
     else:
         print("Nenhum prato foi selecionado.")
 
+def filtrar_pedidos(indice, chave, banco=None):
+    sistema.aguardar_carregamento()
+    sistema.sincronizar()
+    print("1 - Todos\n2 - Apenas ativos\n3 - Mais recentes")
+    filtro = input("Filtro: ")
+    status, limite = None, None
+    if filtro == "2":
+        status = STATUS_ATIVOS
+    elif filtro == "3":
+        try:
+            limite = int(input("Quantidade: "))
+        except ValueError:
+            limite = 10
+    if banco is not None:
+        # O banco filtra pelos seus índices e devolve ids; os pedidos vêm da
+        # memória.
+        ids = banco.pedidos_restaurante(chave, status, limite)
+        with sistema.trava:
+            return [sistema.pedidos_por_id[i] for i in ids if i in sistema.pedidos_por_id]
+    # O relógio muda status em outra thread.
+    with sistema.trava:
+        return indice.consultar(chave, status, limite)
+
 def ver_pedidos_cliente(cliente):
     print("\nPedidos do Cliente:")
-    pedidos = [p for p in sistema.pedidos if p.cliente.nome == cliente.nome]
+    pedidos = filtrar_pedidos(sistema.pedidos_cliente, cliente.nome)
     if not pedidos:
         print("Nenhum pedido encontrado.")
         return
@@ -277,12 +3439,29 @@ def ver_pedidos_cliente(cliente):
         if p.esta_atrasado():
             status = 'Atrasado'
         pratos_str = ', '.join(pr.nome for pr in p.pratos)
-        print(f"Restaurante: {p.restaurante.nome} | Pratos: {pratos_str} | Status: {status} | Hora Pedido: {p.hora_pedido.strftime('%H:%M')} | Estimado: {p.prazo_entrega.strftime('%H:%M')}")
+        print(f"Restaurante: {p.restaurante.nome} | Pratos: {pratos_str} | Status: {status} | Hora Pedido: {p.hora_pedido.strftime('%H:%M')} | Estimado: {p.prazo_entrega.strftime('%H:%M')}{descrever_entregador(p)}")
+
 
+def ver_historico_arquivado(cliente=None, restaurante=None):
+    # Um dia por vez, do mais recente para o mais antigo; cada dia só é lido
+    # do arquivo quando chega a sua vez.
+    if sistema.arquivo is None:
+        print("Não há arquivo de pedidos (--arquivo).")
+        return
+    encontrou = False
+    for dia, pedidos in sistema.arquivo.historico(cliente, restaurante):
+        encontrou = True
+        print(f"\n{date.fromisoformat(dia).strftime('%d/%m/%Y')}:")
+        for p in pedidos:
+            outro = f"Cliente: {p['cliente']}" if restaurante else f"Restaurante: {p['restaurante']}"
+            print(f"{outro} | Pratos: {', '.join(p['pratos'])} | R$ {p['valor']:.2f} | Hora Pedido: {p['hora_pedido'][11:16]}")
+        if input("Enter para o dia anterior, 0 para voltar: ").strip() == "0":
+            return
+    print("Fim do histórico arquivado." if encontrou else "Nenhum pedido arquivado.")
 
 def ver_pedidos_restaurante(restaurante):
     print("\nPedidos do Restaurante:")
-    pedidos = [p for p in sistema.pedidos if p.restaurante.nome == restaurante.nome]
+    pedidos = filtrar_pedidos(sistema.pedidos_restaurante, restaurante.nome, sistema.banco())
     if not pedidos:
         print("Nenhum pedido encontrado.")
         return
@@ -292,7 +3471,9 @@ def ver_pedidos_restaurante(restaurante):
         if p.esta_atrasado():
             status = 'Atrasado'
         pratos_str = ', '.join(pr.nome for pr in p.pratos)
-        print(f"\nPedido {i+1} | Cliente: {p.cliente.nome} | Pratos: {pratos_str} | Status: {status} | Hora Pedido: {p.hora_pedido.strftime('%H:%M')} | Estimado: {p.prazo_entrega.strftime('%H:%M')}")
+        print(f"\nPedido {i+1} | Cliente: {p.cliente.nome} | Pratos: {pratos_str} | Status: {status} | Hora Pedido: {p.hora_pedido.strftime('%H:%M')} | Estimado: {p.prazo_entrega.strftime('%H:%M')}{descrever_entregador(p)}")
+        if p.status not in PROXIMO_STATUS:
+            continue
         if p.status == 'Em preparo':
             print("1 - Marcar como A Caminho")
         elif p.status == 'A caminho':
@@ -300,18 +3481,75 @@ def ver_pedidos_restaurante(restaurante):
         print("0 - Pular")
 
         op = input("Escolha uma opção para este pedido: ")
-        if op == "1" and p.status == 'Em preparo':
-            p.status = 'A caminho'
-        elif op == "2" and p.status == 'A caminho':
-            p.status = 'Entregue'
+        # O relógio pode ter mudado o status enquanto a opção era lida: o
+        # lote só aplica a mudança se ela ainda for o próximo passo.
+        if op == "1":
+            sistema.alterar_status_lote([p], 'A caminho')
+        elif op == "2":
+            sistema.alterar_status_lote([p], 'Entregue')
+
+    print("Atualizações concluídas. Para mudar vários pedidos de uma vez, use a Fila de Pedidos.")
+
 
-    sistema.salvar_dados()
-    print("Atualizações concluídas.")
+def ler_selecao(texto, quantidade):
+    # "1 3 5-7" -> [0, 2, 4, 5, 6]; "*" seleciona todos. Números fora da
+    # página são ignorados.
+    selecionados = set()
+    for parte in texto.replace(',', ' ').split():
+        if parte == '*':
+            return list(range(quantidade))
+        inicio, _, fim = parte.partition('-')
+        try:
+            inicio, fim = int(inicio), int(fim or inicio)
+        except ValueError:
+            continue
+        selecionados.update(range(max(inicio, 1) - 1, min(fim, quantidade)))
+    return sorted(selecionados)
+
+def fila_pedidos_restaurante(restaurante, tamanho_pagina=10):
+    # Só os pedidos ativos, pelo prazo, uma página por vez; a mudança de
+    # status vale para todos os selecionados da página e é gravada de uma vez.
+    sistema.aguardar_carregamento()
+    comandos = {'a': 'A caminho', 'e': 'Entregue'}
+    pagina = 0
+    while True:
+        sistema.sincronizar()
+        with sistema.trava:
+            total = sistema.monitor_prazos.ativos(restaurante.nome)
+            paginas = max((total + tamanho_pagina - 1) // tamanho_pagina, 1)
+            pagina = min(pagina, paginas - 1)
+            pedidos = sistema.monitor_prazos.fila(restaurante.nome, pagina * tamanho_pagina, tamanho_pagina)
+        if not total:
+            print("\nNenhum pedido ativo.")
+            return
+        print(f"\nFila de Pedidos - página {pagina + 1} de {paginas} ({total} ativos):")
+        for i, p in enumerate(pedidos, 1):
+            atraso = ' (atrasado)' if p.esta_atrasado() else ''
+            pratos_str = ', '.join(pr.nome for pr in p.pratos)
+            print(f"{i} - Pedido {p.id} | Cliente: {p.cliente.nome} | Pratos: {pratos_str} | Status: {p.status}{atraso} | Prazo: {p.prazo_entrega.strftime('%H:%M')}{descrever_entregador(p)}")
+        print("\na <números> - Marcar como A Caminho (ex.: a 1 3 5-7, ou a * para a página toda)")
+        print("e <números> - Marcar como Entregue")
+        print("p - Próxima página | v - Página anterior | 0 - Voltar")
+        op = input("Escolha uma opção: ").strip().lower()
+        if op == "0":
+            return
+        if op == "p":
+            pagina += 1
+        elif op == "v":
+            pagina = max(pagina - 1, 0)
+        elif op[:1] in comandos:
+            status = comandos[op[0]]
+            selecionados = [pedidos[i] for i in ler_selecao(op[1:], len(pedidos))]
+            alterados = sistema.alterar_status_lote(selecionados, status)
+            print(f"{len(alterados)} pedido(s) marcados como {status}.")
+            if len(alterados) < len(selecionados):
+                print(f"{len(selecionados) - len(alterados)} pedido(s) ignorados: {status} não é o próximo status deles.")
+        else:
+            print("Opção inválida.")
 
 
 def menu_principal():
     while True:
-        atualizar_status_automaticamente()
         print("\n--- Sistema de Delivery (Console) ---")
         print("1 - Login Cliente")
         print("2 - Login Restaurante")
@@ -326,7 +3564,7 @@ def menu_principal():
         if opcao == "1":
             nome = input("Nome: ")
             senha = input("Senha: ")
-            cliente = next((c for c in sistema.clientes if c.nome == nome and c.senha == senha), None)
+            cliente = sistema.login('cliente', nome, senha)
             if cliente:
                 cliente.exibir_menu()
             else:
@@ -335,7 +3573,7 @@ def menu_principal():
         elif opcao == "2":
             nome = input("Nome do Restaurante: ")
             senha = input("Senha: ")
-            restaurante = next((r for r in sistema.restaurantes if r.nome == nome and r.senha == senha), None)
+            restaurante = sistema.login('restaurante', nome, senha)
             if restaurante:
                 restaurante.exibir_menu()
             else:
@@ -350,8 +3588,7 @@ def menu_principal():
             senha = input("Senha: ")
             resposta = input("Pergunta secreta - Qual o nome do seu primeiro pet? ")
             cliente = Cliente(nome, telefone, endereco, email, cpf, senha, resposta)
-            sistema.clientes.append(cliente)
-            sistema.salvar_dados()
+            sistema.adicionar_cliente(cliente)
             print("Cliente cadastrado com sucesso!")
 
         elif opcao == "4":
@@ -363,8 +3600,7 @@ def menu_principal():
             senha = input("Senha: ")
             resposta = input("Pergunta secreta - Qual o nome do seu primeiro pet? ")
             restaurante = Restaurante(nome, telefone, endereco, email, cnpj, senha, resposta)
-            sistema.restaurantes.append(restaurante)
-            sistema.salvar_dados()
+            sistema.adicionar_restaurante(restaurante)
             print("Restaurante cadastrado com sucesso!")
 
         elif opcao == "5":
@@ -382,11 +3618,108 @@ def menu_principal():
                 print("Credenciais de administrador incorretas.")
 
         elif opcao == "0":
+            sistema.salvar_dados()
             print("Saindo...")
             break
         else:
             print("Opção inválida.")
 
 
-sistema = Sistema()
-menu_principal()
\ No newline at end of file
+def main(argumentos=None):
+    global sistema
+    parser = argparse.ArgumentParser(description='Sistema de Delivery (Console)')
+    parser.add_argument('--dados', default='delivery.data', help='arquivo JSON de dados (padrão: delivery.data)')
+    parser.add_argument('--sqlite', metavar='BANCO', help='usa um banco SQLite em vez do arquivo JSON')
+    parser.add_argument('--migrar-sqlite', metavar='BANCO', help='copia os dados do arquivo JSON para um banco SQLite e sai')
+    parser.add_argument('--particionado', metavar='PASTA', help='usa uma pasta particionada por restaurante, segura para vários processos')
+    parser.add_argument('--converter-particionado', metavar='PASTA', help='copia os dados do arquivo JSON para uma pasta particionada e sai')
+    parser.add_argument('--colunar', metavar='ARQUIVO', help='usa um snapshot colunar binário em vez do arquivo JSON')
+    parser.add_argument('--converter-colunar', metavar='ARQUIVO', help='converte o arquivo JSON para um snapshot colunar e sai')
+    parser.add_argument('--converter-json', metavar='ARQUIVO', help='converte o snapshot colunar (--colunar) para JSON e sai')
+    parser.add_argument('--verificar-colunar', action='store_true', help='confere a conversão JSON -> colunar -> JSON do arquivo de dados e sai')
+    parser.add_argument('--importar', metavar='ARQUIVO', help='importa pedidos de um arquivo JSON-lines e sai')
+    parser.add_argument('--lote', type=int, default=1000, help='pedidos por gravação na importação (padrão: 1000)')
+    parser.add_argument('--processos', type=int, default=0, help='processos para validar a importação (padrão: nenhum)')
+    parser.add_argument('--gravacao-adiada', type=float, metavar='SEGUNDOS',
+                        help='grava as mutações em segundo plano, agrupadas a cada SEGUNDOS')
+    parser.add_argument('--grupo-gravacao', type=int, default=200,
+                        help='grava antes do intervalo ao juntar este número de eventos (padrão: 200)')
+    parser.add_argument('--arquivo', metavar='PASTA', help='arquiva os pedidos entregues antigos nesta pasta (gzip por dia)')
+    parser.add_argument('--arquivar-apos', type=int, default=30, metavar='DIAS',
+                        help='idade, em dias, a partir da qual um pedido entregue é arquivado (padrão: 30)')
+    parser.add_argument('--geocodificador', metavar='MODULO:CLASSE',
+                        help='geocodificador dos entregadores, no lugar do local (objeto com coordenadas(endereco))')
+    parser.add_argument('--sem-metricas', action='store_true', help='desativa a coleta de métricas de desempenho')
+    parser.add_argument('--perfil', metavar='ARQUIVO', help='executa sob o cProfile e grava as estatísticas no arquivo ao sair')
+    args = parser.parse_args(argumentos)
+    metricas.ativo = not args.sem_metricas
+
+    if args.migrar_sqlite:
+        migrado = migrar_para_sqlite(args.dados, args.migrar_sqlite)
+        print(f"{len(migrado.clientes)} clientes, {len(migrado.restaurantes)} restaurantes e {len(migrado.pedidos)} pedidos migrados para {args.migrar_sqlite}.")
+        return
+
+    if args.converter_particionado:
+        convertido = converter_snapshot(ArmazenamentoJSON(args.dados), ArmazenamentoParticionado(args.converter_particionado))
+        print(f"{len(convertido.pedidos)} pedidos copiados para {args.converter_particionado}.")
+        return
+    if args.converter_colunar:
+        convertido = json_para_colunar(args.dados, args.converter_colunar)
+        print(f"{len(convertido.pedidos)} pedidos convertidos para {args.converter_colunar}.")
+        return
+    if args.converter_json:
+        if not args.colunar:
+            parser.error('--converter-json exige --colunar')
+        convertido = colunar_para_json(args.colunar, args.converter_json)
+        print(f"{len(convertido.pedidos)} pedidos convertidos para {args.converter_json}.")
+        return
+    if args.verificar_colunar:
+        diferencas = verificar_ida_e_volta(args.dados)
+        for diferenca in diferencas:
+            print(diferenca)
+        print('Conversão íntegra.' if not diferencas else 'A conversão alterou os dados.')
+        sys.exit(1 if diferencas else 0)
+
+    if args.sqlite:
+        armazenamento = ArmazenamentoSQLite(args.sqlite)
+    elif args.particionado:
+        armazenamento = ArmazenamentoParticionado(args.particionado)
+    elif args.colunar:
+        armazenamento = ArmazenamentoColunar(args.colunar)
+    else:
+        armazenamento = ArmazenamentoJSON(args.dados)
+    if args.gravacao_adiada is not None:
+        armazenamento = ArmazenamentoDiferido(armazenamento, args.gravacao_adiada, args.grupo_gravacao)
+    arquivo = ArquivoPedidos(args.arquivo, args.arquivar_apos) if args.arquivo else None
+    geocodificador = carregar_geocodificador(args.geocodificador) if args.geocodificador else None
+    if args.importar:
+        sistema = Sistema(armazenamento, arquivo=arquivo, geocodificador=geocodificador)
+        relatorio = importar_pedidos(sistema, args.importar, args.lote, args.processos)
+        print(f"{relatorio['importados']} de {relatorio['lidos']} pedidos importados em {relatorio['segundos']}s "
+              f"({relatorio['pedidos_por_segundo']} pedidos/s), {relatorio['rejeitados']} rejeitados.")
+        for numero, erro in relatorio['erros'][:20]:
+            print(f"  linha {numero}: {erro}")
+        if relatorio['rejeitados'] > 20:
+            print(f"  ... e mais {relatorio['rejeitados'] - 20} linhas rejeitadas.")
+        sistema.fechar()
+        return
+
+    if args.perfil:
+        perfil = cProfile.Profile()
+        perfil.enable()
+    sistema = Sistema(armazenamento, em_segundo_plano=True, arquivo=arquivo, geocodificador=geocodificador)
+    relogio = Relogio()
+    relogio.iniciar()
+    try:
+        menu_principal()
+    finally:
+        relogio.encerrar()
+        sistema.fechar()
+        if args.perfil:
+            perfil.disable()
+            perfil.dump_stats(args.perfil)
+            print(f"Perfil gravado em {args.perfil} (veja com: python -m pstats {args.perfil}).")
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
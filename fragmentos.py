@@ -0,0 +1,446 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter
+
+import delivery
+from medicao import ambiente, gerar_dados, percentil
+
+MANIFESTO = 'fragmentos.json'
+EXTENSOES = {'json': '.data', 'sqlite': '.db'}
+
+
+def fragmento_de(restaurante, fragmentos):
+    # crc32 e não hash(): a divisão precisa ser a mesma em todo processo.
+    return zlib.crc32(restaurante.encode()) % fragmentos
+
+def abrir_armazenamento(pasta, indice, formato):
+    caminho = os.path.join(pasta, f'fragmento{indice}{EXTENSOES[formato]}')
+    if formato == 'sqlite':
+        return delivery.ArmazenamentoSQLite(caminho)
+    return delivery.ArmazenamentoJSON(caminho)
+
+def ler_manifesto(pasta):
+    with open(os.path.join(pasta, MANIFESTO)) as f:
+        return json.load(f)
+
+def dividir(origem, pasta, fragmentos, formato='json'):
+    # Copia um delivery.data para `fragmentos` armazenamentos: cada restaurante,
+    # com cardápio e pedidos, vai para um só; os clientes vão para todos,
+    # porque qualquer fragmento recebe pedidos de qualquer cliente. Os
+    # entregadores são repartidos em rodízio.
+    if os.path.exists(os.path.join(pasta, MANIFESTO)):
+        raise FileExistsError(f'{pasta} já está dividida')
+    os.makedirs(pasta, exist_ok=True)
+    completo = delivery.Sistema(delivery.ArmazenamentoJSON(origem))
+    partes = [delivery.Sistema(abrir_armazenamento(pasta, i, formato)) for i in range(fragmentos)]
+    estimativas = completo.estimador.estado()
+    for parte in partes:
+        for cliente in completo.clientes:
+            parte.incluir_cliente(cliente)
+        parte.estimador.restaurar(estimativas)
+    for restaurante in completo.restaurantes:
+        partes[fragmento_de(restaurante.nome, fragmentos)].incluir_restaurante(restaurante)
+    for pedido in completo.pedidos:
+        partes[fragmento_de(pedido.restaurante.nome, fragmentos)].incluir_pedido(pedido)
+    for i, entregador in enumerate(completo.despacho.entregadores.values()):
+        partes[i % fragmentos].despacho.incluir_entregador(delivery.Entregador(entregador.nome, entregador.endereco))
+    for parte in partes:
+        parte.salvar_dados()
+    with open(os.path.join(pasta, MANIFESTO), 'w') as f:
+        json.dump({'fragmentos': fragmentos, 'formato': formato}, f)
+    return [len(parte.pedidos) for parte in partes]
+
+
+class Fragmento:
+    # O lado do processo: um Sistema com os restaurantes do fragmento. As
+    # operações recebem e devolvem só nomes, ids e dicionários, que passam
+    # pelo pipe.
+    def __init__(self, sistema):
+        self.sistema = sistema
+
+    def buscar_restaurante(self, nome):
+        restaurante = self.sistema.buscar_restaurante(nome)
+        if restaurante is None:
+            raise ValueError(f'Restaurante não encontrado: {nome}')
+        return restaurante
+
+    def cliente(self, dados):
+        self.sistema.adicionar_cliente(delivery.cliente_de_dict(dados))
+
+    def restaurante(self, dados):
+        self.sistema.adicionar_restaurante(delivery.restaurante_de_dict(dados))
+
+    def prato(self, restaurante, dados):
+        self.sistema.adicionar_prato(self.buscar_restaurante(restaurante), delivery.Prato(**dados))
+
+    def senha(self, tipo, nome, senha):
+        buscar = self.sistema.buscar_cliente if tipo == 'cliente' else self.sistema.buscar_restaurante
+        usuario = buscar(nome)
+        if usuario is not None:
+            self.sistema.alterar_senha(usuario, senha)
+
+    def login(self, tipo, nome, senha):
+        return self.sistema.login(tipo, nome, senha) is not None
+
+    def pedidos(self, pedidos):
+        # [(cliente, restaurante, [pratos])] -> pedidos gravados de uma vez.
+        novos = []
+        for cliente, restaurante, pratos in pedidos:
+            dono = self.sistema.buscar_cliente(cliente)
+            if dono is None:
+                raise ValueError(f'Cliente não encontrado: {cliente}')
+            restaurante = self.buscar_restaurante(restaurante)
+            escolhidos = [self.sistema.pratos_por_chave.get((restaurante.nome, prato)) for prato in pratos]
+            if not escolhidos or None in escolhidos:
+                raise ValueError(f'Pratos fora do cardápio de {restaurante.nome}: {pratos}')
+            novos.append(delivery.Pedido(dono, restaurante, escolhidos))
+        self.sistema.adicionar_pedidos(novos)
+        return [pedido.to_dict() for pedido in novos]
+
+    def status(self, restaurante, ids, status):
+        pedidos = [self.sistema.pedidos_por_id.get(i) for i in ids]
+        pedidos = [p for p in pedidos if p is not None and p.restaurante.nome == restaurante]
+        return [p.id for p in self.sistema.alterar_status_lote(pedidos, status)]
+
+    def consultar(self, tipo, nome, ativos=False, limite=None):
+        indice = self.sistema.pedidos_cliente if tipo == 'cliente' else self.sistema.pedidos_restaurante
+        status = delivery.STATUS_ATIVOS if ativos else None
+        return [pedido.to_dict() for pedido in indice.consultar(nome, status, limite)]
+
+    def fila(self, restaurante, inicio, quantidade):
+        monitor = self.sistema.monitor_prazos
+        return monitor.ativos(restaurante), [p.to_dict() for p in monitor.fila(restaurante, inicio, quantidade)]
+
+    def mais_pedidos(self, n, restaurante=None):
+        return self.sistema.agregados.mais_pedidos(n, restaurante)
+
+    def contar_pratos(self, nomes=None):
+        contagem = self.sistema.agregados.pratos.contagem
+        if nomes is None:
+            return dict(contagem)
+        return {nome: contagem.get(nome, 0) for nome in nomes}
+
+    def faturamento(self):
+        agregados = self.sistema.agregados
+        return {nome: (agregados.pedidos_por_restaurante[nome], receita)
+                for nome, receita in agregados.receita_por_restaurante.items()}
+
+    def total_pedidos(self):
+        return self.sistema.agregados.total_pedidos
+
+    def salvar(self):
+        self.sistema.salvar_dados()
+
+
+def executar_fragmento(pasta, indice, formato, conexao, intervalo_status, metricas_ativas):
+    # Laço do processo de um fragmento. As transições automáticas rodam na
+    # mesma thread, entre uma operação e outra, então o Sistema nunca é
+    # acessado por duas threads.
+    delivery.metricas.ativo = metricas_ativas
+    sistema = delivery.Sistema(abrir_armazenamento(pasta, indice, formato))
+    delivery.sistema = sistema
+    fragmento = Fragmento(sistema)
+    proxima_atualizacao = 0
+    while True:
+        agora = time.monotonic()
+        if agora >= proxima_atualizacao:
+            delivery.atualizar_status_automaticamente()
+            proxima_atualizacao = agora + intervalo_status
+        if not conexao.poll(max(0, proxima_atualizacao - time.monotonic())):
+            continue
+        operacao, argumentos = conexao.recv()
+        if operacao == 'encerrar':
+            sistema.salvar_dados()
+            sistema.fechar()
+            conexao.send((True, None))
+            return
+        try:
+            conexao.send((True, getattr(fragmento, operacao)(*argumentos)))
+        except Exception as erro:
+            conexao.send((False, erro))
+
+
+class Roteador:
+    # Um processo por fragmento, cada um com o seu armazenamento. Operações de
+    # um restaurante vão só para o fragmento dono; as de clientes e as do
+    # painel do administrador são espalhadas e os resultados, combinados. Cada
+    # fragmento atende uma operação por vez, mas fragmentos diferentes
+    # trabalham em paralelo, inclusive para chamadas de threads diferentes.
+    # Os ids de pedido são de cada fragmento: um pedido é identificado pelo
+    # restaurante e pelo id.
+    def __init__(self, pasta, intervalo_status=1.0):
+        manifesto = ler_manifesto(pasta)
+        self.fragmentos = manifesto['fragmentos']
+        self.conexoes = []
+        self.processos = []
+        self.travas = [threading.Lock() for _ in range(self.fragmentos)]
+        for indice in range(self.fragmentos):
+            local, remota = multiprocessing.Pipe()
+            processo = multiprocessing.Process(
+                target=executar_fragmento, name=f'fragmento{indice}', daemon=True,
+                args=(pasta, indice, manifesto['formato'], remota, intervalo_status, delivery.metricas.ativo))
+            processo.start()
+            self.conexoes.append(local)
+            self.processos.append(processo)
+
+    def dono(self, restaurante):
+        return fragmento_de(restaurante, self.fragmentos)
+
+    def distribuir(self, chamadas):
+        # {fragmento: (operacao, argumentos)} -> {fragmento: resultado}. Envia
+        # tudo antes de esperar a primeira resposta; as travas são tomadas em
+        # ordem para que duas distribuições não se bloqueiem.
+        indices = sorted(chamadas)
+        for indice in indices:
+            self.travas[indice].acquire()
+        try:
+            for indice in indices:
+                self.conexoes[indice].send(chamadas[indice])
+            respostas = {indice: self.conexoes[indice].recv() for indice in indices}
+        finally:
+            for indice in indices:
+                self.travas[indice].release()
+        for sucesso, resultado in respostas.values():
+            if not sucesso:
+                raise resultado
+        return {indice: resultado for indice, (_, resultado) in respostas.items()}
+
+    def chamar(self, indice, operacao, *argumentos):
+        return self.distribuir({indice: (operacao, argumentos)})[indice]
+
+    def espalhar(self, operacao, *argumentos):
+        return self.distribuir({indice: (operacao, argumentos) for indice in range(self.fragmentos)})
+
+    # --- Cadastros ---
+    def adicionar_cliente(self, dados):
+        self.espalhar('cliente', dados)
+
+    def adicionar_restaurante(self, dados):
+        self.chamar(self.dono(dados['nome']), 'restaurante', dados)
+
+    def adicionar_prato(self, restaurante, dados):
+        self.chamar(self.dono(restaurante), 'prato', restaurante, dados)
+
+    def alterar_senha(self, tipo, nome, senha):
+        if tipo == 'cliente':
+            self.espalhar('senha', tipo, nome, senha)
+        else:
+            self.chamar(self.dono(nome), 'senha', tipo, nome, senha)
+
+    def login(self, tipo, nome, senha):
+        # Todo fragmento tem todos os clientes; o restaurante, só o dono.
+        return self.chamar(0 if tipo == 'cliente' else self.dono(nome), 'login', tipo, nome, senha)
+
+    # --- Pedidos ---
+    def fazer_pedido(self, cliente, restaurante, pratos):
+        return self.chamar(self.dono(restaurante), 'pedidos', [(cliente, restaurante, pratos)])[0]
+
+    def fazer_pedidos(self, pedidos):
+        # Cada fragmento grava a sua parte do lote, todos ao mesmo tempo.
+        grupos = {}
+        for pedido in pedidos:
+            grupos.setdefault(self.dono(pedido[1]), []).append(pedido)
+        resultados = self.distribuir({indice: ('pedidos', (grupo,)) for indice, grupo in grupos.items()})
+        return [pedido for resultado in resultados.values() for pedido in resultado]
+
+    def alterar_status(self, restaurante, ids, status):
+        return self.chamar(self.dono(restaurante), 'status', restaurante, ids, status)
+
+    def pedidos_cliente(self, cliente, ativos=False, limite=None):
+        # Os pedidos de um cliente estão em todos os fragmentos: a ordem de
+        # chegada vem da hora do pedido.
+        resultados = self.espalhar('consultar', 'cliente', cliente, ativos, limite)
+        pedidos = sorted((p for resultado in resultados.values() for p in resultado), key=lambda p: p['hora_pedido'])
+        if limite is not None:
+            pedidos = pedidos[-limite:] if limite > 0 else []
+        return pedidos
+
+    def pedidos_restaurante(self, restaurante, ativos=False, limite=None):
+        return self.chamar(self.dono(restaurante), 'consultar', 'restaurante', restaurante, ativos, limite)
+
+    def fila(self, restaurante, pagina=0, tamanho=10):
+        return self.chamar(self.dono(restaurante), 'fila', restaurante, pagina * tamanho, tamanho)
+
+    # --- Painel do administrador ---
+    def total_pedidos(self):
+        return sum(self.espalhar('total_pedidos').values())
+
+    def faturamento(self):
+        combinado = {}
+        for resultado in self.espalhar('faturamento').values():
+            combinado.update(resultado)
+        return sorted(((nome, pedidos, receita) for nome, (pedidos, receita) in combinado.items()),
+                      key=lambda item: item[2], reverse=True)
+
+    def mais_pedidos(self, n, restaurante=None):
+        # Os mesmos nomes de prato aparecem em vários fragmentos, então o top-n
+        # de cada um não basta. Os candidatos são a união dos top-n, contados
+        # exatamente em todos; um prato fora dessa união soma no máximo o
+        # n-ésimo valor de cada fragmento. Se algum candidato não supera esse
+        # limite, a contagem completa é combinada.
+        if restaurante is not None:
+            return self.chamar(self.dono(restaurante), 'mais_pedidos', n, restaurante)
+        parciais = self.espalhar('mais_pedidos', n)
+        candidatos = sorted({nome for parcial in parciais.values() for nome, _ in parcial})
+        limite = sum(parcial[-1][1] for parcial in parciais.values() if len(parcial) == n)
+        total = Counter()
+        for contagem in self.espalhar('contar_pratos', candidatos).values():
+            total.update(contagem)
+        melhores = total.most_common(n)
+        if len(melhores) == n and melhores[-1][1] >= limite:
+            return melhores
+        total = Counter()
+        for contagem in self.espalhar('contar_pratos').values():
+            total.update(contagem)
+        return total.most_common(n)
+
+    # --- Ciclo de vida ---
+    def salvar(self):
+        self.espalhar('salvar')
+
+    def fechar(self):
+        self.espalhar('encerrar')
+        for processo in self.processos:
+            processo.join()
+
+
+# --- Medição ---
+def sessao(roteador, clientes, restaurantes, operacoes, semente, latencias):
+    # Uma sessão faz pedidos, avança pedidos da fila dos restaurantes e lê os
+    # pedidos dos clientes, uma operação por vez.
+    aleatorio = random.Random(semente)
+    for _ in range(operacoes):
+        sorteio = aleatorio.random()
+        comeco = time.perf_counter()
+        if sorteio < 0.6:
+            nome, cardapio = aleatorio.choice(restaurantes)
+            roteador.fazer_pedido(aleatorio.choice(clientes), nome, aleatorio.sample(cardapio, 2))
+            fluxo = 'pedido'
+        elif sorteio < 0.85:
+            nome, _ = aleatorio.choice(restaurantes)
+            _, pedidos = roteador.fila(nome)
+            if pedidos:
+                pedido = pedidos[0]
+                roteador.alterar_status(nome, [pedido['id']], delivery.PROXIMO_STATUS[pedido['status']])
+            fluxo = 'status'
+        else:
+            roteador.pedidos_cliente(aleatorio.choice(clientes), ativos=True)
+            fluxo = 'ver_pedidos'
+        latencias.setdefault(fluxo, []).append(time.perf_counter() - comeco)
+
+def medir(pasta, dados, operacoes, sessoes, formato):
+    carregado = delivery.Sistema(delivery.ArmazenamentoJSON(dados))
+    clientes = [c.nome for c in carregado.clientes]
+    restaurantes = [(r.nome, [p.nome for p in r.cardapio]) for r in carregado.restaurantes]
+    del carregado
+    inicio = time.perf_counter()
+    roteador = Roteador(pasta)
+    roteador.total_pedidos()
+    carga = time.perf_counter() - inicio
+    try:
+        latencias = [{} for _ in range(sessoes)]
+        threads = [threading.Thread(target=sessao, args=(roteador, clientes, restaurantes, operacoes // sessoes, i, latencias[i]))
+                   for i in range(sessoes)]
+        inicio = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duracao = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        roteador.mais_pedidos(5)
+        roteador.faturamento()
+        painel = time.perf_counter() - inicio
+    finally:
+        roteador.fechar()
+    por_fluxo = {}
+    for parcial in latencias:
+        for fluxo, valores in parcial.items():
+            por_fluxo.setdefault(fluxo, []).extend(valores)
+    total = sum(len(valores) for valores in por_fluxo.values())
+    return {
+        'fragmentos': ler_manifesto(pasta)['fragmentos'],
+        'formato': formato,
+        'carga_s': round(carga, 3),
+        'operacoes': total,
+        'operacoes_por_segundo': round(total / duracao, 1),
+        'painel_ms': round(painel * 1000, 2),
+        'fluxos': {fluxo: {'operacoes': len(valores),
+                           'p50_ms': round(percentil(valores, 50) * 1000, 3),
+                           'p99_ms': round(percentil(valores, 99) * 1000, 3)}
+                   for fluxo, valores in por_fluxo.items()},
+    }
+
+def benchmark_fragmentos(pedidos, fragmentos, operacoes, sessoes, formato='json'):
+    # A mesma carga com 1, 2, 4... fragmentos sobre os mesmos dados.
+    resultados = []
+    with tempfile.TemporaryDirectory() as raiz:
+        dados = os.path.join(raiz, 'benchmark.data')
+        gerar_dados(dados, pedidos=pedidos)
+        for quantidade in fragmentos:
+            pasta = os.path.join(raiz, f'fragmentos{quantidade}')
+            inicio = time.perf_counter()
+            dividir(dados, pasta, quantidade, formato)
+            divisao = time.perf_counter() - inicio
+            resultado = medir(pasta, dados, operacoes, sessoes, formato)
+            resultados.append({'divisao_s': round(divisao, 3), **resultado})
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sistema de delivery dividido por restaurante entre processos')
+    comandos = parser.add_subparsers(dest='comando', required=True)
+    dividir_parser = comandos.add_parser('dividir', help='divide um delivery.data em fragmentos')
+    dividir_parser.add_argument('--dados', default='delivery.data')
+    dividir_parser.add_argument('--pasta', default='delivery.fragmentos')
+    dividir_parser.add_argument('--fragmentos', type=int, default=os.cpu_count() or 1)
+    dividir_parser.add_argument('--formato', choices=tuple(EXTENSOES), default='json')
+    painel_parser = comandos.add_parser('painel', help='totais, pratos mais pedidos e faturamento de todos os fragmentos')
+    painel_parser.add_argument('--pasta', default='delivery.fragmentos')
+    medir_parser = comandos.add_parser('benchmark', help='vazão e latência com cada quantidade de fragmentos')
+    medir_parser.add_argument('--pedidos', type=int, default=100_000)
+    medir_parser.add_argument('--fragmentos', type=int, nargs='+', default=[1, 2, 4])
+    medir_parser.add_argument('--operacoes', type=int, default=20_000)
+    medir_parser.add_argument('--sessoes', type=int, default=16, help='threads fazendo operações ao mesmo tempo')
+    medir_parser.add_argument('--formato', choices=tuple(EXTENSOES), default='json')
+    medir_parser.add_argument('--saida', help='grava o JSON de resultados neste arquivo')
+    args = parser.parse_args()
+
+    if args.comando == 'dividir':
+        quantidades = dividir(args.dados, args.pasta, args.fragmentos, args.formato)
+        print(f"{sum(quantidades)} pedidos divididos em {args.fragmentos} fragmentos em {args.pasta}: {quantidades}")
+    elif args.comando == 'painel':
+        roteador = Roteador(args.pasta)
+        try:
+            print(f"Total de pedidos: {roteador.total_pedidos()}")
+            print("\nPratos mais pedidos:")
+            for nome, quantidade in roteador.mais_pedidos(5):
+                print(f"{nome} - {quantidade} vezes")
+            print("\nFaturamento por restaurante:")
+            for nome, pedidos, receita in roteador.faturamento():
+                print(f"{nome} - {pedidos} pedidos | R$ {receita:.2f}")
+        finally:
+            roteador.fechar()
+    else:
+        delivery.metricas.ativo = False
+        relatorio = {
+            'ambiente': {**ambiente(), 'nucleos': os.cpu_count()},
+            'parametros': {'pedidos': args.pedidos, 'operacoes': args.operacoes, 'sessoes': args.sessoes},
+            'resultados': benchmark_fragmentos(args.pedidos, args.fragmentos, args.operacoes, args.sessoes, args.formato),
+        }
+        texto = json.dumps(relatorio, indent=4)
+        print(texto)
+        if args.saida:
+            with open(args.saida, 'w') as f:
+                f.write(texto)
+
+
+if __name__ == '__main__':
+    main()
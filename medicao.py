@@ -0,0 +1,76 @@
+# Auxiliares de medição usados por benchmark.py, simulador.py, fragmentos.py
+# e pelo teste de carga do servidor: dados sintéticos, percentis e a
+# descrição do ambiente que acompanha cada relatório.
+import json
+import platform
+import random
+import time
+from datetime import datetime
+
+import delivery
+
+
+# --- Dados sintéticos ---
+def gerar_dados(caminho, clientes=1000, restaurantes=50, pratos_por_restaurante=30, pedidos=100_000,
+                fracao_ativos=0.05, dias=90, semente=1):
+    # Gera um delivery.data no formato do ArmazenamentoJSON. Os pedidos se
+    # espalham pelos últimos `dias`, com horário de almoço e jantar mais
+    # cheios; uma fração fica em andamento (e já vencida, para que a primeira
+    # atualização automática tenha trabalho).
+    aleatorio = random.Random(semente)
+    agora = int(time.time())
+    meia_noite = int(time.mktime(datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timetuple()))
+    lista_clientes = [
+        {'nome': f'cliente{i}', 'telefone': f'{11900000000 + i}', 'endereco': f'Rua {i}, {i % 500}',
+         'email': f'cliente{i}@exemplo.com', 'cpf': f'{i:011d}', 'senha': 'senha', 'resposta_secreta': 'azul'}
+        for i in range(clientes)
+    ]
+    lista_restaurantes = [
+        {'nome': f'restaurante{i}', 'telefone': f'{1130000000 + i}', 'endereco': f'Avenida {i}',
+         'email': f'restaurante{i}@exemplo.com', 'cpf': f'{i:014d}', 'senha': 'senha', 'resposta_secreta': 'azul',
+         'cardapio': [{'nome': f'prato{j}', 'preco': round(aleatorio.uniform(8, 90), 2), 'descricao': f'Prato {j}', 'imagem': None}
+                      for j in range(pratos_por_restaurante)]}
+        for i in range(restaurantes)
+    ]
+    # Popularidade desigual: poucos restaurantes e pratos concentram a demanda.
+    pesos_restaurantes = [1 / (i + 1) for i in range(restaurantes)]
+    pesos_pratos = [1 / (j + 1) for j in range(pratos_por_restaurante)]
+    escolhas_restaurantes = aleatorio.choices(range(restaurantes), pesos_restaurantes, k=pedidos)
+    lista_pedidos = []
+    for i in range(pedidos):
+        dia = aleatorio.randrange(dias)
+        hora_do_dia = aleatorio.choice((12, 13, 19, 20, 21)) if aleatorio.random() < 0.7 else aleatorio.randrange(10, 24)
+        hora = meia_noite - dia * 86400 + hora_do_dia * 3600 + aleatorio.randrange(3600)
+        if hora > agora:
+            hora -= 86400
+        if aleatorio.random() < fracao_ativos:
+            status = aleatorio.choice(delivery.STATUS_ATIVOS)
+        else:
+            status = 'Entregue'
+        indices = aleatorio.choices(range(pratos_por_restaurante), pesos_pratos, k=aleatorio.randint(1, 4))
+        lista_pedidos.append({
+            'id': i + 1,
+            'cliente': f'cliente{aleatorio.randrange(clientes)}',
+            'restaurante': f'restaurante{escolhas_restaurantes[i]}',
+            'pratos': [f'prato{j}' for j in indices],
+            'hora_pedido': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(hora)),
+            'prazo_entrega': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(hora + delivery.PRAZO_PADRAO)),
+            'status': status,
+        })
+    lista_pedidos.sort(key=lambda p: p['hora_pedido'])
+    for i, pedido in enumerate(lista_pedidos):
+        pedido['id'] = i + 1
+    with open(caminho, 'w') as f:
+        json.dump({'sequencia': 0, 'clientes': lista_clientes, 'restaurantes': lista_restaurantes, 'pedidos': lista_pedidos}, f, indent=4)
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+def ambiente():
+    return {
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'data': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
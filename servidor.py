@@ -0,0 +1,364 @@
+import argparse
+import asyncio
+import json
+import os
+import secrets
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import delivery
+from medicao import percentil
+
+MOTIVOS = {200: 'OK', 201: 'Created', 400: 'Bad Request', 401: 'Unauthorized', 403: 'Forbidden',
+           404: 'Not Found', 405: 'Method Not Allowed', 409: 'Conflict', 500: 'Internal Server Error'}
+
+
+class ErroHTTP(Exception):
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+        self.mensagem = mensagem
+
+
+def texto(dados, nome, padrao=None):
+    valor = dados.get(nome, padrao)
+    if valor is not None and not isinstance(valor, str):
+        raise ErroHTTP(400, f'{nome} deve ser um texto')
+    return valor
+
+def lista(dados, nome, tipo=str):
+    valor = dados.get(nome) or []
+    if not isinstance(valor, list) or not all(isinstance(item, tipo) and not isinstance(item, bool) for item in valor):
+        raise ErroHTTP(400, f'{nome} deve ser uma lista de {"textos" if tipo is str else "números"}')
+    return valor
+
+def pedido_para_json(pedido):
+    dados = pedido.to_dict()
+    dados['atrasado'] = pedido.esta_atrasado()
+    return dados
+
+
+class ServidorDelivery:
+    # Servidor HTTP/1.1 mínimo sobre asyncio. O laço de eventos só cuida das
+    # conexões; as rotas, que leem e alteram o Sistema e gravam no
+    # armazenamento, rodam uma de cada vez em uma thread dedicada, de modo que
+    # o Sistema nunca é acessado por duas threads ao mesmo tempo.
+    def __init__(self, sistema, intervalo_status=1.0):
+        self.sistema = sistema
+        self.intervalo_status = intervalo_status
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sistema')
+        self.sessoes = {}
+        self.rotas = [
+            ('POST', ('login',), self.login),
+            ('GET', ('restaurantes',), self.listar_restaurantes),
+            ('GET', ('restaurantes', None, 'cardapio'), self.ver_cardapio),
+            ('GET', ('pedidos',), self.listar_pedidos),
+            ('POST', ('pedidos',), self.fazer_pedido),
+            ('POST', ('pedidos', None, 'status'), self.alterar_status),
+            ('POST', ('pedidos', 'status'), self.alterar_status_lote),
+            ('GET', ('fila',), self.ver_fila),
+        ]
+
+    async def executar(self, funcao, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, funcao, *args)
+
+    # --- HTTP ---
+    async def atender(self, leitor, escritor):
+        try:
+            while True:
+                linha = await leitor.readline()
+                if not linha:
+                    break
+                metodo, alvo, versao = linha.decode('latin-1').split()
+                cabecalhos = {}
+                while True:
+                    linha = await leitor.readline()
+                    if linha in (b'\r\n', b'\n', b''):
+                        break
+                    nome, _, valor = linha.decode('latin-1').partition(':')
+                    cabecalhos[nome.strip().lower()] = valor.strip()
+                tamanho = int(cabecalhos.get('content-length', 0))
+                corpo = await leitor.readexactly(tamanho) if tamanho else b''
+                status, resposta = await self.despachar(metodo, alvo, cabecalhos, corpo)
+                conteudo = json.dumps(resposta).encode()
+                manter = versao == 'HTTP/1.1' and cabecalhos.get('connection', '').lower() != 'close'
+                escritor.write(
+                    f'HTTP/1.1 {status} {MOTIVOS.get(status, "")}\r\n'
+                    f'Content-Type: application/json; charset=utf-8\r\n'
+                    f'Content-Length: {len(conteudo)}\r\n'
+                    f'Connection: {"keep-alive" if manter else "close"}\r\n\r\n'.encode() + conteudo)
+                await escritor.drain()
+                if not manter:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            escritor.close()
+
+    async def despachar(self, metodo, alvo, cabecalhos, corpo):
+        url = urlsplit(alvo)
+        partes = tuple(p for p in url.path.split('/') if p)
+        metodo_encontrado = False
+        for metodo_rota, padrao, funcao in self.rotas:
+            if len(padrao) != len(partes) or any(p is not None and p != parte for p, parte in zip(padrao, partes)):
+                continue
+            metodo_encontrado = True
+            if metodo_rota != metodo:
+                continue
+            parametros = [parte for p, parte in zip(padrao, partes) if p is None]
+            try:
+                dados = json.loads(corpo) if corpo else {}
+                if not isinstance(dados, dict):
+                    return 400, {'erro': 'O corpo deve ser um objeto JSON'}
+                requisicao = {'dados': dados, 'consulta': parse_qs(url.query), 'cabecalhos': cabecalhos}
+                return await self.executar(funcao, requisicao, *parametros)
+            except ErroHTTP as erro:
+                return erro.status, {'erro': erro.mensagem}
+            except ValueError:
+                return 400, {'erro': 'Requisição inválida'}
+            except Exception:
+                # Uma rota com defeito não derruba a conexão.
+                return 500, {'erro': 'Erro interno'}
+        if metodo_encontrado:
+            return 405, {'erro': 'Método não permitido'}
+        return 404, {'erro': 'Rota não encontrada'}
+
+    def autenticar(self, requisicao, tipo):
+        autorizacao = requisicao['cabecalhos'].get('authorization', '')
+        sessao = self.sessoes.get(autorizacao.removeprefix('Bearer '))
+        if sessao is None:
+            raise ErroHTTP(401, 'Token ausente ou inválido')
+        if tipo is not None and sessao[0] != tipo:
+            raise ErroHTTP(403, f'Operação exclusiva de {tipo}')
+        return sessao
+
+    # --- Rotas ---
+    def login(self, requisicao):
+        dados = requisicao['dados']
+        tipo = texto(dados, 'tipo')
+        if tipo not in ('cliente', 'restaurante'):
+            raise ErroHTTP(400, "tipo deve ser 'cliente' ou 'restaurante'")
+        usuario = self.sistema.login(tipo, texto(dados, 'nome'), texto(dados, 'senha'))
+        if usuario is None:
+            raise ErroHTTP(401, 'Usuário não encontrado ou senha incorreta')
+        token = secrets.token_hex(16)
+        self.sessoes[token] = (tipo, usuario)
+        return 200, {'token': token}
+
+    def listar_restaurantes(self, requisicao):
+        return 200, [{'nome': r.nome, 'endereco': r.endereco} for r in self.sistema.restaurantes]
+
+    def ver_cardapio(self, requisicao, nome):
+        restaurante = self.sistema.buscar_restaurante(nome)
+        if restaurante is None:
+            raise ErroHTTP(404, 'Restaurante não encontrado')
+        return 200, [prato.to_dict() for prato in restaurante.cardapio]
+
+    def listar_pedidos(self, requisicao):
+        tipo, usuario = self.autenticar(requisicao, None)
+        indice = self.sistema.pedidos_cliente if tipo == 'cliente' else self.sistema.pedidos_restaurante
+        consulta = requisicao['consulta']
+        status = delivery.STATUS_ATIVOS if consulta.get('ativos', ['0'])[0] == '1' else None
+        limite = int(consulta['limite'][0]) if 'limite' in consulta else None
+        return 200, [pedido_para_json(p) for p in indice.consultar(usuario.nome, status, limite)]
+
+    def fazer_pedido(self, requisicao):
+        _, cliente = self.autenticar(requisicao, 'cliente')
+        dados = requisicao['dados']
+        restaurante = self.sistema.buscar_restaurante(texto(dados, 'restaurante'))
+        if restaurante is None:
+            raise ErroHTTP(404, 'Restaurante não encontrado')
+        nomes = lista(dados, 'pratos')
+        pratos = [self.sistema.pratos_por_chave.get((restaurante.nome, nome)) for nome in nomes]
+        if not pratos or None in pratos:
+            raise ErroHTTP(400, 'Informe pratos do cardápio do restaurante')
+        pedido = delivery.Pedido(cliente, restaurante, pratos)
+        self.sistema.adicionar_pedido(pedido)
+        return 201, pedido_para_json(pedido)
+
+    def alterar_status(self, requisicao, identificador):
+        _, restaurante = self.autenticar(requisicao, 'restaurante')
+        pedido = self.sistema.pedidos_por_id.get(int(identificador)) if identificador.isdigit() else None
+        if pedido is None or pedido.restaurante is not restaurante:
+            raise ErroHTTP(404, 'Pedido não encontrado')
+        status = texto(requisicao['dados'], 'status', delivery.PROXIMO_STATUS.get(pedido.status))
+        if delivery.PROXIMO_STATUS.get(pedido.status) != status:
+            raise ErroHTTP(409, f'Transição inválida: {pedido.status} -> {status}')
+        self.sistema.alterar_status(pedido, status)
+        return 200, pedido_para_json(pedido)
+
+    def alterar_status_lote(self, requisicao):
+        # {"ids": [...], "status": "A caminho"}: os pedidos cujo próximo
+        # status não é o pedido ficam como estão e voltam em "ignorados".
+        _, restaurante = self.autenticar(requisicao, 'restaurante')
+        dados = requisicao['dados']
+        status = texto(dados, 'status')
+        if status not in delivery.PROXIMO_STATUS.values():
+            raise ErroHTTP(400, f'Status inválido: {status}')
+        pedidos = [self.sistema.pedidos_por_id.get(i) for i in lista(dados, 'ids', int)]
+        if not pedidos or any(p is None or p.restaurante is not restaurante for p in pedidos):
+            raise ErroHTTP(404, 'Pedido não encontrado')
+        alterados = self.sistema.alterar_status_lote(pedidos, status)
+        ids = {p.id for p in alterados}
+        return 200, {'alterados': [pedido_para_json(p) for p in alterados],
+                     'ignorados': [p.id for p in pedidos if p.id not in ids]}
+
+    def ver_fila(self, requisicao):
+        _, restaurante = self.autenticar(requisicao, 'restaurante')
+        consulta = requisicao['consulta']
+        pagina = int(consulta.get('pagina', ['1'])[0])
+        tamanho = int(consulta.get('tamanho', ['20'])[0])
+        if pagina < 1 or tamanho < 1:
+            raise ErroHTTP(400, 'pagina e tamanho devem ser positivos')
+        fila = self.sistema.monitor_prazos
+        pedidos = fila.fila(restaurante.nome, (pagina - 1) * tamanho, tamanho)
+        return 200, {'total': fila.ativos(restaurante.nome), 'pagina': pagina,
+                     'pedidos': [pedido_para_json(p) for p in pedidos]}
+
+    # --- Ciclo de vida ---
+    async def atualizar_status(self):
+        while True:
+            await asyncio.sleep(self.intervalo_status)
+            await self.executar(delivery.atualizar_status_automaticamente)
+
+    async def iniciar(self, host='127.0.0.1', porta=8080):
+        await self.executar(self.sistema.aguardar_carregamento)
+        self.tarefa_status = asyncio.create_task(self.atualizar_status())
+        self.servidor = await asyncio.start_server(self.atender, host, porta)
+        return self.servidor.sockets[0].getsockname()[1]
+
+    async def encerrar(self):
+        self.tarefa_status.cancel()
+        self.servidor.close()
+        await self.servidor.wait_closed()
+        await self.executar(self.sistema.salvar_dados)
+        self.executor.shutdown()
+
+
+# --- Teste de carga ---
+class ClienteHTTP:
+    def __init__(self, host, porta):
+        self.host = host
+        self.porta = porta
+
+    async def conectar(self):
+        self.leitor, self.escritor = await asyncio.open_connection(self.host, self.porta)
+
+    async def requisitar(self, metodo, caminho, dados=None, token=None):
+        corpo = json.dumps(dados).encode() if dados is not None else b''
+        cabecalhos = f'{metodo} {caminho} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(corpo)}\r\n'
+        if token:
+            cabecalhos += f'Authorization: Bearer {token}\r\n'
+        self.escritor.write((cabecalhos + '\r\n').encode() + corpo)
+        await self.escritor.drain()
+        status = int((await self.leitor.readline()).split()[1])
+        tamanho = 0
+        while True:
+            linha = await self.leitor.readline()
+            if linha == b'\r\n':
+                break
+            nome, _, valor = linha.decode().partition(':')
+            if nome.lower() == 'content-length':
+                tamanho = int(valor)
+        return status, json.loads(await self.leitor.readexactly(tamanho))
+
+    def fechar(self):
+        self.escritor.close()
+
+
+async def teste_de_carga(conexoes=50, requisicoes=5000, pratos=20):
+    with tempfile.TemporaryDirectory() as diretorio:
+        sistema = delivery.Sistema(os.path.join(diretorio, 'carga.data'))
+        delivery.sistema = sistema
+        sistema.adicionar_restaurante(delivery.Restaurante('Cantina', '', '', '', '', 'senha', ''))
+        for i in range(pratos):
+            sistema.adicionar_prato(sistema.buscar_restaurante('Cantina'), delivery.Prato(f'Prato {i}', 10.0 + i, ''))
+        for i in range(conexoes):
+            sistema.adicionar_cliente(delivery.Cliente(f'cliente{i}', '', '', '', '', 'senha', ''))
+
+        servidor = ServidorDelivery(sistema)
+        porta = await servidor.iniciar(porta=0)
+        latencias = []
+        erros = 0
+
+        async def sessao(numero, quantidade):
+            nonlocal erros
+            cliente = ClienteHTTP('127.0.0.1', porta)
+            await cliente.conectar()
+            _, resposta = await cliente.requisitar('POST', '/login', {'tipo': 'cliente', 'nome': f'cliente{numero}', 'senha': 'senha'})
+            token = resposta['token']
+            for i in range(quantidade):
+                if i % 3 == 0:
+                    requisicao = ('POST', '/pedidos', {'restaurante': 'Cantina', 'pratos': [f'Prato {i % pratos}']}, token)
+                elif i % 3 == 1:
+                    requisicao = ('GET', '/restaurantes/Cantina/cardapio', None, None)
+                else:
+                    requisicao = ('GET', '/pedidos?ativos=1&limite=10', None, token)
+                inicio = time.perf_counter()
+                status, _ = await cliente.requisitar(*requisicao)
+                latencias.append(time.perf_counter() - inicio)
+                if status >= 400:
+                    erros += 1
+            cliente.fechar()
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(sessao(i, requisicoes // conexoes) for i in range(conexoes)))
+        duracao = time.perf_counter() - inicio
+        await servidor.encerrar()
+        return {
+            'conexoes': conexoes,
+            'requisicoes': len(latencias),
+            'erros': erros,
+            'segundos': round(duracao, 3),
+            'requisicoes_por_segundo': round(len(latencias) / duracao, 1),
+            'p50_ms': round(percentil(latencias, 50) * 1000, 3),
+            'p99_ms': round(percentil(latencias, 99) * 1000, 3),
+        }
+
+
+async def servir(args):
+    if args.sqlite:
+        armazenamento = delivery.ArmazenamentoSQLite(args.sqlite)
+    elif args.particionado:
+        armazenamento = delivery.ArmazenamentoParticionado(args.particionado)
+    else:
+        armazenamento = delivery.ArmazenamentoJSON(args.dados)
+    geocodificador = delivery.carregar_geocodificador(args.geocodificador) if args.geocodificador else None
+    sistema = delivery.Sistema(armazenamento, em_segundo_plano=True, geocodificador=geocodificador)
+    delivery.sistema = sistema
+    servidor = ServidorDelivery(sistema)
+    porta = await servidor.iniciar(args.host, args.porta)
+    print(f"Servidor de delivery em http://{args.host}:{porta}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await servidor.encerrar()
+        sistema.fechar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='API HTTP do sistema de delivery')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8080)
+    parser.add_argument('--dados', default='delivery.data', help='arquivo JSON de dados (padrão: delivery.data)')
+    parser.add_argument('--sqlite', metavar='BANCO', help='usa um banco SQLite em vez do arquivo JSON')
+    parser.add_argument('--particionado', metavar='PASTA', help='usa uma pasta particionada, compartilhável com outros processos')
+    parser.add_argument('--geocodificador', metavar='MODULO:CLASSE', help='como em delivery.py')
+    parser.add_argument('--carga', action='store_true', help='executa um teste de carga local e sai')
+    parser.add_argument('--conexoes', type=int, default=50)
+    parser.add_argument('--requisicoes', type=int, default=5000)
+    args = parser.parse_args()
+
+    if args.carga:
+        print(json.dumps(asyncio.run(teste_de_carga(args.conexoes, args.requisicoes)), indent=4))
+        return
+    try:
+        asyncio.run(servir(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
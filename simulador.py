@@ -0,0 +1,217 @@
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import delivery
+from medicao import ambiente, gerar_dados, percentil
+
+# Pesos padrão de cada fluxo no sorteio das operações.
+TAXAS_PADRAO = {'login': 1, 'pedido': 4, 'busca': 1, 'ver_pedidos': 3, 'painel_restaurante': 2}
+
+
+class FimDoRoteiro(Exception):
+    pass
+
+
+class Terminal:
+    # Substitui o console em delivery: `input` devolve as respostas do roteiro
+    # atual e, esgotado o roteiro, pergunta ao `responder` (se houver) ou
+    # encerra o fluxo com FimDoRoteiro; `print` só conta as linhas.
+    def __init__(self):
+        self.respostas = iter(())
+        self.responder = None
+        self.linhas = 0
+
+    def roteiro(self, respostas, responder=None):
+        self.respostas = iter(respostas)
+        self.responder = responder
+
+    def input(self, pergunta=''):
+        resposta = next(self.respostas, None)
+        if resposta is not None:
+            return resposta
+        if self.responder is not None:
+            return self.responder(pergunta)
+        raise FimDoRoteiro(pergunta)
+
+    def print(self, *args, **kwargs):
+        self.linhas += 1
+
+    def instalar(self):
+        delivery.input = self.input
+        delivery.print = self.print
+
+    def remover(self):
+        del delivery.input
+        del delivery.print
+
+
+class Simulador:
+    # Sessões roteirizadas de clientes e restaurantes sobre as funções do
+    # console. Cada operação sorteia um fluxo pelas taxas e um usuário entre
+    # os `sessoes` primeiros de cada tipo, e mede o fluxo do início ao fim.
+    def __init__(self, sistema, taxas=None, sessoes=100, transicao=0.5, semente=7):
+        self.sistema = sistema
+        self.taxas = taxas or TAXAS_PADRAO
+        self.transicao = transicao
+        self.aleatorio = random.Random(semente)
+        self.clientes = sistema.clientes[:sessoes]
+        self.restaurantes = [r for r in sistema.restaurantes if r.cardapio][:sessoes]
+        self.terminal = Terminal()
+        self.latencias = {fluxo: [] for fluxo in self.taxas}
+
+    def executar(self, operacoes):
+        fluxos = list(self.taxas)
+        pesos = [self.taxas[fluxo] for fluxo in fluxos]
+        self.terminal.instalar()
+        try:
+            inicio = time.perf_counter()
+            for fluxo in self.aleatorio.choices(fluxos, pesos, k=operacoes):
+                passo = getattr(self, f'fluxo_{fluxo}')
+                comeco = time.perf_counter()
+                try:
+                    passo()
+                except FimDoRoteiro:
+                    pass
+                self.latencias[fluxo].append(time.perf_counter() - comeco)
+            return time.perf_counter() - inicio
+        finally:
+            self.terminal.remover()
+
+    # --- Fluxos ---
+    def fluxo_login(self):
+        # Pelo menu principal, até o menu do usuário aparecer.
+        if self.aleatorio.random() < 0.5:
+            usuario, opcao = self.aleatorio.choice(self.clientes), '1'
+        else:
+            usuario, opcao = self.aleatorio.choice(self.restaurantes), '2'
+        self.terminal.roteiro([opcao, usuario.nome, usuario.senha])
+        delivery.menu_principal()
+
+    def fluxo_pedido(self):
+        posicao = self.aleatorio.randrange(len(self.sistema.restaurantes))
+        restaurante = self.sistema.restaurantes[posicao]
+        pratos = [str(self.aleatorio.randrange(len(restaurante.cardapio)) + 1) for _ in range(self.aleatorio.randint(1, 3))] \
+            if restaurante.cardapio else []
+        self.terminal.roteiro([str(posicao + 1), *pratos, 'fim'])
+        delivery.fazer_pedido(self.aleatorio.choice(self.clientes))
+
+    def fluxo_busca(self):
+        # Pedido a partir da busca de pratos.
+        _, prato = self.aleatorio.choice(self.sistema.busca.pratos)
+        consulta = delivery.termos_busca(prato.nome)[0]
+        self.terminal.roteiro(['b', consulta, '', '', '1', 'fim'])
+        delivery.fazer_pedido(self.aleatorio.choice(self.clientes))
+
+    def fluxo_ver_pedidos(self):
+        self.terminal.roteiro(['3', '10'])
+        delivery.ver_pedidos_cliente(self.aleatorio.choice(self.clientes))
+
+    def fluxo_painel_restaurante(self):
+        # Primeira página da fila do restaurante; com probabilidade
+        # `transicao` marca uma parte dela como A caminho ou Entregue, em lote
+        # (os pedidos para os quais o status não é o próximo são ignorados
+        # pelo sistema, como seriam para um usuário).
+        respostas = []
+        if self.aleatorio.random() < self.transicao:
+            selecao = ' '.join(str(i) for i in self.aleatorio.sample(range(1, 11), self.aleatorio.randint(1, 10)))
+            respostas.append(f"{self.aleatorio.choice('ae')} {selecao}")
+        self.terminal.roteiro([*respostas, '0'])
+        delivery.fila_pedidos_restaurante(self.aleatorio.choice(self.restaurantes))
+
+    def relatorio(self, duracao):
+        fluxos = {}
+        for fluxo, latencias in self.latencias.items():
+            if not latencias:
+                continue
+            fluxos[fluxo] = {
+                'operacoes': len(latencias),
+                'operacoes_por_segundo': round(len(latencias) / sum(latencias), 1),
+                'p50_ms': round(percentil(latencias, 50) * 1000, 3),
+                'p95_ms': round(percentil(latencias, 95) * 1000, 3),
+                'p99_ms': round(percentil(latencias, 99) * 1000, 3),
+            }
+        total = sum(len(latencias) for latencias in self.latencias.values())
+        return {
+            'operacoes': total,
+            'segundos': round(duracao, 3),
+            'operacoes_por_segundo': round(total / duracao, 1),
+            'linhas_impressas': self.terminal.linhas,
+            'fluxos': fluxos,
+        }
+
+
+def criar_armazenamento(formato, pasta, dados):
+    if formato == 'sqlite':
+        caminho = os.path.join(pasta, 'simulacao.db')
+        delivery.migrar_para_sqlite(dados, caminho)
+        return delivery.ArmazenamentoSQLite(caminho)
+    if formato == 'colunar':
+        caminho = os.path.join(pasta, 'simulacao.col')
+        delivery.json_para_colunar(dados, caminho)
+        return delivery.ArmazenamentoColunar(caminho)
+    return delivery.ArmazenamentoJSON(dados)
+
+
+def simular(pedidos, operacoes, formato='json', taxas=None, sessoes=100, gravacao_adiada=None, semente=7):
+    with tempfile.TemporaryDirectory() as pasta:
+        dados = os.path.join(pasta, 'simulacao.data')
+        gerar_dados(dados, pedidos=pedidos, semente=semente)
+        armazenamento = criar_armazenamento(formato, pasta, dados)
+        if gravacao_adiada is not None:
+            armazenamento = delivery.ArmazenamentoDiferido(armazenamento, gravacao_adiada)
+        inicio = time.perf_counter()
+        sistema = delivery.Sistema(armazenamento)
+        carga = time.perf_counter() - inicio
+        delivery.sistema = sistema
+        simulador = Simulador(sistema, taxas, sessoes, semente=semente)
+        duracao = simulador.executar(operacoes)
+        sistema.fechar()
+        return {'pedidos': pedidos, 'formato': formato, 'carga_s': round(carga, 3), **simulador.relatorio(duracao)}
+
+
+def ler_taxas(texto):
+    # "pedido=4,ver_pedidos=3" -> {'pedido': 4.0, 'ver_pedidos': 3.0}
+    taxas = {}
+    for par in texto.split(','):
+        fluxo, _, peso = par.partition('=')
+        if fluxo.strip() not in TAXAS_PADRAO:
+            raise argparse.ArgumentTypeError(f'fluxo desconhecido: {fluxo} (use {", ".join(TAXAS_PADRAO)})')
+        taxas[fluxo.strip()] = float(peso)
+    return taxas
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulador de sessões do console do sistema de delivery')
+    parser.add_argument('--pedidos', type=int, nargs='+', default=[10_000, 100_000],
+                        help='tamanhos do histórico gerado, um relatório para cada')
+    parser.add_argument('--operacoes', type=int, default=2000)
+    parser.add_argument('--sessoes', type=int, default=100, help='clientes e restaurantes distintos nas sessões')
+    parser.add_argument('--taxas', type=ler_taxas, default=TAXAS_PADRAO,
+                        help='pesos dos fluxos, por exemplo "login=1,pedido=4,busca=1,ver_pedidos=3,painel_restaurante=2"')
+    parser.add_argument('--formato', choices=('json', 'colunar', 'sqlite'), default='json')
+    parser.add_argument('--gravacao-adiada', type=float, metavar='SEGUNDOS', help='usa a gravação adiada com este intervalo')
+    parser.add_argument('--semente', type=int, default=7)
+    parser.add_argument('--saida', help='grava o JSON de resultados neste arquivo')
+    args = parser.parse_args()
+
+    delivery.metricas.ativo = False
+    relatorio = {
+        'ambiente': ambiente(),
+        'parametros': {'operacoes': args.operacoes, 'sessoes': args.sessoes, 'taxas': args.taxas,
+                       'formato': args.formato, 'gravacao_adiada': args.gravacao_adiada},
+        'resultados': [simular(pedidos, args.operacoes, args.formato, args.taxas, args.sessoes,
+                               args.gravacao_adiada, args.semente) for pedidos in args.pedidos],
+    }
+    texto = json.dumps(relatorio, indent=4)
+    print(texto)
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            f.write(texto)
+
+
+if __name__ == '__main__':
+    main()
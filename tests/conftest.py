@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import delivery
+
+
+def popular(sistema, clientes=3, restaurantes=2, pratos=3):
+    for i in range(clientes):
+        sistema.adicionar_cliente(delivery.Cliente(f'cliente{i}', '1199', f'Rua {i}', f'c{i}@x.com', f'{i:011d}', 'senha', 'azul'))
+    for i in range(restaurantes):
+        restaurante = delivery.Restaurante(f'restaurante{i}', '1130', f'Avenida {i}', f'r{i}@x.com', f'{i:014d}', 'senha', 'azul')
+        sistema.adicionar_restaurante(restaurante)
+        for j in range(pratos):
+            sistema.adicionar_prato(restaurante, delivery.Prato(f'prato{j}', 10.0 + j, f'Prato {j}'))
+    return sistema
+
+
+def abrir(armazenamento, **opcoes):
+    # Sistema sobre `armazenamento`, já como o global usado pelos menus e
+    # pelo relógio.
+    delivery.sistema = delivery.Sistema(armazenamento, **opcoes)
+    return delivery.sistema
+
+
+@pytest.fixture
+def sistema(tmp_path):
+    sistema = popular(abrir(delivery.ArmazenamentoJSON(str(tmp_path / 'delivery.data'))))
+    yield sistema
+    delivery.sistema = None
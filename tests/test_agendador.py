@@ -0,0 +1,45 @@
+import random
+import time
+
+import delivery
+
+
+def test_vencidos_em_ordem_e_sem_entradas_obsoletas():
+    restaurante = delivery.Restaurante('restaurante', '', '', '', '', '', '')
+    agendador = delivery.AgendadorStatus()
+    pedidos = []
+    for i, atraso in enumerate((30, 5, 50, 15)):
+        pedido = delivery.Pedido(None, restaurante, [])
+        pedido.id, pedido.hora = i + 1, 1000 + atraso
+        agendador.agendar(pedido)
+        pedidos.append(pedido)
+    # Mudou por outro caminho antes de vencer: a entrada antiga é descartada.
+    pedidos[2].status = 'Entregue'
+
+    espera = delivery.TRANSICOES_AUTOMATICAS['Em preparo'][1]
+    assert agendador.vencidos(1000 + espera) == []
+    vencidos = agendador.vencidos(1000 + espera + 60)
+    assert [(p.id, proximo, vencimento) for p, proximo, vencimento in vencidos] == \
+        [(2, 'A caminho', 1015), (4, 'A caminho', 1025), (1, 'A caminho', 1040)]
+    assert len(agendador) == 0
+
+
+def test_atualizacao_so_move_os_vencidos(sistema, monkeypatch):
+    aleatorio = random.Random(1)
+    agora = int(time.time())
+    for i in range(40):
+        restaurante = sistema.restaurantes[i % 2]
+        pedido = delivery.Pedido(sistema.clientes[i % 3], restaurante, restaurante.cardapio[:1])
+        pedido.hora = agora - aleatorio.randrange(0, 40)
+        sistema.adicionar_pedido(pedido)
+    monkeypatch.setattr(time, 'time', lambda: agora + 0.5)
+
+    # A entrega só é agendada quando o pedido sai para entrega: um passo por vez.
+    delivery.atualizar_status_automaticamente()
+    assert {p.id: p.status for p in sistema.pedidos} == \
+        {p.id: 'A caminho' if agora - p.hora >= 10 else 'Em preparo' for p in sistema.pedidos}
+    delivery.atualizar_status_automaticamente()
+    assert {p.id: p.status for p in sistema.pedidos} == \
+        {p.id: 'Entregue' if agora - p.hora >= 20 else 'A caminho' if agora - p.hora >= 10 else 'Em preparo'
+         for p in sistema.pedidos}
+    assert len(sistema.agendador) == sum(p.status != 'Entregue' for p in sistema.pedidos)
@@ -0,0 +1,62 @@
+import random
+from collections import Counter
+
+import delivery
+
+
+def test_contagem_ordenada_igual_ao_counter():
+    aleatorio = random.Random(5)
+    contagem, esperado = delivery.ContagemOrdenada(), Counter()
+    for i in range(3000):
+        item = f'prato{int(aleatorio.paretovariate(1.2)) % 40}'
+        if i % 7 == 0 and esperado:
+            item = aleatorio.choice(sorted(esperado))
+            contagem.decrementar(item, 2)
+            esperado[item] -= 2
+            if esperado[item] <= 0:
+                del esperado[item]
+        else:
+            contagem.incrementar(item)
+            esperado[item] += 1
+        if i % 500 == 0:
+            assert sorted(v for _, v in contagem.mais_comuns(5)) == sorted(v for _, v in esperado.most_common(5))
+    assert dict(contagem.contagem) == dict(esperado)
+    assert sorted(v for _, v in contagem.mais_comuns(10)) == sorted(v for _, v in esperado.most_common(10))
+
+
+def test_space_saving_acha_os_frequentes_com_erro_limitado():
+    aleatorio = random.Random(6)
+    contagem, esperado = delivery.SpaceSaving(20), Counter()
+    for _ in range(20000):
+        item = f'prato{int(aleatorio.paretovariate(1.0)) % 500}'
+        contagem.incrementar(item)
+        esperado[item] += 1
+    assert len(contagem) == 20
+    for item, _ in esperado.most_common(3):
+        assert item in contagem.contagem
+    for item, valor in contagem.contagem.items():
+        assert esperado[item] <= valor <= esperado[item] + contagem.erro.get(item, 0)
+
+
+def conferir(agregados, pedidos, restaurantes):
+    assert agregados.total_pedidos == len(pedidos)
+    assert agregados.pedidos_por_restaurante == Counter(p.restaurante.nome for p in pedidos)
+    for restaurante in restaurantes:
+        receita = sum(prato.preco for p in pedidos if p.restaurante.nome == restaurante.nome for prato in p.pratos)
+        assert round(agregados.receita_por_restaurante[restaurante.nome], 6) == round(receita, 6)
+        pratos = Counter(prato.nome for p in pedidos if p.restaurante.nome == restaurante.nome for prato in p.pratos)
+        assert dict(agregados.mais_pedidos(10, restaurante.nome)) == dict(pratos)
+
+
+def test_painel_igual_a_varredura_dos_pedidos(sistema, tmp_path):
+    aleatorio = random.Random(7)
+    for _ in range(50):
+        restaurante = aleatorio.choice(sistema.restaurantes)
+        pratos = aleatorio.sample(restaurante.cardapio, aleatorio.randint(1, 3))
+        sistema.adicionar_pedido(delivery.Pedido(aleatorio.choice(sistema.clientes), restaurante, pratos))
+    conferir(sistema.agregados, sistema.pedidos, sistema.restaurantes)
+    relido = delivery.Sistema(delivery.ArmazenamentoJSON(str(tmp_path / 'delivery.data')))
+    conferir(relido.agregados, relido.pedidos, relido.restaurantes)
+
+    sistema.remover_pedidos([p.id for p in sistema.pedidos[:5]], descontar=True)
+    conferir(sistema.agregados, sistema.pedidos, sistema.restaurantes)
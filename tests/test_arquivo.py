@@ -0,0 +1,64 @@
+import time
+
+import pytest
+
+import delivery
+from conftest import abrir, popular
+
+
+def abrir_com_arquivo(tmp_path):
+    arquivo = delivery.ArquivoPedidos(str(tmp_path / 'arquivo'), dias=30)
+    return abrir(delivery.ArmazenamentoJSON(str(tmp_path / 'delivery.data')), arquivo=arquivo)
+
+
+def totais(sistema):
+    agregados = sistema.agregados
+    return (agregados.total_pedidos, dict(agregados.pedidos_por_restaurante),
+            {nome: pytest.approx(valor) for nome, valor in agregados.receita_por_restaurante.items()},
+            sorted(agregados.mais_pedidos(5)))
+
+
+def preparar(tmp_path):
+    sistema = popular(abrir_com_arquivo(tmp_path))
+    for i in range(6):
+        restaurante = sistema.restaurantes[i % 2]
+        sistema.adicionar_pedido(delivery.Pedido(sistema.clientes[i % 3], restaurante, restaurante.cardapio[:1 + i % 3]))
+    sistema.alterar_status_lote(sistema.pedidos, 'A caminho')
+    sistema.alterar_status_lote(sistema.pedidos[:4], 'Entregue')
+    return sistema
+
+
+def test_totais_iguais_depois_de_arquivar_e_recarregar(tmp_path):
+    sistema = preparar(tmp_path)
+    esperado = totais(sistema)
+    assert sistema.arquivar(time.time() + 31 * 86400, forcar=True) == 4
+    assert totais(sistema) == esperado
+
+    relido = abrir_com_arquivo(tmp_path)
+    assert totais(relido) == esperado
+    assert sorted(relido.pedidos_por_id) == [5, 6]
+    delivery.sistema = None
+
+
+def test_queda_entre_arquivo_e_diario_nao_conta_duas_vezes(tmp_path, monkeypatch):
+    sistema = preparar(tmp_path)
+    esperado = totais(sistema)
+    registrar_lote = sistema.armazenamento.registrar_lote
+
+    def cair(sistema, eventos):
+        if eventos[0][0] == 'arquivados':
+            raise OSError('queda')
+        registrar_lote(sistema, eventos)
+
+    monkeypatch.setattr(sistema.armazenamento, 'registrar_lote', cair)
+    with pytest.raises(OSError):
+        sistema.arquivar(time.time() + 31 * 86400, forcar=True)
+
+    relido = abrir_com_arquivo(tmp_path)
+    assert totais(relido) == esperado
+    assert sorted(relido.pedidos_por_id) == [5, 6]
+    # O evento que faltava foi registrado na carga.
+    relido = abrir_com_arquivo(tmp_path)
+    assert totais(relido) == esperado
+    assert sorted(relido.pedidos_por_id) == [5, 6]
+    delivery.sistema = None
@@ -0,0 +1,37 @@
+import random
+
+import delivery
+
+
+def test_filtro_de_preco_por_faixas_igual_a_varredura():
+    aleatorio = random.Random(3)
+    palavras = ('frango', 'grelhado', 'queijo', 'caseiro', 'mousse', 'maracujá')
+    restaurante = delivery.Restaurante('restaurante', '', '', '', '', '', '')
+    indice = delivery.IndiceBusca()
+    pratos = []
+    for i in range(3000):
+        prato = delivery.Prato(' '.join(aleatorio.sample(palavras, 2)), round(aleatorio.uniform(0, 200), 2), '')
+        pratos.append(prato)
+        indice.adicionar(restaurante, prato)
+
+    consultas = [('frango', 20, 21), ('queijo caseiro', None, 1.5), ('gre', 150, None), ('mousse', 0, 0.5),
+                 ('frango', 10, 150), ('maracuja', None, None)]
+    for consulta, minimo, maximo in consultas:
+        termos = delivery.termos_busca(consulta)
+        esperado = [
+            prato for prato in pratos
+            if all(any(palavra.startswith(termo) for palavra in delivery.termos_busca(prato.nome)) for termo in termos)
+            and (minimo is None or prato.preco >= minimo) and (maximo is None or prato.preco <= maximo)
+        ][:20]
+        assert [prato for _, prato in indice.buscar(consulta, minimo, maximo)] == esperado
+    assert indice.faixas_do_filtro(20, 21) is not None
+    assert indice.faixas_do_filtro(10, 150) is None
+
+
+def test_fazer_pedido_recusa_escolha_invalida(sistema, monkeypatch, capsys):
+    cliente = sistema.clientes[0]
+    for entrada in ('abc', '0', '3', '-1', ''):
+        monkeypatch.setattr('builtins.input', lambda texto: entrada)
+        delivery.fazer_pedido(cliente)
+        assert 'Escolha inválida.' in capsys.readouterr().out
+    assert not sistema.pedidos
@@ -0,0 +1,88 @@
+import os
+
+import delivery
+from conftest import abrir, popular
+
+
+def gerar_json(caminho):
+    # Snapshot JSON com pedidos em todos os status e um diário vazio.
+    sistema = popular(abrir(delivery.ArmazenamentoJSON(caminho)))
+    for i in range(6):
+        restaurante = sistema.restaurantes[i % 2]
+        sistema.adicionar_pedido(delivery.Pedido(sistema.clientes[i % 3], restaurante, restaurante.cardapio[:1 + i % 3]))
+    sistema.alterar_status_lote(sistema.pedidos[:4], 'A caminho')
+    sistema.alterar_status_lote(sistema.pedidos[:2], 'Entregue')
+    sistema.salvar_dados()
+    return delivery.retrato(sistema)
+
+
+def test_ida_e_volta_json_colunar_json(tmp_path):
+    origem = str(tmp_path / 'delivery.data')
+    original = gerar_json(origem)
+    assert delivery.verificar_ida_e_volta(origem) == []
+
+    colunar = str(tmp_path / 'delivery.col')
+    delivery.json_para_colunar(origem, colunar)
+    assert delivery.retrato(abrir(delivery.ArmazenamentoColunar(colunar))) == original
+    delivery.sistema = None
+
+
+def test_mutacoes_depois_do_mapeamento_sobrevivem_a_compactacao(tmp_path):
+    origem, colunar = str(tmp_path / 'delivery.data'), str(tmp_path / 'delivery.col')
+    gerar_json(origem)
+    delivery.json_para_colunar(origem, colunar)
+
+    sistema = abrir(delivery.ArmazenamentoColunar(colunar))
+    restaurante = sistema.restaurantes[0]
+    sistema.alterar_status_lote([sistema.pedidos_por_id[3]], 'Entregue')
+    sistema.adicionar_prato(restaurante, delivery.Prato('novo', 42.5, 'Prato novo'))
+    sistema.adicionar_pedido(delivery.Pedido(sistema.clientes[0], restaurante, [restaurante.cardapio[-1]]))
+    esperado = delivery.retrato(sistema)
+    sistema.salvar_dados()
+
+    relido = abrir(delivery.ArmazenamentoColunar(colunar))
+    assert delivery.retrato(relido) == esperado
+    assert relido.pedidos_por_id[3].status == 'Entregue'
+    assert [prato.nome for prato in relido.pedidos_por_id[7].pratos] == ['novo']
+    delivery.sistema = None
+
+
+def test_diario_reaplicado_sobre_snapshot_colunar(tmp_path):
+    origem, colunar = str(tmp_path / 'delivery.data'), str(tmp_path / 'delivery.col')
+    gerar_json(origem)
+    delivery.json_para_colunar(origem, colunar)
+
+    sistema = abrir(delivery.ArmazenamentoColunar(colunar))
+    restaurante = sistema.restaurantes[1]
+    sistema.alterar_status_lote([sistema.pedidos_por_id[5]], 'A caminho')
+    sistema.adicionar_pedido(delivery.Pedido(sistema.clientes[2], restaurante, restaurante.cardapio[1:]))
+    esperado = delivery.retrato(sistema)
+    assert os.path.exists(colunar + '.log')
+
+    assert delivery.retrato(abrir(delivery.ArmazenamentoColunar(colunar))) == esperado
+    delivery.sistema = None
+
+
+def test_linha_truncada_no_fim_do_diario_colunar(tmp_path):
+    origem, colunar = str(tmp_path / 'delivery.data'), str(tmp_path / 'delivery.col')
+    gerar_json(origem)
+    delivery.json_para_colunar(origem, colunar)
+
+    sistema = abrir(delivery.ArmazenamentoColunar(colunar))
+    sistema.alterar_status_lote([sistema.pedidos_por_id[5]], 'A caminho')
+    esperado = delivery.retrato(sistema)
+    restaurante = sistema.restaurantes[0]
+    sistema.adicionar_pedido(delivery.Pedido(sistema.clientes[1], restaurante, restaurante.cardapio[:1]))
+    # Simula uma queda no meio da última linha.
+    tamanho = os.path.getsize(colunar + '.log')
+    with open(colunar + '.log', 'r+b') as f:
+        f.truncate(tamanho - 10)
+
+    relido = abrir(delivery.ArmazenamentoColunar(colunar))
+    assert delivery.retrato(relido)[:3] == esperado[:3]
+    # O resto da linha é descartado e o diário continua utilizável.
+    restaurante = relido.restaurantes[0]
+    relido.adicionar_pedido(delivery.Pedido(relido.clientes[1], restaurante, restaurante.cardapio[:1]))
+    esperado = delivery.retrato(relido)
+    assert delivery.retrato(abrir(delivery.ArmazenamentoColunar(colunar))) == esperado
+    delivery.sistema = None
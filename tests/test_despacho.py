@@ -0,0 +1,28 @@
+import pytest
+
+import delivery
+from conftest import abrir, popular
+
+
+class GeocodificadorFixo:
+    # Endereço 'Avenida 0' (restaurante0) na origem; 'Perto' a 1 km dele.
+    def coordenadas(self, endereco):
+        return {'Avenida 0': (0.0, 0.0), 'Perto': (0.009, 0.0)}.get(endereco, (0.5, 0.5))
+
+
+def test_geocodificador_do_sistema_decide_o_entregador(tmp_path):
+    sistema = popular(abrir(delivery.ArmazenamentoJSON(str(tmp_path / 'delivery.data')), geocodificador=GeocodificadorFixo()))
+    sistema.adicionar_entregador(delivery.Entregador('longe', 'Outro lugar'))
+    sistema.adicionar_entregador(delivery.Entregador('perto', 'Perto'))
+    restaurante = sistema.restaurantes[0]
+    pedido = delivery.Pedido(sistema.clientes[0], restaurante, restaurante.cardapio[:1])
+    sistema.adicionar_pedido(pedido)
+    rotas = sistema.despacho.despachar()
+    assert [(entregador.nome, rota) for entregador, rota in rotas] == [('perto', [pedido])]
+    delivery.sistema = None
+
+
+def test_carregar_geocodificador():
+    assert isinstance(delivery.carregar_geocodificador('delivery:GeocodificadorLocal'), delivery.GeocodificadorLocal)
+    with pytest.raises(ValueError):
+        delivery.carregar_geocodificador('delivery')
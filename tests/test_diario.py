@@ -0,0 +1,49 @@
+import os
+import shutil
+
+import delivery
+from conftest import abrir, popular
+
+
+def fazer_pedido(sistema, i=0):
+    restaurante = sistema.restaurantes[i % len(sistema.restaurantes)]
+    return sistema.adicionar_pedido(delivery.Pedido(sistema.clientes[i % len(sistema.clientes)], restaurante, restaurante.cardapio[:1]))
+
+
+def test_linha_truncada_no_fim_do_diario(tmp_path):
+    caminho = str(tmp_path / 'delivery.data')
+    sistema = popular(abrir(delivery.ArmazenamentoJSON(caminho)))
+    sistema.salvar_dados()
+    fazer_pedido(sistema)
+    sistema.alterar_status_lote(sistema.pedidos[:1], 'A caminho')
+    esperado = delivery.retrato(sistema)
+    fazer_pedido(sistema, 1)
+    # Simula uma queda no meio da gravação da última linha.
+    with open(caminho + '.log', 'r+b') as f:
+        f.truncate(os.path.getsize(caminho + '.log') - 5)
+
+    relido = abrir(delivery.ArmazenamentoJSON(caminho))
+    assert delivery.retrato(relido)[:3] == esperado[:3]
+    # O pedaço da linha é descartado, então o próximo evento não se junta a ele.
+    fazer_pedido(relido, 2)
+    esperado = delivery.retrato(relido)
+    assert delivery.retrato(abrir(delivery.ArmazenamentoJSON(caminho))) == esperado
+    delivery.sistema = None
+
+
+def test_diario_ja_incorporado_ao_snapshot_nao_e_reaplicado(tmp_path):
+    # Queda entre gravar o snapshot e apagar o diário: as entradas antigas
+    # ficam no disco, mas a sequência do snapshot faz com que sejam ignoradas.
+    caminho = str(tmp_path / 'delivery.data')
+    sistema = popular(abrir(delivery.ArmazenamentoJSON(caminho)))
+    fazer_pedido(sistema)
+    fazer_pedido(sistema, 1)
+    shutil.copy(caminho + '.log', str(tmp_path / 'diario'))
+    sistema.salvar_dados()
+    esperado = delivery.retrato(sistema)
+    shutil.copy(str(tmp_path / 'diario'), caminho + '.log')
+
+    relido = abrir(delivery.ArmazenamentoJSON(caminho))
+    assert delivery.retrato(relido) == esperado
+    assert len(relido.pedidos) == 2
+    delivery.sistema = None
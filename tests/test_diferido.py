@@ -0,0 +1,45 @@
+import threading
+
+import delivery
+from conftest import abrir, popular
+
+
+def test_compactacao_adiada_grava_o_snapshot_fora_da_trava(tmp_path):
+    caminho = str(tmp_path / 'delivery.data')
+    armazenamento = delivery.ArmazenamentoDiferido(delivery.ArmazenamentoJSON(caminho), intervalo=60, lote=10 ** 6)
+    sistema = popular(abrir(armazenamento))
+    try:
+        cliente, restaurante = sistema.clientes[0], sistema.restaurantes[0]
+        primeiro = delivery.Pedido(cliente, restaurante, restaurante.cardapio[:1])
+        sistema.adicionar_pedido(primeiro)
+        armazenamento.interno.entradas_diario = armazenamento.interno.limite_diario
+
+        gravar_snapshot = armazenamento.interno.gravar_snapshot
+
+        def mutar():
+            sistema.alterar_status_lote([primeiro], 'A caminho')
+            sistema.adicionar_pedido(delivery.Pedido(cliente, restaurante, restaurante.cardapio[1:2]))
+
+        def gravar_com_mutacao(copia, destino):
+            # Sem a trava do sistema, outra thread consegue mutar durante a
+            # gravação; o que ela faz fica fora do snapshot e vai pelo diário.
+            thread = threading.Thread(target=mutar)
+            thread.start()
+            thread.join(5)
+            assert not thread.is_alive()
+            gravar_snapshot(copia, destino)
+
+        armazenamento.interno.gravar_snapshot = gravar_com_mutacao
+        armazenamento.flush()
+        del armazenamento.interno.gravar_snapshot
+
+        snapshot = delivery.Sistema(delivery.ArmazenamentoJSON(caminho))
+        assert [(p.id, p.status) for p in snapshot.pedidos] == [(1, 'Em preparo')]
+
+        armazenamento.flush()
+        relido = delivery.Sistema(delivery.ArmazenamentoJSON(caminho))
+        assert [(p.id, p.status) for p in relido.pedidos] == [(1, 'A caminho'), (2, 'Em preparo')]
+        assert len(relido.clientes) == 3 and len(restaurante.cardapio) == 3
+    finally:
+        armazenamento.fechar()
+        delivery.sistema = None
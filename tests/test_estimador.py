@@ -0,0 +1,82 @@
+import delivery
+from conftest import abrir
+from medicao import gerar_dados
+
+
+def test_transicoes_atrasadas_nao_distorcem_o_prazo(tmp_path):
+    # Pedidos em andamento e já vencidos há horas (sistema parado) são
+    # avançados na primeira atualização; o estimador deve aprender os
+    # tempos agendados, não o tempo em que o sistema ficou fora.
+    caminho = str(tmp_path / 'delivery.data')
+    gerar_dados(caminho, clientes=20, restaurantes=3, pratos_por_restaurante=5, pedidos=2000, fracao_ativos=0.3, dias=5)
+    sistema = abrir(delivery.ArmazenamentoJSON(caminho))
+    try:
+        delivery.atualizar_status_automaticamente()
+        delivery.atualizar_status_automaticamente()
+        estimador = sistema.estimador
+        assert estimador.geral[4] >= estimador.AMOSTRAS_MINIMAS
+        assert estimador.geral[5] >= estimador.AMOSTRAS_MINIMAS
+        espera_preparo = delivery.TRANSICOES_AUTOMATICAS['Em preparo'][1]
+        espera_total = delivery.TRANSICOES_AUTOMATICAS['A caminho'][1]
+        assert estimador.geral[0] <= espera_preparo
+        assert estimador.geral[2] <= espera_total
+
+        cliente, restaurante = sistema.clientes[0], sistema.restaurantes[0]
+        pedido = delivery.Pedido(cliente, restaurante, restaurante.cardapio[:1])
+        sistema.adicionar_pedido(pedido)
+        assert pedido.prazo - pedido.hora <= delivery.PRAZO_PADRAO
+    finally:
+        delivery.sistema = None
+
+
+def entregar(sistema, restaurante, preparo, transporte):
+    # Um pedido por vez (fila vazia), com as mudanças carimbadas.
+    pedido = delivery.Pedido(sistema.clientes[0], restaurante, restaurante.cardapio[:1])
+    sistema.adicionar_pedido(pedido)
+    sistema.alterar_status_lote([pedido], 'A caminho', {pedido.id: pedido.hora + preparo})
+    sistema.alterar_status_lote([pedido], 'Entregue', {pedido.id: pedido.hora + preparo + transporte})
+    return pedido
+
+
+def test_estimativa_aprendida_por_restaurante(sistema):
+    estimador = sistema.estimador
+    rapido, lento = sistema.restaurantes
+    assert estimador.estimar(rapido.nome, 0) == delivery.PRAZO_PADRAO
+    for _ in range(estimador.AMOSTRAS_MINIMAS):
+        entregar(sistema, rapido, 120, 300)
+    # Tempos constantes: sem desvio, sem margem; cada pedido na fila soma um preparo.
+    assert estimador.estimar(rapido.nome, 0) == 420
+    assert estimador.estimar(rapido.nome, 2) == 660
+    # Com poucas amostras, o restaurante usa a estimativa geral.
+    entregar(sistema, lento, 1200, 600)
+    assert estimador.estimar(lento.nome, 0) > 420
+    assert estimador.restaurantes[lento.nome][4] == 1
+
+    pedido = delivery.Pedido(sistema.clientes[1], rapido, rapido.cardapio[:1])
+    sistema.adicionar_pedido(pedido)
+    assert pedido.prazo - pedido.hora == estimador.estimar(rapido.nome, 0)
+
+
+def test_margem_cresce_com_a_variacao(sistema):
+    estimador = sistema.estimador
+    restaurante = sistema.restaurantes[0]
+    for i in range(estimador.AMOSTRAS_MINIMAS + 5):
+        entregar(sistema, restaurante, 60 if i % 2 else 180, 300)
+    medias = estimador.restaurantes[restaurante.nome]
+    assert medias[1] > 0
+    assert estimador.estimar(restaurante.nome, 0) > medias[0] + medias[2]
+
+
+def test_estimador_sobrevive_a_recarga(sistema, tmp_path):
+    restaurante = sistema.restaurantes[0]
+    for _ in range(3):
+        entregar(sistema, restaurante, 120, 300)
+    pedido = delivery.Pedido(sistema.clientes[0], restaurante, restaurante.cardapio[:1])
+    sistema.adicionar_pedido(pedido)
+    sistema.alterar_status_lote([pedido], 'A caminho')
+    esperado = sistema.estimador.estado()
+    assert list(esperado['em_transporte']) == [str(pedido.id)]
+
+    relido = abrir(delivery.ArmazenamentoJSON(str(tmp_path / 'delivery.data')))
+    assert relido.estimador.estado() == esperado
+    delivery.sistema = None
@@ -0,0 +1,51 @@
+import threading
+
+import delivery
+
+
+def test_fila_cheia_segura_quem_publica_ate_o_assinante_liberar():
+    barramento = delivery.BarramentoEventos()
+    liberar = threading.Event()
+    recebidos = []
+
+    def lento(evento):
+        liberar.wait(5)
+        recebidos.append(evento.pedido)
+
+    barramento.assinar(delivery.PedidoCriado, lento, fila=2)
+    publicados = []
+
+    def publicar():
+        for i in range(5):
+            barramento.publicar(delivery.PedidoCriado(i))
+            publicados.append(i)
+
+    em_espera = delivery.metricas.contadores['eventos_em_espera']
+    thread = threading.Thread(target=publicar)
+    thread.start()
+    # Um evento com o assinante e dois na fila: o quarto espera.
+    thread.join(0.3)
+    assert thread.is_alive()
+    assert len(publicados) == 3
+    liberar.set()
+    thread.join(5)
+    barramento.aguardar()
+    assert recebidos == list(range(5))
+    assert delivery.metricas.contadores['eventos_em_espera'] > em_espera
+
+
+def test_fila_ignora_reproduzidos_e_sobrevive_a_erros():
+    barramento = delivery.BarramentoEventos()
+    recebidos = []
+
+    def assinante(evento):
+        if evento.pedido == 1:
+            raise ValueError(evento.pedido)
+        recebidos.append(evento.pedido)
+
+    barramento.assinar(delivery.PedidoCriado, assinante, fila=10, reproduzidos=False)
+    barramento.publicar(delivery.PedidoCriado(0, reproduzido=True))
+    for i in range(1, 4):
+        barramento.publicar(delivery.PedidoCriado(i))
+    barramento.aguardar()
+    assert recebidos == [2, 3]
@@ -0,0 +1,56 @@
+from collections import Counter
+
+import pytest
+
+import delivery
+import fragmentos
+from medicao import gerar_dados
+
+
+@pytest.fixture
+def dividido(tmp_path):
+    origem = str(tmp_path / 'delivery.data')
+    gerar_dados(origem, clientes=30, restaurantes=8, pratos_por_restaurante=6, pedidos=600)
+    pasta = str(tmp_path / 'fragmentos')
+    tamanhos = fragmentos.dividir(origem, pasta, 3)
+    completo = delivery.Sistema(delivery.ArmazenamentoJSON(origem))
+    return completo, pasta, tamanhos
+
+
+def test_dividir_poe_cada_restaurante_num_fragmento(dividido):
+    completo, pasta, tamanhos = dividido
+    assert sum(tamanhos) == len(completo.pedidos)
+    with pytest.raises(FileExistsError):
+        fragmentos.dividir('', pasta, 3)
+    for indice in range(3):
+        parte = delivery.Sistema(fragmentos.abrir_armazenamento(pasta, indice, 'json'))
+        assert len(parte.clientes) == len(completo.clientes)
+        assert all(fragmentos.fragmento_de(r.nome, 3) == indice for r in parte.restaurantes)
+        assert all(fragmentos.fragmento_de(p.restaurante.nome, 3) == indice for p in parte.pedidos)
+
+
+def test_roteador_combina_os_fragmentos(dividido):
+    completo, pasta, _ = dividido
+    roteador = fragmentos.Roteador(pasta, intervalo_status=60)
+    try:
+        assert roteador.total_pedidos() == completo.agregados.total_pedidos
+        esperado = Counter(prato.nome for p in completo.pedidos for prato in p.pratos)
+        assert [quantidade for _, quantidade in roteador.mais_pedidos(5)] == [quantidade for _, quantidade in esperado.most_common(5)]
+        restaurante = completo.restaurantes[0]
+        assert dict(roteador.mais_pedidos(3, restaurante.nome)) == dict(completo.agregados.mais_pedidos(3, restaurante.nome))
+        cliente = completo.clientes[0]
+        assert [p['hora_pedido'] for p in roteador.pedidos_cliente(cliente.nome)] == \
+            sorted(p.to_dict()['hora_pedido'] for p in completo.pedidos_cliente.consultar(cliente.nome))
+
+        assert roteador.login('restaurante', restaurante.nome, restaurante.senha)
+        novo = roteador.fazer_pedido(cliente.nome, restaurante.nome, [restaurante.cardapio[0].nome])
+        assert novo['status'] == 'Em preparo'
+        assert roteador.alterar_status(restaurante.nome, [novo['id']], 'A caminho') == [novo['id']]
+        with pytest.raises(ValueError):
+            roteador.fazer_pedido('ninguém', restaurante.nome, [restaurante.cardapio[0].nome])
+    finally:
+        roteador.fechar()
+
+    dono = fragmentos.fragmento_de(restaurante.nome, 3)
+    parte = delivery.Sistema(fragmentos.abrir_armazenamento(pasta, dono, 'json'))
+    assert parte.pedidos_por_id[novo['id']].status == 'A caminho'
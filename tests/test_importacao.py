@@ -0,0 +1,48 @@
+import json
+
+import delivery
+
+
+def escrever(caminho, registros):
+    with open(caminho, 'w') as f:
+        for registro in registros:
+            f.write((registro if isinstance(registro, str) else json.dumps(registro)) + '\n')
+
+
+def test_importacao_rejeita_tipos_e_horarios_invalidos_por_linha(sistema, tmp_path):
+    valido = {'cliente': 'cliente0', 'restaurante': 'restaurante0', 'pratos': ['prato0'],
+              'hora_pedido': '2024-05-01 12:00:00', 'status': 'Entregue'}
+    linhas = [
+        valido,
+        {**valido, 'cliente': ['cliente0']},
+        {**valido, 'restaurante': {'nome': 'restaurante0'}},
+        {**valido, 'pratos': [['prato0']]},
+        {**valido, 'status': ['Entregue']},
+        {**valido, 'hora_pedido': '2024-13-45 99:99:99'},
+        {**valido, 'prazo_entrega': 20240501},
+        '{"cliente": "cliente0"',
+        {**valido, 'pratos': ['prato1', 'prato2']},
+    ]
+    caminho = tmp_path / 'pedidos.jsonl'
+    escrever(caminho, linhas)
+
+    relatorio = delivery.importar_pedidos(sistema, str(caminho), tamanho_lote=2)
+
+    assert relatorio['lidos'] == 9
+    assert relatorio['importados'] == 2
+    assert [numero for numero, _ in relatorio['erros']] == [2, 3, 4, 5, 6, 7, 8]
+    assert len(sistema.pedidos) == 2
+    assert sistema.pedidos[0].hora_pedido.strftime('%Y-%m-%d %H:%M:%S') == '2024-05-01 12:00:00'
+
+
+def test_importacao_usa_o_estimador_para_o_prazo(sistema, tmp_path):
+    # Estimador treinado: 5 minutos por pedido na fila e 10 de transporte.
+    sistema.estimador.geral = [300.0, 0.0, 600.0, 0.0, 10, 10]
+    pedido = {'cliente': 'cliente0', 'restaurante': 'restaurante0', 'pratos': ['prato0'],
+              'hora_pedido': '2024-05-01 12:00:00', 'status': 'Em preparo'}
+    caminho = tmp_path / 'pedidos.jsonl'
+    escrever(caminho, [pedido, pedido, {**pedido, 'prazo_entrega': '2024-05-01 13:00:00'}])
+
+    delivery.importar_pedidos(sistema, str(caminho))
+
+    assert [p.prazo - p.hora for p in sistema.pedidos] == [900, 1200, 3600]
@@ -0,0 +1,45 @@
+import random
+
+import delivery
+
+
+def varredura(sistema, campo, nome, status=None, limite=None):
+    pedidos = [p for p in sistema.pedidos if getattr(p, campo).nome == nome and (status is None or p.status in status)]
+    if limite is not None:
+        pedidos = pedidos[-limite:] if limite > 0 else []
+    return pedidos
+
+
+def test_indices_iguais_a_varredura(sistema):
+    aleatorio = random.Random(4)
+    for i in range(60):
+        restaurante = aleatorio.choice(sistema.restaurantes)
+        sistema.adicionar_pedido(delivery.Pedido(aleatorio.choice(sistema.clientes), restaurante, restaurante.cardapio[:1]))
+        if i % 3 == 0:
+            ativos = [p for p in sistema.pedidos if p.status != 'Entregue']
+            pedido = aleatorio.choice(ativos)
+            sistema.alterar_status_lote([pedido], delivery.PROXIMO_STATUS[pedido.status])
+    sistema.remover_pedidos([p.id for p in sistema.pedidos[10:20]], descontar=True)
+
+    consultas = [(None, None), (delivery.STATUS_ATIVOS, None), (('Entregue',), None), (None, 5), (delivery.STATUS_ATIVOS, 3), (None, 0)]
+    for indice, campo, donos in ((sistema.pedidos_cliente, 'cliente', sistema.clientes),
+                                 (sistema.pedidos_restaurante, 'restaurante', sistema.restaurantes)):
+        for dono in donos:
+            for status, limite in consultas:
+                assert indice.consultar(dono.nome, status, limite) == varredura(sistema, campo, dono.nome, status, limite)
+            for status in delivery.STATUS:
+                assert indice.contar(dono.nome, status) == len(varredura(sistema, campo, dono.nome, (status,)))
+
+
+def test_ver_pedidos_cliente_mostra_so_os_do_cliente(sistema, monkeypatch, capsys):
+    restaurante = sistema.restaurantes[0]
+    for i in range(6):
+        sistema.adicionar_pedido(delivery.Pedido(sistema.clientes[i % 2], restaurante, restaurante.cardapio[:1]))
+    sistema.alterar_status_lote(sistema.pedidos[:2], 'A caminho')
+    sistema.alterar_status_lote(sistema.pedidos[:1], 'Entregue')
+    # Filtro "apenas ativos".
+    monkeypatch.setattr('builtins.input', lambda texto: '2')
+    delivery.ver_pedidos_cliente(sistema.clientes[0])
+    saida = capsys.readouterr().out
+    assert saida.count('Restaurante: ') == 2
+    assert 'Entregue' not in saida
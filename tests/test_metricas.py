@@ -0,0 +1,49 @@
+import pytest
+
+import delivery
+
+
+def test_histograma_percentis_pelo_limite_do_balde():
+    histograma = delivery.Histograma()
+    for segundos in [0.001] * 98 + [0.5, 2.0]:
+        histograma.registrar(segundos)
+    assert histograma.quantidade == 100 and histograma.maximo == 2.0
+    assert 0.001 <= histograma.percentil(50) < 0.002
+    assert histograma.percentil(99) >= 0.5
+    assert histograma.percentil(100) == 2.0
+
+
+def test_medir_e_contar():
+    metricas = delivery.Metricas()
+
+    @metricas.medir('dividir')
+    def dividir(a, b):
+        return a / b
+
+    assert dividir(6, 3) == 2
+    with pytest.raises(ZeroDivisionError):
+        dividir(1, 0)
+    metricas.contar('pedidos', 3)
+    assert metricas.histogramas['dividir'].quantidade == 2
+    assert metricas.contadores['pedidos'] == 3
+    assert 'dividir' in metricas.resumo() and 'pedidos' in metricas.resumo()
+    texto = metricas.texto()
+    assert 'delivery_dividir_segundos_count 2' in texto
+    assert 'delivery_dividir_segundos_bucket{le="+Inf"} 2' in texto
+    assert 'delivery_pedidos_total 3' in texto
+
+    metricas.ativo = False
+    dividir(1, 1)
+    metricas.contar('pedidos')
+    assert metricas.histogramas['dividir'].quantidade == 2
+    assert metricas.contadores['pedidos'] == 3
+
+
+def test_pagina_de_metricas_do_administrador(sistema, monkeypatch, capsys, tmp_path):
+    sistema.adicionar_pedido(delivery.Pedido(sistema.clientes[0], sistema.restaurantes[0], sistema.restaurantes[0].cardapio[:1]))
+    exportado = tmp_path / 'metricas.txt'
+    respostas = iter(['7', str(exportado), '0'])
+    monkeypatch.setattr('builtins.input', lambda texto: next(respostas))
+    delivery.interface_admin()
+    assert 'adicionar_pedido' in capsys.readouterr().out
+    assert 'delivery_adicionar_pedido_segundos_count' in exportado.read_text()
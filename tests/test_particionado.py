@@ -0,0 +1,116 @@
+import glob
+import json
+import multiprocessing
+import time
+
+import pytest
+
+import delivery
+from conftest import abrir, popular
+
+pytestmark = pytest.mark.skipif(delivery.fcntl is None, reason='o armazenamento particionado exige fcntl')
+
+
+def fazer_pedidos(pasta, cliente, quantidade):
+    sistema = abrir(delivery.ArmazenamentoParticionado(pasta))
+    restaurante = sistema.restaurantes_por_nome['restaurante0']
+    for _ in range(quantidade):
+        sistema.adicionar_pedido(delivery.Pedido(sistema.clientes_por_nome[cliente], restaurante, restaurante.cardapio[:1]))
+    sistema.fechar()
+
+
+def test_processos_gravam_na_mesma_particao_sem_perder_pedidos(tmp_path):
+    pasta = str(tmp_path / 'delivery.d')
+    popular(abrir(delivery.ArmazenamentoParticionado(pasta)))
+    contexto = multiprocessing.get_context('spawn')
+    processos = [contexto.Process(target=fazer_pedidos, args=(pasta, f'cliente{i}', 40)) for i in range(3)]
+    for processo in processos:
+        processo.start()
+    for processo in processos:
+        processo.join(60)
+        assert processo.exitcode == 0
+
+    relido = abrir(delivery.ArmazenamentoParticionado(pasta))
+    ids = [pedido.id for pedido in relido.pedidos]
+    assert len(ids) == 120 and len(set(ids)) == 120
+    assert sorted(pedido.cliente.nome for pedido in relido.pedidos) == sorted(f'cliente{i}' for i in range(3) for _ in range(40))
+    delivery.sistema = None
+
+
+def test_status_proprio_nao_e_reaplicado(tmp_path):
+    pasta = str(tmp_path / 'delivery.d')
+    barramento = delivery.BarramentoEventos()
+    mudancas = []
+    barramento.assinar(delivery.StatusAlterado, lambda evento: evento.reproduzido or mudancas.append(evento.status))
+    sistema = popular(abrir(delivery.ArmazenamentoParticionado(pasta), barramento=barramento))
+    restaurante = sistema.restaurantes[0]
+    pedido = delivery.Pedido(sistema.clientes[0], restaurante, restaurante.cardapio[:1])
+    sistema.adicionar_pedido(pedido)
+    sistema.alterar_status_lote([pedido], 'A caminho')
+    sistema.alterar_status_lote([pedido], 'Entregue')
+    assert mudancas == ['A caminho', 'Entregue']
+    delivery.sistema = None
+
+
+def test_ultimo_status_no_diario_prevalece(tmp_path):
+    pasta = str(tmp_path / 'delivery.d')
+    primeiro = popular(abrir(delivery.ArmazenamentoParticionado(pasta)))
+    restaurante = primeiro.restaurantes[0]
+    pedido = delivery.Pedido(primeiro.clientes[0], restaurante, restaurante.cardapio[:1])
+    primeiro.adicionar_pedido(pedido)
+
+    segundo = abrir(delivery.ArmazenamentoParticionado(pasta))
+    segundo.alterar_status_lote([segundo.pedidos_por_id[pedido.id]], 'A caminho')
+    segundo.alterar_status_lote([segundo.pedidos_por_id[pedido.id]], 'Entregue')
+    # O primeiro muda o status sem ter lido os do segundo; ao gravar, lê as
+    # mudanças do outro, que o levam adiante. A sua, repetida, é descartada
+    # e o pedido não volta para 'A caminho'.
+    delivery.sistema = primeiro
+    primeiro.alterar_status_lote([pedido], 'A caminho')
+    assert pedido.status == 'Entregue'
+    assert abrir(delivery.ArmazenamentoParticionado(pasta)).pedidos_por_id[pedido.id].status == 'Entregue'
+    delivery.sistema = None
+
+
+def rodar_relogio(pasta, inicio, segundos):
+    sistema = abrir(delivery.ArmazenamentoParticionado(pasta))
+    inicio.wait(30)
+    fim = time.time() + segundos
+    while time.time() < fim:
+        with sistema.trava:
+            delivery.atualizar_status_automaticamente()
+        time.sleep(0.02)
+    sistema.fechar()
+
+
+def test_so_um_processo_faz_as_transicoes_automaticas(tmp_path):
+    pasta = str(tmp_path / 'delivery.d')
+    sistema = popular(abrir(delivery.ArmazenamentoParticionado(pasta)))
+    for i in range(20):
+        restaurante = sistema.restaurantes[i % 2]
+        pedido = delivery.Pedido(sistema.clientes[i % 3], restaurante, restaurante.cardapio[:1])
+        pedido.hora -= 60
+        sistema.adicionar_pedido(pedido)
+    contexto = multiprocessing.get_context('spawn')
+    inicio = contexto.Event()
+    processos = [contexto.Process(target=rodar_relogio, args=(pasta, inicio, 1.5)) for _ in range(2)]
+    for processo in processos:
+        processo.start()
+    inicio.set()
+    for processo in processos:
+        processo.join(60)
+        assert processo.exitcode == 0
+
+    relido = abrir(delivery.ArmazenamentoParticionado(pasta))
+    assert all(pedido.status == 'Entregue' for pedido in relido.pedidos)
+    mudancas, origens = [], set()
+    for diario in glob.glob(f'{pasta}/restaurantes/*.log'):
+        with open(diario) as f:
+            for linha in f:
+                entrada = json.loads(linha)
+                if entrada.get('tipo') == 'status':
+                    mudancas.append((entrada['dados']['id'], entrada['dados']['status']))
+                    origens.add(entrada['origem'])
+    assert sorted(mudancas) == sorted((pedido.id, status) for pedido in relido.pedidos for status in ('A caminho', 'Entregue'))
+    assert len(origens) == 1
+    delivery.sistema = None
@@ -0,0 +1,42 @@
+import time
+from datetime import datetime
+
+import pytest
+
+import delivery
+
+
+def test_pedido_e_prato_sem_dicionario(sistema):
+    restaurante = sistema.restaurantes[0]
+    pedido = delivery.Pedido(sistema.clientes[0], restaurante, restaurante.cardapio[:2])
+    for objeto in (pedido, restaurante.cardapio[0]):
+        assert not hasattr(objeto, '__dict__')
+        with pytest.raises(AttributeError):
+            objeto.extra = 1
+    pedido.status = 'A caminho'
+    assert pedido.codigo_status == 1 and pedido.status == 'A caminho'
+
+
+def test_horarios_lidos_como_texto_convertidos_sob_demanda():
+    pedido = delivery.Pedido(None, None, [])
+    pedido.hora, pedido.prazo = '2024-05-01 12:00:00', '2024-05-01 12:30:00'
+    assert pedido._hora == '2024-05-01 12:00:00'
+    assert pedido.hora == int(datetime(2024, 5, 1, 12).timestamp())
+    assert pedido.prazo - pedido.hora == 1800
+    assert pedido.hora_pedido == datetime(2024, 5, 1, 12)
+    assert delivery.epoca('2024-12-31 23:59:59') == int(time.mktime((2024, 12, 31, 23, 59, 59, 0, 0, -1)))
+
+
+def test_armazem_colunar_igual_aos_pedidos(sistema):
+    for i in range(8):
+        restaurante = sistema.restaurantes[i % 2]
+        sistema.adicionar_pedido(delivery.Pedido(sistema.clientes[i % 3], restaurante, restaurante.cardapio[i % 3:]))
+    sistema.alterar_status_lote(sistema.pedidos[::2], 'A caminho')
+    armazem = delivery.ArmazemPedidos(sistema.clientes, sistema.restaurantes)
+    for pedido in sistema.pedidos:
+        armazem.adicionar(pedido)
+    assert len(armazem) == 8
+    assert [compacto.to_dict() for compacto in armazem] == [pedido.to_dict() for pedido in sistema.pedidos]
+    assert armazem[3].pratos == sistema.pedidos[3].pratos
+    with pytest.raises(IndexError):
+        armazem[8]
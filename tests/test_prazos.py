@@ -0,0 +1,44 @@
+import time
+from collections import Counter
+
+import delivery
+
+
+def preparar(sistema, agora):
+    # Prazos de agora + 30 min até agora - 25 min, de 5 em 5 minutos.
+    for k in range(12):
+        restaurante = sistema.restaurantes[k % 2]
+        pedido = delivery.Pedido(sistema.clientes[k % 3], restaurante, restaurante.cardapio[:1])
+        pedido.hora = agora - k * 300
+        sistema.adicionar_pedido(pedido)
+    sistema.alterar_status_lote(sistema.pedidos[::3], 'A caminho')
+    sistema.alterar_status_lote(sistema.pedidos[::4], 'Entregue')
+
+
+def test_atrasados_e_vencendo_iguais_a_varredura(sistema):
+    agora = int(time.time())
+    preparar(sistema, agora)
+    monitor = sistema.monitor_prazos
+    ativos = [p for p in sistema.pedidos if p.status in delivery.STATUS_ATIVOS]
+    assert len(monitor) == len(ativos)
+    por_prazo = lambda pedidos: sorted(pedidos, key=lambda p: (p.prazo, p.id))
+    atrasados = por_prazo(p for p in ativos if p.prazo < agora)
+    assert monitor.atrasados(agora) == atrasados
+    assert monitor.atrasados(agora, 'restaurante1') == [p for p in atrasados if p.restaurante.nome == 'restaurante1']
+    assert monitor.atrasados_por_restaurante(agora) == Counter(p.restaurante.nome for p in atrasados)
+    assert monitor.vencendo(agora, 900) == por_prazo(p for p in ativos if agora <= p.prazo < agora + 900)
+    for restaurante in sistema.restaurantes:
+        fila = por_prazo(p for p in ativos if p.restaurante is restaurante)
+        assert monitor.fila(restaurante.nome) == fila
+        assert monitor.fila(restaurante.nome, 1, 2) == fila[1:3]
+        assert monitor.ativos(restaurante.nome) == len(fila)
+
+
+def test_relatorio_de_atrasados(sistema, monkeypatch, capsys):
+    preparar(sistema, int(time.time()))
+    monkeypatch.setattr('builtins.input', lambda texto: '15')
+    delivery.relatorio_atrasados()
+    saida = capsys.readouterr().out
+    atrasados = sum(p.esta_atrasado() for p in sistema.pedidos)
+    assert f"{atrasados} de {len(sistema.monitor_prazos)} pedidos ativos atrasados." in saida
+    assert "pedidos vencem nos próximos 15 minutos." in saida
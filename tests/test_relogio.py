@@ -0,0 +1,25 @@
+import threading
+
+import delivery
+
+
+def test_relogio_continua_depois_de_um_passo_com_erro(sistema, monkeypatch, capsys):
+    passos = []
+    dois_passos = threading.Event()
+
+    def passo():
+        passos.append(1)
+        if len(passos) == 1:
+            raise OSError('disco cheio')
+        dois_passos.set()
+
+    monkeypatch.setattr(delivery, 'atualizar_status_automaticamente', passo)
+    erros = delivery.metricas.contadores['erros_relogio']
+    relogio = delivery.Relogio(intervalo=0.01)
+    relogio.iniciar()
+    try:
+        assert dois_passos.wait(5)
+    finally:
+        relogio.encerrar()
+    assert delivery.metricas.contadores['erros_relogio'] == erros + 1
+    assert 'disco cheio' in capsys.readouterr().err
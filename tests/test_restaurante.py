@@ -0,0 +1,39 @@
+import delivery
+
+
+def responder(monkeypatch, respostas):
+    respostas = iter(respostas)
+    monkeypatch.setattr('builtins.input', lambda texto: next(respostas))
+
+
+def fazer_pedidos(sistema, quantidade):
+    restaurante = sistema.restaurantes[0]
+    for i in range(quantidade):
+        sistema.adicionar_pedido(delivery.Pedido(sistema.clientes[i % 3], restaurante, restaurante.cardapio[:1]))
+    return restaurante
+
+
+def test_ver_pedidos_muda_o_status_de_um_pedido(sistema, monkeypatch):
+    restaurante = fazer_pedidos(sistema, 3)
+    sistema.alterar_status_lote(sistema.pedidos[2:], 'A caminho')
+    # Filtro "todos"; o primeiro vai a caminho, o segundo fica, o terceiro é entregue.
+    responder(monkeypatch, ['1', '1', '0', '2'])
+    delivery.ver_pedidos_restaurante(restaurante)
+    assert [p.status for p in sistema.pedidos] == ['A caminho', 'Em preparo', 'Entregue']
+
+
+def test_ver_pedidos_ignora_opcao_que_nao_e_o_proximo_status(sistema, monkeypatch):
+    restaurante = fazer_pedidos(sistema, 1)
+    responder(monkeypatch, ['1', '2'])
+    delivery.ver_pedidos_restaurante(restaurante)
+    assert sistema.pedidos[0].status == 'Em preparo'
+
+
+def test_fila_muda_a_selecao_da_pagina(sistema, monkeypatch):
+    restaurante = fazer_pedidos(sistema, 12)
+    # Página 1: 1, 3 e 5 a 7 a caminho; página 2: os dois que restam; de
+    # volta à página 1, entrega só os que já estão a caminho.
+    responder(monkeypatch, ['a 1 3 5-7', 'p', 'a *', 'v', 'e *', '0'])
+    delivery.fila_pedidos_restaurante(restaurante, tamanho_pagina=10)
+    contagem = {status: sum(p.status == status for p in sistema.pedidos) for status in delivery.STATUS}
+    assert contagem == {'Em preparo': 5, 'A caminho': 2, 'Entregue': 5}
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from servidor import ClienteHTTP, ServidorDelivery
+
+
+def conversar(sistema, requisicoes):
+    # Todas as requisições na mesma conexão keep-alive.
+    async def executar():
+        servidor = ServidorDelivery(sistema)
+        porta = await servidor.iniciar('127.0.0.1', 0)
+        cliente = ClienteHTTP('127.0.0.1', porta)
+        await cliente.conectar()
+        try:
+            respostas = []
+            for requisicao in requisicoes:
+                if callable(requisicao):
+                    requisicao = requisicao(respostas)
+                respostas.append(await cliente.requisitar(*requisicao))
+            return respostas
+        finally:
+            cliente.fechar()
+            await servidor.encerrar()
+    return asyncio.run(executar())
+
+
+@pytest.mark.parametrize('corpo', [
+    [],
+    'x',
+    {'tipo': 'cliente', 'nome': ['a'], 'senha': 'senha'},
+    {'tipo': ['cliente'], 'nome': 'cliente0', 'senha': 'senha'},
+])
+def test_login_com_corpo_mal_formado_devolve_400_e_mantem_conexao(sistema, corpo):
+    respostas = conversar(sistema, [
+        ('POST', '/login', corpo),
+        ('POST', '/login', {'tipo': 'cliente', 'nome': 'cliente0', 'senha': 'senha'}),
+    ])
+    assert respostas[0][0] == 400
+    assert respostas[1][0] == 200
+
+
+@pytest.mark.parametrize('pratos', [[['prato0']], 'prato0', [1]])
+def test_pedido_com_pratos_mal_formados_devolve_400(sistema, pratos):
+    login = ('POST', '/login', {'tipo': 'cliente', 'nome': 'cliente0', 'senha': 'senha'})
+    respostas = conversar(sistema, [
+        login,
+        lambda r: ('POST', '/pedidos', {'restaurante': 'restaurante0', 'pratos': pratos}, r[0][1]['token']),
+        lambda r: ('POST', '/pedidos', {'restaurante': ['restaurante0'], 'pratos': ['prato0']}, r[0][1]['token']),
+        lambda r: ('POST', '/pedidos', {'restaurante': 'restaurante0', 'pratos': ['prato0']}, r[0][1]['token']),
+    ])
+    assert [status for status, _ in respostas] == [200, 400, 400, 201]
+
+
+def test_status_em_lote_com_ids_mal_formados_devolve_400(sistema):
+    respostas = conversar(sistema, [
+        ('POST', '/login', {'tipo': 'restaurante', 'nome': 'restaurante0', 'senha': 'senha'}),
+        lambda r: ('POST', '/pedidos/status', {'ids': [[1]], 'status': 'A caminho'}, r[0][1]['token']),
+        lambda r: ('POST', '/pedidos/status', {'ids': [1], 'status': ['A caminho']}, r[0][1]['token']),
+        lambda r: ('GET', '/fila', None, r[0][1]['token']),
+    ])
+    assert [status for status, _ in respostas] == [200, 400, 400, 200]
+
+
+def test_erro_inesperado_na_rota_devolve_500(sistema, monkeypatch):
+    def falhar(requisicao):
+        raise KeyError('defeito')
+    monkeypatch.setattr(ServidorDelivery, 'listar_restaurantes', lambda self, requisicao: falhar(requisicao))
+    respostas = conversar(sistema, [('GET', '/restaurantes'), ('GET', '/restaurantes/restaurante0/cardapio')])
+    assert [status for status, _ in respostas] == [500, 200]
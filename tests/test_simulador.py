@@ -0,0 +1,32 @@
+import argparse
+
+import pytest
+
+import delivery
+import simulador
+
+
+def test_fluxo_de_pedido_cria_um_pedido_por_operacao(sistema):
+    simulacao = simulador.Simulador(sistema, {'pedido': 1, 'busca': 1}, semente=3)
+    simulacao.executar(30)
+    assert len(sistema.pedidos) == 30
+    assert not hasattr(delivery, 'input') and not hasattr(delivery, 'print')
+    relatorio = simulacao.relatorio(1.0)
+    assert relatorio['operacoes'] == 30
+    assert set(relatorio['fluxos']) <= {'pedido', 'busca'}
+
+
+@pytest.mark.parametrize('formato', ['json', 'colunar', 'sqlite'])
+def test_simular_todos_os_fluxos(formato):
+    resultado = simulador.simular(500, 100, formato, sessoes=10, semente=2)
+    assert resultado['operacoes'] == 100
+    assert set(resultado['fluxos']) == set(simulador.TAXAS_PADRAO)
+    for fluxo in resultado['fluxos'].values():
+        assert fluxo['p50_ms'] <= fluxo['p95_ms'] <= fluxo['p99_ms']
+    delivery.sistema = None
+
+
+def test_ler_taxas():
+    assert simulador.ler_taxas('pedido=4, busca=0.5') == {'pedido': 4.0, 'busca': 0.5}
+    with pytest.raises(argparse.ArgumentTypeError):
+        simulador.ler_taxas('cancelar=1')
@@ -0,0 +1,55 @@
+import os
+
+import delivery
+from conftest import abrir, popular
+
+
+def test_estimador_gravado_com_as_mudancas_de_status(tmp_path):
+    caminho = str(tmp_path / 'delivery.db')
+    sistema = popular(abrir(delivery.ArmazenamentoSQLite(caminho)))
+    restaurante = sistema.restaurantes[0]
+    for i in range(3):
+        sistema.adicionar_pedido(delivery.Pedido(sistema.clientes[i], restaurante, restaurante.cardapio[:1]))
+    sistema.alterar_status_lote(sistema.pedidos, 'A caminho')
+    sistema.alterar_status_lote(sistema.pedidos[:1], 'Entregue')
+    esperado = sistema.estimador.estado()
+    assert esperado['em_transporte']
+    sistema.fechar()
+
+    relido = abrir(delivery.ArmazenamentoSQLite(caminho))
+    assert relido.estimador.estado() == esperado
+    assert [p.status for p in relido.pedidos] == ['Entregue', 'A caminho', 'A caminho']
+    relido.fechar()
+    delivery.sistema = None
+
+
+def test_fechar_incorpora_o_wal(tmp_path):
+    caminho = str(tmp_path / 'delivery.db')
+    sistema = popular(abrir(delivery.ArmazenamentoSQLite(caminho)))
+    assert os.path.getsize(caminho + '-wal') > 0
+    sistema.fechar()
+    sistema.fechar()
+    assert not os.path.exists(caminho + '-wal') or os.path.getsize(caminho + '-wal') == 0
+    assert len(abrir(delivery.ArmazenamentoSQLite(caminho)).clientes) == 3
+    delivery.sistema.fechar()
+    delivery.sistema = None
+
+
+def test_consultas_do_banco_batem_com_a_memoria(tmp_path):
+    armazenamento = delivery.ArmazenamentoDiferido(delivery.ArmazenamentoSQLite(str(tmp_path / 'delivery.db')), intervalo=60)
+    sistema = popular(abrir(armazenamento))
+    for i in range(9):
+        restaurante = sistema.restaurantes[i % 2]
+        sistema.adicionar_pedido(delivery.Pedido(sistema.clientes[i % 3], restaurante, restaurante.cardapio[:1 + i % 3]))
+    sistema.alterar_status_lote(sistema.pedidos[:4], 'A caminho')
+    banco = sistema.banco()
+    assert banco is armazenamento.interno
+    for restaurante in sistema.restaurantes:
+        nome = restaurante.nome
+        for status, limite in ((None, None), (delivery.STATUS_ATIVOS, None), (None, 2), (('A caminho',), 1)):
+            esperado = [p.id for p in sistema.pedidos_restaurante.consultar(nome, status, limite)]
+            assert banco.pedidos_restaurante(nome, status, limite) == esperado
+        assert sorted(banco.mais_pedidos(5, nome)) == sorted(sistema.agregados.mais_pedidos(5, nome))
+    assert sorted(banco.mais_pedidos(5)) == sorted(sistema.agregados.mais_pedidos(5))
+    sistema.fechar()
+    delivery.sistema = None
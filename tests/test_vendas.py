@@ -0,0 +1,51 @@
+import time
+
+import delivery
+
+
+def arredondar(baldes):
+    if isinstance(baldes, dict):
+        return {chave: arredondar(valor) for chave, valor in baldes.items()}
+    if isinstance(baldes, list):
+        return [arredondar(valor) for valor in baldes]
+    return round(baldes, 6) if isinstance(baldes, float) else baldes
+
+
+def test_reconstruir_vendas_igual_aos_baldes_incrementais(sistema, tmp_path):
+    sistema.arquivo = delivery.ArquivoPedidos(str(tmp_path / 'arquivo'), dias=30)
+    # Monta os baldes já, para que os pedidos abaixo entrem incrementalmente.
+    assert not sistema.vendas.dias
+    agora = int(time.time())
+    for i in range(30):
+        restaurante = sistema.restaurantes[i % 2]
+        pedido = delivery.Pedido(sistema.clientes[i % 3], restaurante, restaurante.cardapio[:1 + i % 3])
+        pedido.hora = agora - i * 7 * 3600 * 7
+        sistema.adicionar_pedido(pedido)
+    sistema.alterar_status_lote(sistema.pedidos, 'A caminho')
+    sistema.alterar_status_lote(sistema.pedidos, 'Entregue')
+    assert sistema.arquivar(agora, forcar=True) > 0
+    esperado = arredondar(sistema.vendas.dias), arredondar(sistema.vendas.horas)
+
+    sistema.reconstruir_vendas()
+    dias, horas = esperado
+    assert arredondar(sistema.vendas.dias) == dias
+    # Dos pedidos arquivados sobram só os totais do dia, como numa recarga.
+    vivos = {(p.restaurante.nome, p.hora // 3600) for p in sistema.pedidos}
+    assert {(nome, hora) for nome, baldes in sistema.vendas.horas.items() for hora in baldes} == vivos
+    assert all(arredondar(sistema.vendas.horas[nome][hora]) == horas[nome][hora] for nome, hora in vivos)
+
+
+def test_baldes_montados_na_primeira_consulta(sistema, tmp_path):
+    for i in range(6):
+        restaurante = sistema.restaurantes[i % 2]
+        sistema.adicionar_pedido(delivery.Pedido(sistema.clientes[i % 3], restaurante, restaurante.cardapio[:1 + i % 3]))
+    sistema.salvar_dados()
+
+    relido = delivery.Sistema(delivery.ArmazenamentoJSON(str(tmp_path / 'delivery.data')))
+    assert relido.baldes_vendas is None
+    esperado = arredondar(sistema.vendas.dias), arredondar(sistema.vendas.horas)
+    assert (arredondar(relido.vendas.dias), arredondar(relido.vendas.horas)) == esperado
+
+    restaurante = relido.restaurantes[0]
+    relido.adicionar_pedido(delivery.Pedido(relido.clientes[0], restaurante, restaurante.cardapio[:1]))
+    assert sum(balde[0] for balde in relido.vendas.dias[restaurante.nome].values()) == 4